@@ -1,111 +1,580 @@
 import os
 import json
-from openai import OpenAI
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Iterable
 from dotenv import load_dotenv
 from pydantic import ValidationError
-import re
 
 # Import our custom modules
 import prompts
-from tools import PayslipComponents
+from tools import AMOUNT_FIELDS, PARSER_TOOL_NAME, PayslipComponents, get_parser_tool
+from local_parser import parse_payslip_locally, DEFAULT_CONFIDENCE_THRESHOLD
+from cache import get_default_cache, make_cache_key, normalize_text
+from tax_rules import get_rules_version
+from errors import AgentError, ParseError, AnalysisError
+from tokens import TokenBudget, UsageLog
+from tracing import span
+from transport import needs_client, transport_from_env
+from resilience import LazyOpenAIClient
+from tax_engine import compute_tax_figures, figures_for_prompt, render_numbers_report
+from redact import redact_payslip
 
 # Load environment variables (OPENAI_API_KEY)
 load_dotenv()
 
-class SalaryAgent:
-    def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        if not self.client.api_key:
-            raise EnvironmentError("OPENAI_API_KEY not found in .env file. Please create a .env file with your key.")
+logger = logging.getLogger(__name__)
 
-    def parse_payslip_text(self, payslip_text: str) -> dict:
+PARSER_MODEL = "gpt-4o"
+ANALYSIS_MODEL = "gpt-4o"
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAX_REASKS = 1
+
+# --- Request builders (shared by SalaryAgent and AsyncSalaryAgent) ---------
+
+def _parser_request(payslip_text: str) -> dict:
+    """Keyword arguments for the parsing chat-completions call."""
+    return dict(
+        model=PARSER_MODEL,
+        messages=[
+            {"role": "system", "content": prompts.PARSER_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Here is my payslip text: \n\n{payslip_text}"}
+        ],
+        # Strict tool schema, built once from PayslipComponents (see tools.py).
+        tools=[get_parser_tool()],
+        tool_choice={"type": "function", "function": {"name": PARSER_TOOL_NAME}}
+    )
+
+
+def _tool_arguments(response):
+    """
+    The tool call of a parsing response and its decoded arguments.
+    Raises ValueError if the model output is unusable.
+    """
+    tool_call = response.choices[0].message.tool_calls[0]
+    if tool_call.function.name != PARSER_TOOL_NAME:
+        raise ValueError("Model did not call the correct tool.")
+    return tool_call, json.loads(tool_call.function.arguments)
+
+
+def _invalid_fields(error: ValidationError) -> tuple:
+    """Top-level PayslipComponents fields named in a ValidationError."""
+    return tuple(sorted({str(e["loc"][0]) for e in error.errors() if e["loc"]}))
+
+
+def _reask_request(request: dict, tool_call, fields: tuple, error: ValidationError) -> dict:
+    """
+    Follow-up to a parse whose tool call failed validation: replies to the
+    call with the errors and asks again for only the invalid fields.
+    """
+    problems = "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors())
+    messages = request["messages"] + [
+        {"role": "assistant", "content": None, "tool_calls": [{
+            "id": tool_call.id, "type": "function",
+            "function": {"name": tool_call.function.name, "arguments": tool_call.function.arguments},
+        }]},
+        {"role": "tool", "tool_call_id": tool_call.id,
+         "content": f"Validation failed ({problems}). Call the tool again with corrected values for "
+                    f"{', '.join(fields)} only; use null if the payslip does not show a value."},
+    ]
+    return dict(
+        model=PARSER_MODEL,
+        messages=messages,
+        tools=[get_parser_tool(fields)],
+        tool_choice={"type": "function", "function": {"name": PARSER_TOOL_NAME}},
+    )
+
+
+def _salvage_components(arguments: dict, error: ValidationError) -> dict:
+    """
+    The valid part of a parse that is still invalid after re-asking: invalid
+    fields are dropped so the user can fill them in when confirming. Raises
+    `error` if no amount survives.
+    """
+    fields = _invalid_fields(error)
+    try:
+        parsed = PayslipComponents(**{k: v for k, v in arguments.items() if k not in fields}).to_dict()
+    except ValidationError:
+        raise error
+    if not any(field in parsed for field in AMOUNT_FIELDS):
+        raise error
+    # Field names only: the error text quotes the (payslip) input values.
+    logger.warning("Dropped invalid parsed fields after re-asking: %s", ", ".join(fields))
+    return parsed
+
+
+def _parse_cache_key(payslip_text: str) -> str:
+    return make_cache_key("parse", normalize_text(payslip_text), PARSER_MODEL, prompts.PROMPT_VERSION)
+
+
+def _analysis_request(confirmed_data: dict, country: str, tax_year: str, tax_rules_string: str,
+                      annualize_factor: int = 12) -> dict:
+    """
+    Keyword arguments for the analysis chat-completions call. Pass
+    annualize_factor=1 when the data is already annual (see ytd.py).
+    """
+    # Precompiled and cached per (country, tax_year, rules); see prompts.py
+    system_prompt = prompts.build_analysis_system_prompt(str(country), str(tax_year), str(tax_rules_string))
+
+    # Create the user message with the confirmed data (compact JSON: fewer input tokens)
+    if annualize_factor == 1:
+        intro = ("Here is my *confirmed* ANNUAL salary data in JSON format (year-to-date totals projected "
+                 "to the full year; the amounts are already annual, do not multiply them by 12). ")
+    else:
+        intro = "Here is my *confirmed* monthly salary data in JSON format. "
+    user_message = (
+        intro + "Please analyze it based on the tax rules provided in your system prompt.\n\n"
+        f"Confirmed Data: {json.dumps(confirmed_data, separators=(',', ':'), ensure_ascii=False)}"
+    )
+
+    # Hand the model exact numbers so it only has to write the narrative.
+    figures = compute_tax_figures(confirmed_data, country, tax_year, annualize_factor=annualize_factor)
+    if figures and figures["figures"]:
+        user_message += f"\n\nPrecomputed Figures (exact; use verbatim):\n{figures_for_prompt(figures)}"
+
+    return dict(
+        model=ANALYSIS_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ],
+        temperature=0.1
+    )
+
+
+def _analysis_cache_key(confirmed_data: dict, country: str, tax_year: str, tax_rules_string: str,
+                        annualize_factor: int = 12) -> str:
+    payload = {"data": confirmed_data, "country": str(country).lower(), "tax_year": str(tax_year).strip(),
+               "tax_rules": tax_rules_string}
+    if annualize_factor != 12:
+        # Only added for annual data so existing monthly cache entries stay valid.
+        payload["annualize_factor"] = annualize_factor
+    return make_cache_key(
+        "analysis",
+        payload,
+        ANALYSIS_MODEL, prompts.PROMPT_VERSION, get_rules_version(country, tax_year),
+    )
+
+
+class _BaseSalaryAgent:
+    """Configuration and local (no network) steps shared by both agents."""
+
+    def __init__(self, fast_path_threshold: float | None = None, cache=None, token_budget: TokenBudget | None = None,
+                 redact: bool | None = None):
+        # Minimum local-parser confidence needed to skip the LLM parsing call.
+        # Set FAST_PARSE_THRESHOLD above 1.0 to always use the LLM.
+        if fast_path_threshold is None:
+            fast_path_threshold = float(os.getenv("FAST_PARSE_THRESHOLD", DEFAULT_CONFIDENCE_THRESHOLD))
+        self.fast_path_threshold = fast_path_threshold
+
+        # Two-tier response cache shared by both calls (see cache.py).
+        self.cache = cache if cache is not None else get_default_cache()
+
+        # Token budget (MAX_PROMPT_TOKENS / MAX_COMPLETION_TOKENS) and per-call usage.
+        self.token_budget = token_budget if token_budget is not None else TokenBudget.from_env()
+        self.usage = UsageLog()
+
+        # Mask identifiers and drop irrelevant lines before the parsing call (see redact.py).
+        # Set REDACT_PAYSLIPS=0 to send the payslip text as pasted.
+        if redact is None:
+            redact = os.getenv("REDACT_PAYSLIPS", "1").strip().lower() not in ("0", "false", "no", "off")
+        self.redact = redact
+
+        # Follow-up calls asking only for the fields that failed validation.
+        self.max_reasks = int(os.getenv("PARSE_MAX_REASKS", DEFAULT_MAX_REASKS))
+
+    def _init_transport(self, async_client: bool, client=None, transport=None):
         """
-        Call 1: The "Parsing" Call.
-        Uses OpenAI Tool Calling to extract structured data from the payslip.
+        Set up self.client and self.transport. `client` lets benchmarks inject an
+        offline stand-in (see benchmarks/fake_openai.py); `transport` overrides the
+        SALARY_AGENT_TRANSPORT selection (see transport.py). Strict replay needs
+        no client and therefore no API key.
         """
-        try:
-            # In agent.py, inside parse_payslip_text()
-
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": prompts.PARSER_SYSTEM_PROMPT},
-                    {"role": "user", "content": f"Here is my payslip text: \n\n{payslip_text}"}
-                ],
-                tools=[
-                    {
-                        "type": "function",
-                        "function": {
-                            "name": "PayslipComponents",  # <-- The required function name
-                            "description": "Extracts salary components from a user's payslip text.", # <-- A simple description
-                            "parameters": PayslipComponents.model_json_schema() # <-- The Pydantic schema for the parameters
-                        }
-                    }
-                ],
-                tool_choice={"type": "function", "function": {"name": "PayslipComponents"}}
-            )
-            
-            # Extract the tool call arguments
-            tool_call = response.choices[0].message.tool_calls[0]
-            if tool_call.function.name != "PayslipComponents":
-                raise ValueError("Model did not call the correct tool.")
-            
-            # Load the arguments as JSON and validate with Pydantic
-            raw_args = tool_call.function.arguments
-            parsed_args = json.loads(raw_args)
-            
-            # Validate and convert to our model
-            validated_components = PayslipComponents(**parsed_args)
-            
-            # Return as a clean dictionary
-            return validated_components.to_dict()
+        if client is None and transport is None and needs_client():
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise EnvironmentError("OPENAI_API_KEY not found in .env file. Please create a .env file with your key.")
+            # Shared pooled client with explicit timeouts; retries live in resilience.py.
+            # It (and the openai import) is created on the first LLM call.
+            client = LazyOpenAIClient(api_key, async_client=async_client)
+        self.client = client
+        self.transport = transport if transport is not None else transport_from_env(client)
 
-        except ValidationError as e:
-            print(f"[Agent Error: Pydantic validation failed]\n{e}")
+    def generate_numbers_only_report(self, confirmed_data: dict, country: str, tax_year: str,
+                                     annualize_factor: int = 12) -> str:
+        """
+        Sections 1-2 computed locally by tax_engine, with no LLM call.
+        Returns None if there are no tax rules for the country/year.
+        """
+        figures = compute_tax_figures(confirmed_data, country, tax_year, annualize_factor=annualize_factor)
+        if figures is None:
             return None
+        return render_numbers_report(figures)
+
+    def _local_parse(self, payslip_text: str):
+        """Return the fast-path parse if it is confident enough, else None."""
+        local_result = parse_payslip_locally(payslip_text)
+        if local_result.components and local_result.overall_confidence >= self.fast_path_threshold:
+            try:
+                return local_result.to_dict()
+            except ValidationError as e:
+                logger.warning("Local parse failed validation (%s); using the LLM", ", ".join(_invalid_fields(e)))
+        return None
+
+    def _parser_input(self, payslip_text: str, s) -> str:
+        """The text sent to the parsing LLM: redacted unless redaction is off."""
+        if not self.redact:
+            return payslip_text
+        redaction = redact_payslip(payslip_text)
+        s.set(tokens_removed=redaction.tokens_removed, masked=sum(redaction.masked.values()))
+        # Everything may be pruned from unusual layouts; the model then gets the original.
+        return redaction.text or payslip_text
+
+    # --- Call logic, written once ---
+    # The parse and analysis flows are generators that yield chat-completions
+    # requests and are sent the responses (or have the call's exception thrown
+    # in). SalaryAgent and AsyncSalaryAgent differ only in how they make the
+    # call: see their _run_steps.
+
+    def _parse_steps(self, payslip_text: str, s):
+        """
+        Call 1 as steps: local fast path, cache, then the LLM with re-asks.
+        The source ("local", "cache" or "llm") and redaction counts are set
+        on the span, not on the agent, which is shared between sessions.
+        """
+        parsed = self._local_parse(payslip_text)
+        if parsed is not None:
+            s.set(source="local")
+            return parsed
+
+        # Local parsing sees the full text; the LLM (and its cache key) only the redacted text.
+        llm_text = self._parser_input(payslip_text, s)
+        cache_key = _parse_cache_key(llm_text)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            s.set(source="cache")
+            return cached
+
+        s.set(source="llm", model=PARSER_MODEL)
+        try:
+            request = _parser_request(llm_text)
+            estimated = self.token_budget.apply("parse", request)
+            response = yield request
+            s.record_usage(PARSER_MODEL, self.usage.record("parse", PARSER_MODEL, response.usage, estimated))
+            parsed = yield from self._validation_steps(request, response, s)
+        except AgentError:
+            raise
+        except ValidationError as e:
+            # Field names only: the error text quotes the payslip values.
+            raise ParseError(f"Pydantic validation failed for {', '.join(_invalid_fields(e))}") from e
         except Exception as e:
-            print(f"[Agent Error: OpenAI API call failed]\n{e}")
+            raise ParseError(f"OpenAI API call failed: {e}") from e
+
+        self.cache.set(cache_key, parsed)
+        return parsed
+
+    def _validation_steps(self, request: dict, response, s):
+        """
+        Validate the parse; on a ValidationError re-ask for only the invalid
+        fields (up to max_reasks times) and merge the answers into the rest.
+        """
+        tool_call, arguments = _tool_arguments(response)
+        for attempt in range(self.max_reasks + 1):
+            try:
+                return PayslipComponents(**arguments).to_dict()
+            except ValidationError as e:
+                error = e
+                if attempt == self.max_reasks:
+                    break
+                fields = _invalid_fields(e)
+                s.set(reasks=attempt + 1, reask_fields=list(fields))
+                request = _reask_request(request, tool_call, fields, e)
+                estimated = self.token_budget.apply("parse", request)
+                response = yield request
+                s.record_usage(PARSER_MODEL, self.usage.record("parse_reask", PARSER_MODEL, response.usage,
+                                                               estimated))
+                tool_call, fixed = _tool_arguments(response)
+                arguments.update({field: fixed.get(field) for field in fields})
+        return _salvage_components(arguments, error)
+
+    def _cached_analysis(self, confirmed_data: dict, country: str, tax_year: str, tax_rules_string: str,
+                         annualize_factor: int, s) -> tuple:
+        """(cache key, cached report or None); the hit or miss is recorded on the span."""
+        cache_key = _analysis_cache_key(confirmed_data, country, tax_year, tax_rules_string, annualize_factor)
+        cached = self.cache.get(cache_key)
+        s.set(cache="hit" if cached is not None else "miss")
+        return cache_key, cached
+
+    def _analysis_steps(self, confirmed_data: dict, country: str, tax_year: str, tax_rules_string: str,
+                        annualize_factor: int, s):
+        """Call 2 as steps: cache, then one LLM call."""
+        cache_key, cached = self._cached_analysis(confirmed_data, country, tax_year, tax_rules_string,
+                                                  annualize_factor, s)
+        if cached is not None:
+            return cached
+
+        try:
+            request = _analysis_request(confirmed_data, country, tax_year, tax_rules_string, annualize_factor)
+            estimated = self.token_budget.apply("analysis", request)
+            response = yield request
+            s.record_usage(ANALYSIS_MODEL, self.usage.record("analysis", ANALYSIS_MODEL, response.usage, estimated))
+        except AgentError:
+            raise
+        except Exception as e:
+            raise AnalysisError(f"OpenAI API call failed: {e}") from e
+
+        report = response.choices[0].message.content
+        if not report:
+            raise AnalysisError("The model returned an empty report.")
+        self.cache.set(cache_key, report)
+        return report
+
+    def _stream_request(self, confirmed_data: dict, country: str, tax_year: str, tax_rules_string: str,
+                        annualize_factor: int) -> tuple:
+        """(streaming analysis request, estimated prompt tokens)."""
+        request = _analysis_request(confirmed_data, country, tax_year, tax_rules_string, annualize_factor)
+        estimated = self.token_budget.apply("analysis", request)
+        return dict(request, stream=True, stream_options={"include_usage": True}), estimated
+
+    def _finish_stream(self, report: "_StreamedReport", cache_key: str, estimated, s):
+        """Record usage and cache the full text of a completed stream."""
+        s.record_usage(ANALYSIS_MODEL, self.usage.record("analysis", ANALYSIS_MODEL, report.usage, estimated))
+        if not report.chunks:
+            raise AnalysisError("The model returned an empty report.")
+        self.cache.set(cache_key, "".join(report.chunks))
+
+
+class _StreamedReport:
+    """An analysis stream read so far: text chunks, the usage chunk and time to first token."""
+
+    def __init__(self, s):
+        self.span = s
+        self.chunks = []
+        self.usage = None
+
+    def feed(self, chunk) -> str | None:
+        """The text carried by `chunk`, if any."""
+        if getattr(chunk, "usage", None):
+            self.usage = chunk.usage
+        if not chunk.choices:
             return None
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            return None
+        if not self.chunks:
+            self.span.set(first_token_ms=self.span.elapsed_ms)
+        self.chunks.append(delta)
+        return delta
+
+
+class SalaryAgent(_BaseSalaryAgent):
+    def __init__(self, fast_path_threshold: float | None = None, cache=None, token_budget: TokenBudget | None = None,
+                 client=None, transport=None, redact: bool | None = None):
+        super().__init__(fast_path_threshold=fast_path_threshold, cache=cache, token_budget=token_budget,
+                         redact=redact)
+        self._init_transport(False, client, transport)
 
-    
-# (other imports above)
+    def _run_steps(self, steps):
+        """Drive a step generator (see _BaseSalaryAgent) with blocking calls."""
+        try:
+            request = next(steps)
+            while True:
+                try:
+                    response = self.transport.create(**request)
+                except Exception as e:
+                    request = steps.throw(e)
+                else:
+                    request = steps.send(response)
+        except StopIteration as done:
+            return done.value
+
+    def parse_payslip_text(self, payslip_text: str) -> dict:
+        """
+        Call 1: The "Parsing" Call.
+        Tries the local rule-based parser first and only falls back to
+        OpenAI Tool Calling when its confidence is below the threshold.
+        Raises ParseError, or a ProviderError subclass for provider failures.
+        """
+        with span("agent.parse") as s:
+            return self._run_steps(self._parse_steps(payslip_text, s))
 
-    def generate_analysis_report(self, confirmed_data: dict, country: str, tax_year: str, tax_rules_string: str) -> str:
+    def generate_analysis_report(self, confirmed_data: dict, country: str, tax_year: str, tax_rules_string: str,
+                                 annualize_factor: int = 12) -> str:
         """
         Call 2: The "Analysis" Call.
         Uses the confirmed JSON data and tax rules to generate the report.
+        Raises AnalysisError, or a ProviderError subclass for provider failures.
+        """
+        with span("agent.analysis", model=ANALYSIS_MODEL) as s:
+            return self._run_steps(self._analysis_steps(confirmed_data, country, tax_year, tax_rules_string,
+                                                        annualize_factor, s))
+
+    def stream_analysis_report(self, confirmed_data: dict, country: str, tax_year: str, tax_rules_string: str,
+                               annualize_factor: int = 12):
         """
+        Streaming variant of generate_analysis_report.
+        Yields Markdown chunks as they arrive; the full text is cached once complete.
+        Raises the same errors as generate_analysis_report.
+        """
+        with span("agent.analysis_stream", model=ANALYSIS_MODEL) as s:
+            cache_key, cached = self._cached_analysis(confirmed_data, country, tax_year, tax_rules_string,
+                                                      annualize_factor, s)
+            if cached is not None:
+                yield cached
+                return
+
+            report = _StreamedReport(s)
+            try:
+                request, estimated = self._stream_request(confirmed_data, country, tax_year, tax_rules_string,
+                                                          annualize_factor)
+                stream = self.transport.create(**request)
+                try:
+                    for chunk in stream:
+                        delta = report.feed(chunk)
+                        if delta:
+                            yield delta
+                finally:
+                    # Release the connection promptly if the consumer stops early (e.g. a cancelled prefetch).
+                    if hasattr(stream, "close"):
+                        stream.close()
+            except AgentError:
+                raise
+            except Exception as e:
+                raise AnalysisError(f"OpenAI API call failed: {e}") from e
+            self._finish_stream(report, cache_key, estimated, s)
+
+
+# --- Async agent ------------------------------------------------------------
+
+def _advance(step, *args) -> tuple:
+    """
+    (finished, value) for one step of a step generator: the next request, or
+    the result once it returns. StopIteration cannot cross a thread boundary
+    (asyncio.to_thread), so it is turned into a value here.
+    """
+    try:
+        return False, step(*args)
+    except StopIteration as done:
+        return True, done.value
+
+
+@dataclass
+class BatchItemResult:
+    """Outcome of one item in a parse_many / analyze_many batch."""
+    index: int
+    value: Any = None
+    error: AgentError | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
 
-        # Safely substitute only the specific tokens we want — avoid using str.format()
-        system_template = prompts.ANALYSIS_SYSTEM_PROMPT_TEMPLATE
 
-        # Replace only the exact placeholders we expect
-        system_prompt = re.sub(r"\{country\}", str(country), system_template)
-        system_prompt = re.sub(r"\{tax_year\}", str(tax_year), system_prompt)
-        # tax_rules_string may contain braces etc.; we insert it as-is
-        system_prompt = re.sub(r"\{tax_rules\}", str(tax_rules_string), system_prompt)
+class AsyncSalaryAgent(_BaseSalaryAgent):
+    """
+    Async counterpart of SalaryAgent built on AsyncOpenAI.
 
-        # Create the user message with the confirmed data
-        user_message = f"""
-        Here is my *confirmed* monthly salary data in JSON format.
-        Please analyze it based on the tax rules provided in your system prompt.
+    Single-item methods raise ParseError / AnalysisError instead of returning
+    None or an error string; the *_many methods run items concurrently under a
+    bounded semaphore and return one BatchItemResult per input, in input order.
+    """
 
-        Confirmed Data:
-        {json.dumps(confirmed_data, indent=2)}
+    def __init__(self, fast_path_threshold: float | None = None, cache=None, max_concurrency: int | None = None,
+                 token_budget: TokenBudget | None = None, client=None, transport=None,
+                 redact: bool | None = None):
+        super().__init__(fast_path_threshold=fast_path_threshold, cache=cache, token_budget=token_budget,
+                         redact=redact)
+        self._init_transport(True, client, transport)
+
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("AGENT_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY))
+        self.max_concurrency = max(1, max_concurrency)
+
+    async def _run_steps(self, steps):
+        """
+        Drive a step generator (see _BaseSalaryAgent) with awaited calls. The
+        local work between calls (local parse, redaction, SQLite cache reads
+        and writes) runs in a worker thread, off the event loop.
         """
+        finished, value = await asyncio.to_thread(_advance, next, steps)
+        while not finished:
+            try:
+                response = await self.transport.acreate(**value)
+            except Exception as e:
+                finished, value = await asyncio.to_thread(_advance, steps.throw, e)
+            else:
+                finished, value = await asyncio.to_thread(_advance, steps.send, response)
+        return value
 
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.1
-            )
+    async def parse_payslip_text(self, payslip_text: str) -> dict:
+        """Async Call 1. Raises ParseError on failure."""
+        with span("agent.parse") as s:
+            return await self._run_steps(self._parse_steps(payslip_text, s))
 
-            return response.choices[0].message.content
+    async def generate_analysis_report(self, confirmed_data: dict, country: str, tax_year: str,
+                                       tax_rules_string: str, annualize_factor: int = 12) -> str:
+        """Async Call 2. Raises AnalysisError on failure."""
+        with span("agent.analysis", model=ANALYSIS_MODEL) as s:
+            return await self._run_steps(self._analysis_steps(confirmed_data, country, tax_year, tax_rules_string,
+                                                              annualize_factor, s))
 
-        except Exception as e:
-            print(f"[Agent Error: OpenAI API call failed]\n{e}")
-            return "An error occurred during analysis. Please try again."
+    async def stream_analysis_report(self, confirmed_data: dict, country: str, tax_year: str,
+                                     tax_rules_string: str, annualize_factor: int = 12):
+        """Async streaming variant; yields Markdown chunks. Raises AnalysisError on failure."""
+        with span("agent.analysis_stream", model=ANALYSIS_MODEL) as s:
+            # Cache reads and writes may hit SQLite: keep them off the event loop.
+            cache_key, cached = await asyncio.to_thread(self._cached_analysis, confirmed_data, country, tax_year,
+                                                        tax_rules_string, annualize_factor, s)
+            if cached is not None:
+                yield cached
+                return
+
+            report = _StreamedReport(s)
+            try:
+                request, estimated = self._stream_request(confirmed_data, country, tax_year, tax_rules_string,
+                                                          annualize_factor)
+                stream = await self.transport.acreate(**request)
+                try:
+                    async for chunk in stream:
+                        delta = report.feed(chunk)
+                        if delta:
+                            yield delta
+                finally:
+                    # Release the connection promptly if the consumer stops early.
+                    close = getattr(stream, "aclose", None) or getattr(stream, "close", None)
+                    if close is not None:
+                        await close()
+            except AgentError:
+                raise
+            except Exception as e:
+                raise AnalysisError(f"OpenAI API call failed: {e}") from e
+            await asyncio.to_thread(self._finish_stream, report, cache_key, estimated, s)
+
+    async def _run_bounded(self, coroutine_factories) -> list[BatchItemResult]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run_one(index, factory):
+            async with semaphore:
+                try:
+                    return BatchItemResult(index=index, value=await factory())
+                except AgentError as e:
+                    return BatchItemResult(index=index, error=e)
+                except Exception as e:
+                    return BatchItemResult(index=index, error=AgentError(str(e)))
+
+        return await asyncio.gather(*(run_one(i, f) for i, f in enumerate(coroutine_factories)))
+
+    async def parse_many(self, payslip_texts: Iterable[str]) -> list[BatchItemResult]:
+        """Parse many payslips concurrently; results are in input order."""
+        return await self._run_bounded(
+            [lambda text=text: self.parse_payslip_text(text) for text in payslip_texts]
+        )
+
+    async def analyze_many(self, confirmed_items: Iterable[dict], country: str, tax_year: str,
+                           tax_rules_string: str) -> list[BatchItemResult]:
+        """Generate analysis reports for many confirmed payslips concurrently, in input order."""
+        return await self._run_bounded(
+            [lambda data=data: self.generate_analysis_report(data, country, tax_year, tax_rules_string)
+             for data in confirmed_items]
+        )
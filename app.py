@@ -1,13 +1,28 @@
 import streamlit as st
 import json
+import logging
+import re
 import sys
-from pdf_report import generate_pdf_report
 from zoneinfo import ZoneInfo
 from datetime import datetime
 # Import all our custom agent modules
 from agent import SalaryAgent
 import prompts
 from tax_rules import get_tax_rules, get_tax_rules_as_string
+from tracing import span
+from prefetch import AnalysisPrefetcher, prefetch_key
+from sections import diff_fields, update_report
+from artifacts import artifact_key, get_artifact_store
+from ingest import extract_upload
+from tax_engine import format_amount
+from tools import AMOUNT_FIELDS, PayslipComponents
+from pydantic import ValidationError
+from errors import AgentError, CircuitOpenError, ParseError, RateLimitedError, TokenBudgetExceededError
+from startup import start_warmup
+# pdf_report (reportlab), ytd and optimizer (numpy) are imported where they are
+# first needed, so they are not loaded before the first page paint.
+
+logger = logging.getLogger(__name__)
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -32,6 +47,14 @@ def get_agent():
 
 agent = get_agent()
 
+@st.cache_resource
+def get_prefetcher():
+    """
+    One background pool per server process for speculative analysis calls
+    (started while the user reviews the parsed data; see prefetch.py).
+    """
+    return AnalysisPrefetcher()
+
 # --- Session State Management ---
 # This is the core of the Streamlit app. We use the "step"
 # variable to manage the UI flow (a simple state machine).
@@ -46,6 +69,29 @@ if "country" not in st.session_state:
     st.session_state.country = "India"
 if "tax_year" not in st.session_state:
     st.session_state.tax_year = "2024-25"
+if "prefetch" not in st.session_state:
+    st.session_state.prefetch = None
+if "artifact_keys" not in st.session_state:
+    # Reports rendered in this session, oldest first (see artifacts.py).
+    st.session_state.artifact_keys = []
+if "analysis_data" not in st.session_state:
+    # The data the (prefetched) analysis was requested for; corrections made
+    # after that are applied to the report section by section (sections.py).
+    st.session_state.analysis_data = None
+if "payroll_table" not in st.session_state:
+    # Full-year mode: the parsed months (see ytd.py). parsed_data then holds the
+    # projected annual figures and annualize_factor is 1.
+    st.session_state.payroll_table = None
+if "annualize_factor" not in st.session_state:
+    st.session_state.annualize_factor = 12
+
+YEAR_MODE = "Full year (several payslips)"
+
+def cancel_prefetch():
+    """Cancel and drop any speculative analysis for this session."""
+    if st.session_state.prefetch is not None:
+        st.session_state.prefetch.cancel()
+        st.session_state.prefetch = None
 
 def start_over():
     """
@@ -53,7 +99,11 @@ def start_over():
     """
     st.session_state.step = "awaiting_input"
     st.session_state.parsed_data = None
+    st.session_state.analysis_data = None
     st.session_state.final_report = None
+    st.session_state.payroll_table = None
+    st.session_state.annualize_factor = 12
+    cancel_prefetch()
     # Keep country and year as they were
     st.rerun()
 
@@ -77,10 +127,37 @@ st.session_state.tax_year = st.sidebar.text_input(
     "Enter Financial Year", 
     value="2024-25" if st.session_state.country == "India" else "2024"
 )
+st.session_state.period_mode = st.sidebar.radio(
+    "Analysis period",
+    ["Single month", YEAR_MODE],
+    help="Upload several monthly payslips to analyze the year-to-date totals instead of one month x 12.",
+)
 
 if st.sidebar.button("Start Over / Reset"):
     start_over()
 
+# Reports generated earlier in this session stay downloadable while the
+# artifact store still holds them (in memory or spilled to disk). Only their
+# metadata is read on each rerun; the bytes of a report are loaded when it
+# is picked for download.
+previous_reports = get_artifact_store().list(st.session_state.artifact_keys)
+if previous_reports:
+    st.sidebar.markdown("---")
+    st.sidebar.header("Your Reports")
+    for artifact in previous_reports:
+        if st.sidebar.button(f"📄 {artifact['label']}", key=f"artifact_{artifact['key']}"):
+            st.session_state.selected_artifact = artifact["key"]
+        if st.session_state.get("selected_artifact") == artifact["key"]:
+            data = get_artifact_store().get(artifact["key"])
+            if data is not None:
+                st.sidebar.download_button(
+                    label="📥 Download",
+                    data=data,
+                    file_name=artifact["filename"],
+                    mime="application/pdf",
+                    key=f"download_{artifact['key']}",
+                )
+
 # --- Main Application Body ---
 
 st.title("Salary Analyzer & Tax Opportunity Agent")
@@ -89,20 +166,144 @@ Welcome! This agent will analyze your pasted salary slip to find potential tax-s
 Your current settings are: **Country: {st.session_state.country}**, **Year: {st.session_state.tax_year}**.
 """)
 
+def show_agent_error(e: AgentError, action: str):
+    """
+    Explain an agent failure to the user; transient provider problems get a
+    'try again' message instead of the generic one.
+    """
+    if isinstance(e, (RateLimitedError, CircuitOpenError)):
+        wait = f" in about {e.retry_after:.0f} seconds" if e.retry_after else " in a minute"
+        st.error(f"The AI service is busy right now. Please try {action} again{wait}.")
+    elif isinstance(e, TokenBudgetExceededError):
+        st.error(f"This request is larger than the configured token budget. {e}")
+    else:
+        st.error(f"Sorry, an error occurred while {action}. Please try again.")
+    # The type only: messages can quote payslip values.
+    logger.warning("Agent error while %s: %s", action, type(e).__name__)
+
+def edit_components(data: dict, form_key: str):
+    """
+    Inline editor for the parsed PayslipComponents fields. Returns the
+    validated, corrected dict when the user applies a change, else None.
+    """
+    with st.form(form_key):
+        values = {}
+        columns = st.columns(2)
+        for i, field in enumerate(AMOUNT_FIELDS):
+            info = PayslipComponents.model_fields[field]
+            values[field] = columns[i % 2].number_input(
+                field.replace("_", " ").title(),
+                min_value=0.0,
+                step=100.0,
+                value=float(data[field]) if data.get(field) is not None else None,
+                help=info.description,
+                key=f"{form_key}_{field}",
+            )
+        submitted = st.form_submit_button("Apply Corrections")
+    if not submitted:
+        return None
+    try:
+        # Line items and the period are not editable here and are kept as parsed.
+        kept = {k: v for k, v in data.items() if k not in AMOUNT_FIELDS}
+        corrected = PayslipComponents(**kept, **{k: v for k, v in values.items() if v is not None}).to_dict()
+    except ValidationError as e:
+        st.error(f"Invalid value: {e}")
+        return None
+    return corrected if diff_fields(data, corrected) else None
+
 # If the agent failed to initialize (e.g., no API key), stop here.
 if not agent:
     st.error("Agent could not be initialized. Stopping application.")
     sys.exit()
 
+# --- STEP 1 (full year): Several Monthly Payslips ---
+if st.session_state.step == "awaiting_input" and st.session_state.period_mode == YEAR_MODE:
+    st.subheader("Step 1: Add Your Monthly Salary Slips")
+    uploads = st.file_uploader(
+        "Upload monthly payslip PDFs / images (a payroll export with several slips works too)",
+        type=["pdf", "png", "jpg", "jpeg"], accept_multiple_files=True,
+    )
+    pasted = st.text_area(
+        "Or paste each month's payslip text, separated by a line containing only ---",
+        height=300,
+    )
+
+    if st.button("Analyze Year", type="primary"):
+        from ytd import PayrollTable, parse_months
+
+        texts = [part.strip() for part in re.split(r"(?m)^\s*-{3,}\s*$", pasted or "") if part.strip()]
+        for uploaded in uploads or []:
+            try:
+                texts.extend(extract_upload(uploaded.getvalue(), uploaded.name))
+            except Exception as e:
+                st.error(f"Could not read {uploaded.name}: {e}")
+
+        if not texts:
+            st.error("Please upload or paste at least one payslip.")
+        elif not get_tax_rules(st.session_state.country, st.session_state.tax_year):
+            st.error(f"Sorry, I don't have the tax rules for {st.session_state.country} {st.session_state.tax_year}.")
+        else:
+            with st.spinner(f"Parsing {len(texts)} payslips..."), span("app.parse_year", months=len(texts)) as s:
+                results = parse_months(agent, texts)
+                s.set(failed=sum(not r.ok for r in results))
+            failed = [r for r in results if not r.ok]
+            for r in failed:
+                logger.warning("Payslip %d could not be parsed: %s", r.index + 1, type(r.error).__name__)
+            parsed = [r for r in results if r.ok]
+            if failed:
+                st.warning(f"{len(failed)} of {len(results)} payslips could not be parsed and were skipped: "
+                           + ", ".join(f"#{r.index + 1}" for r in failed))
+            try:
+                table = PayrollTable.from_months([r.data for r in parsed], [r.text for r in parsed],
+                                                 tax_year=st.session_state.tax_year) if parsed else None
+            except ValueError as e:
+                st.error(str(e))
+                table = None
+            if table is not None and len(table):
+                st.session_state.payroll_table = table
+                st.session_state.annualize_factor = 1
+                st.session_state.payslip_text = "\n\n---\n\n".join(r.text for r in parsed)
+                st.session_state.parsed_data = table.annual_data()
+                st.session_state.analysis_data = st.session_state.parsed_data
+                st.session_state.step = "awaiting_confirmation"
+                st.rerun()
+
 # --- STEP 1: Awaiting Input ---
-if st.session_state.step == "awaiting_input":
+elif st.session_state.step == "awaiting_input":
     st.subheader("Step 1: Paste Your Salary Slip Text")
+    uploaded = st.file_uploader(
+        "Or upload a payslip PDF / image", type=["pdf", "png", "jpg", "jpeg"]
+    )
     payslip_text = st.text_area(
         "Paste your payslip text here. Remember to remove personal info.", 
         height=300,
         placeholder="Basic Salary: 50,000\nHRA: 20,000\nEmployee PF: 6,000\n..."
     )
 
+    if uploaded is not None and not payslip_text:
+        # Extract once per uploaded file; reruns reuse the result.
+        upload_id = (uploaded.name, uploaded.size)
+        if st.session_state.get("upload_id") != upload_id:
+            try:
+                with st.spinner("Extracting text from your file..."), span("app.ingest") as s:
+                    st.session_state.upload_slips = extract_upload(uploaded.getvalue(), uploaded.name)
+                    s.set(slips=len(st.session_state.upload_slips))
+            except Exception as e:
+                st.session_state.upload_slips = []
+                st.error(f"Could not read {uploaded.name}: {e}")
+            st.session_state.upload_id = upload_id
+        slips = st.session_state.get("upload_slips") or []
+        if not slips:
+            st.warning("No text could be extracted from this file. Please paste the payslip text instead.")
+        else:
+            index = 0
+            if len(slips) > 1:
+                index = st.selectbox(f"This file contains {len(slips)} payslips. Which one should be analyzed?",
+                                     range(len(slips)), format_func=lambda i: f"Payslip {i + 1}")
+            with st.expander("Extracted text"):
+                st.text(slips[index])
+            payslip_text = slips[index]
+
     if st.button("Analyze Payslip", type="primary"):
         if not payslip_text:
             st.error("Please paste your payslip text before analyzing.")
@@ -112,43 +313,88 @@ if st.session_state.step == "awaiting_input":
             if not tax_rules:
                 st.error(f"Sorry, I don't have the tax rules for {st.session_state.country} {st.session_state.tax_year}.")
             else:
-                with st.spinner("Calling AI Parser Engine... (Cost-efficient call 1/2)"):
-                    st.session_state.payslip_text = payslip_text
-                    parsed_data = agent.parse_payslip_text(payslip_text)
-                
+                parsed_data = None
+                try:
+                    with st.spinner("Calling AI Parser Engine... (Cost-efficient call 1/2)"), span("app.parse") as s:
+                        st.session_state.payslip_text = payslip_text
+                        parsed_data = agent.parse_payslip_text(payslip_text)
+                        s.set(ok=bool(parsed_data))
+                except ParseError:
+                    st.error("Sorry, I was unable to parse your payslip. Please try pasting it again, perhaps with clearer formatting.")
+                except AgentError as e:
+                    show_agent_error(e, "parsing your payslip")
+
                 if parsed_data:
+                    st.session_state.payroll_table = None
+                    st.session_state.annualize_factor = 12
                     st.session_state.parsed_data = parsed_data
+                    st.session_state.analysis_data = parsed_data
                     st.session_state.step = "awaiting_confirmation"
                     st.rerun()
-                else:
-                    st.error("Sorry, I was unable to parse your payslip. Please try pasting it again, perhaps with clearer formatting.")
 
 # --- STEP 2: Awaiting Confirmation ---
 elif st.session_state.step == "awaiting_confirmation":
     st.subheader("Step 2: Please Confirm Your Parsed Data")
-    st.write("Thank you. I have parsed the following *monthly* figures from your data. Please confirm if these are correct before I proceed with the full analysis.")
-    
-    st.json(st.session_state.parsed_data)
-    
+    table = st.session_state.payroll_table
+    if table is None:
+        st.write("Thank you. I have parsed the following *monthly* figures from your data. Please confirm if these are correct before I proceed with the full analysis. You can correct any figure below.")
+    else:
+        st.write(f"Thank you. I have parsed {len(table)} monthly payslips. Below are the months, the year-to-date totals and the projected full year, which is what will be analyzed. You can correct any *annual* figure below.")
+        for warning in table.warnings:
+            st.warning(warning)
+        st.dataframe(table.to_records() + table.summary_records(), hide_index=True, use_container_width=True)
+        changes = table.changes()
+        if changes:
+            st.caption("Changes between months: " + "; ".join(
+                f"{label}: {field} {old:,.0f} → {new:,.0f}" for label, field, old, new in changes
+            ))
+
+    # Start the analysis in the background while the user reviews the data.
+    # It is keyed by the data as parsed: corrections are patched into the
+    # report afterwards, while a change of country/year starts a new one.
+    tax_rules_string = get_tax_rules_as_string(st.session_state.country, st.session_state.tax_year)
+    current_key = prefetch_key(st.session_state.analysis_data, st.session_state.country,
+                               st.session_state.tax_year, tax_rules_string, st.session_state.annualize_factor)
+    prefetch = st.session_state.prefetch
+    if (prefetch is None or not prefetch.matches(current_key)) and \
+            get_tax_rules(st.session_state.country, st.session_state.tax_year):
+        cancel_prefetch()
+        st.session_state.prefetch = get_prefetcher().start(
+            agent,
+            st.session_state.analysis_data,
+            st.session_state.country,
+            st.session_state.tax_year,
+            tax_rules_string,
+            annualize_factor=st.session_state.annualize_factor,
+        )
+
+    line_items = st.session_state.parsed_data.get("line_items")
+    if line_items:
+        st.caption("Other components found on your payslip (passed to the analysis as they are):")
+        st.dataframe(line_items, hide_index=True, use_container_width=True)
+
+    corrected = edit_components(st.session_state.parsed_data, "confirm_editor")
+    if corrected is not None:
+        st.session_state.parsed_data = corrected
+        st.rerun()
+
+    changes = diff_fields(st.session_state.analysis_data, st.session_state.parsed_data)
+    if changes:
+        st.caption("Corrected: " + ", ".join(
+            f"{field} ({old if old is not None else '—'} → {new if new is not None else '—'})"
+            for field, (old, new) in changes.items()
+        ))
+
     st.markdown("---")
-    
-    st.write("If this data is incorrect, click 'Start Over' to re-paste your slip.")
+
+    st.write("If the payslip was misread badly, click 'Start Over' to re-paste your slip.")
     
     col1, col2 = st.columns([1, 1])
     
     with col1:
         if st.button("Confirm & Generate Report", type="primary"):
-            with st.spinner("Calling AI Analysis Engine... (Smarter call 2/2)"):
-                tax_rules_string = get_tax_rules_as_string(st.session_state.country, st.session_state.tax_year)
-                
-                final_report = agent.generate_analysis_report(
-                    confirmed_data=st.session_state.parsed_data,
-                    country=st.session_state.country,
-                    tax_year=st.session_state.tax_year,
-                    tax_rules_string=tax_rules_string
-                )
-            
-            st.session_state.final_report = final_report
+            # The report itself is streamed in Step 3 so the user sees output immediately.
+            st.session_state.final_report = None
             st.session_state.step = "showing_report"
             st.rerun()
 
@@ -159,9 +405,96 @@ elif st.session_state.step == "awaiting_confirmation":
 # --- STEP 3: Showing Report ---
 elif st.session_state.step == "showing_report":
     st.subheader("Step 3: Your Personalized Tax Opportunity Report")
-    st.balloons()
 
-    st.markdown(st.session_state.final_report)
+    if st.session_state.final_report is None:
+        # First render: stream the report as it is generated, then keep the full
+        # text in session state for the PDF and for later reruns.
+        tax_rules_string = get_tax_rules_as_string(st.session_state.country, st.session_state.tax_year)
+        current_key = prefetch_key(st.session_state.analysis_data, st.session_state.country,
+                                   st.session_state.tax_year, tax_rules_string,
+                                   st.session_state.annualize_factor)
+        prefetch = st.session_state.prefetch
+        corrected = bool(diff_fields(st.session_state.analysis_data, st.session_state.parsed_data))
+        try:
+            with span("app.report") as s:
+                if prefetch is not None and prefetch.matches(current_key):
+                    # Speculative analysis for the parsed data: finished or still arriving.
+                    s.set(prefetch="hit" if prefetch.done else "in_flight", corrected=corrected)
+                    if corrected:
+                        with st.spinner("Finishing your report..."):
+                            report, _ = update_report(
+                                prefetch.result(), st.session_state.analysis_data, st.session_state.parsed_data,
+                                st.session_state.country, st.session_state.tax_year,
+                                st.session_state.annualize_factor,
+                            )
+                        st.markdown(report)
+                        st.session_state.final_report = report
+                    else:
+                        st.session_state.final_report = st.write_stream(prefetch.stream())
+                else:
+                    s.set(prefetch="miss")
+                    cancel_prefetch()
+                    st.session_state.final_report = st.write_stream(agent.stream_analysis_report(
+                        confirmed_data=st.session_state.parsed_data,
+                        country=st.session_state.country,
+                        tax_year=st.session_state.tax_year,
+                        tax_rules_string=tax_rules_string,
+                        annualize_factor=st.session_state.annualize_factor,
+                    ))
+            st.session_state.prefetch = None
+            st.session_state.analysis_data = st.session_state.parsed_data
+        except AgentError as e:
+            # Don't reuse a failed prefetch on retry.
+            st.session_state.prefetch = None
+            show_agent_error(e, "generating your report")
+            if st.button("Retry Report", type="primary"):
+                st.rerun()
+            st.stop()
+        st.balloons()
+    else:
+        st.markdown(st.session_state.final_report)
+
+    # Corrections after the report: only the sections whose figures change are
+    # re-rendered locally; everything else is kept (no LLM call).
+    with st.expander("Correct a figure"):
+        corrected = edit_components(st.session_state.parsed_data, "report_editor")
+        if corrected is not None:
+            with span("app.report_update") as s:
+                st.session_state.final_report, changed = update_report(
+                    st.session_state.final_report, st.session_state.parsed_data, corrected,
+                    st.session_state.country, st.session_state.tax_year,
+                    st.session_state.annualize_factor,
+                )
+                s.set(sections=changed)
+            st.session_state.parsed_data = corrected
+            st.session_state.analysis_data = corrected
+            st.rerun()
+
+    # What-if scenarios are evaluated locally on every rerun (milliseconds, no LLM call).
+    from optimizer import optimize
+
+    with span("app.optimize") as s:
+        optimization = optimize(st.session_state.parsed_data, st.session_state.country,
+                                st.session_state.tax_year, st.session_state.annualize_factor)
+        s.set(scenarios=optimization.scenarios_evaluated if optimization else 0)
+    if optimization and len(optimization.front) > 1:
+        country = st.session_state.country
+        st.markdown("### What-if: Tax-Saving Scenarios")
+        st.caption(f"{optimization.scenarios_evaluated:,} amounts evaluated in {optimization.elapsed_ms:.0f} ms "
+                   f"against the {country} {st.session_state.tax_year} slabs (HRA exemption not included). "
+                   f"These deductions are interchangeable: any split of the same total within the limits "
+                   f"saves the same tax; rows fill them in the order shown.")
+        most = optimization.front[-1]["invested"]
+        budget = st.slider("How much could you invest or insure this year?", 0, int(most), int(most),
+                           step=max(int(most) // 100, 1))
+        best = optimization.best_within(budget)
+        if best:
+            st.metric("Best tax saving for that budget", format_amount(best["tax_saved"], country),
+                      help="Tax before: " + format_amount(optimization.baseline_tax, country)
+                           + ", after: " + format_amount(best["tax"], country))
+            st.write(", ".join(f"{lever.label}: {format_amount(best[lever.key], country)}"
+                               for lever in optimization.levers))
+        st.dataframe(optimization.table(), hide_index=True, use_container_width=True)
 
     st.markdown("---")
     st.success("I hope this analysis is useful!")
@@ -172,25 +505,43 @@ elif st.session_state.step == "showing_report":
     confirmed_data = st.session_state.get("parsed_data", {})
     final_report_text = st.session_state.get("final_report", "")
 
-    # Generate the PDF bytes
-    with st.spinner("Generating downloadable PDF..."):
-        pdf_bytes = generate_pdf_report(
-            confirmed_data=confirmed_data,
-            final_report=final_report_text,
-            payslip_text=payslip_text,
-            country=st.session_state.country,
-            tax_year=st.session_state.tax_year,
-            title="Salary Analyzer & Tax Opportunity Report"
-        )
+    # The PDF is memoized by its inputs, so reruns (including the one the
+    # download button triggers) reuse the bytes instead of rebuilding them.
+    store = get_artifact_store()
+    scenarios = optimization.table(limit=12) if optimization and len(optimization.front) > 1 else None
+    pdf_key = artifact_key(confirmed_data, final_report_text, payslip_text,
+                           st.session_state.country, st.session_state.tax_year,
+                           annualize_factor=st.session_state.annualize_factor, scenarios=scenarios)
+
+    def build_pdf():
+        from pdf_report import generate_pdf_report
 
-    # Filename with timestamp
+        with st.spinner("Generating downloadable PDF..."):
+            return generate_pdf_report(
+                confirmed_data=confirmed_data,
+                final_report=final_report_text,
+                payslip_text=payslip_text,
+                country=st.session_state.country,
+                tax_year=st.session_state.tax_year,
+                title="Salary Analyzer & Tax Opportunity Report",
+                scenarios=scenarios,
+            )
+
+    # Filename with timestamp (fixed when the PDF is first built)
     try:
         tz = ZoneInfo("Asia/Kolkata")
         timestamp = datetime.now(tz).strftime("%Y%m%d_%H%M%S")
     except Exception:
         timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
 
-    filename = f"salary_report_{timestamp}.pdf"
+    pdf_bytes = store.get_or_create(
+        pdf_key, build_pdf,
+        filename=f"salary_report_{timestamp}.pdf",
+        label=f"{st.session_state.country} {st.session_state.tax_year} — {timestamp}",
+    )
+    if pdf_key not in st.session_state.artifact_keys:
+        st.session_state.artifact_keys.append(pdf_key)
+    filename = (store.describe(pdf_key) or {}).get("filename", f"salary_report_{timestamp}.pdf")
 
     st.download_button(
         label="📥 Download PDF Report",
@@ -201,3 +552,9 @@ elif st.session_state.step == "showing_report":
 
     if st.button("Analyze Another Payslip"):
         start_over()
+
+# --- Background warm-up ---
+# Once the page has been sent, load what later steps need (openai, reportlab
+# and the PDF fonts, numpy, pypdf) in a background thread, once per server
+# process, so step 3 rarely waits on imports. STARTUP_WARMUP=0 turns it off.
+start_warmup()
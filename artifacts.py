@@ -0,0 +1,221 @@
+"""
+Memoized store for rendered report artifacts (PDF bytes).
+
+Artifacts are content-addressed by a hash of everything that goes into the
+PDF (confirmed data, report text, payslip text, country, tax year, annualize
+factor and what-if scenarios), so a
+Streamlit rerun, including the one triggered by the download button, gets
+the existing bytes back instead of rebuilding the PDF.
+
+Memory is bounded by total bytes with LRU eviction. When a spill directory
+is configured, evicted artifacts are written there (also bounded) and
+transparently loaded back on access, so earlier reports stay downloadable.
+Each store spills into its own subdirectory (named by pid and a random
+suffix), so app workers and the service sharing one spill directory never
+touch each other's files; a store removes only its own subdirectory.
+
+Environment variables:
+    ARTIFACT_MAX_BYTES        in-memory budget, default 64 MB
+    ARTIFACT_SPILL_DIR        spill directory, default .artifacts/ ("" = no spill)
+    ARTIFACT_MAX_DISK_BYTES   spill budget, default 512 MB
+"""
+import atexit
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from cache import canonical_json
+
+DEFAULT_SPILL_DIR = os.path.join(os.path.dirname(__file__), ".artifacts")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 * 1024
+
+
+def artifact_key(confirmed_data: dict, final_report: str, payslip_text: str | None,
+                 country: str, tax_year: str, kind: str = "pdf", annualize_factor: int = 12,
+                 scenarios: list | None = None) -> str:
+    """Content hash of the inputs that determine a rendered report."""
+    material = canonical_json([kind, confirmed_data or {}, final_report or "", payslip_text or "",
+                               str(country), str(tax_year), int(annualize_factor), scenarios or []])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Artifact:
+    """Metadata of one stored artifact; `data` is None while it is spilled to disk."""
+    key: str
+    size: int
+    created: float
+    metadata: dict = field(default_factory=dict)
+    data: bytes | None = None
+    path: str | None = None
+
+    def describe(self) -> dict:
+        return {"key": self.key, "size": self.size, "created": self.created,
+                "in_memory": self.data is not None, **self.metadata}
+
+
+class ArtifactStore:
+    """Thread-safe, byte-bounded LRU of artifacts with optional disk spill."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, spill_dir: str | None = DEFAULT_SPILL_DIR,
+                 max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES):
+        self.max_bytes = max_bytes
+        # Private to this store; the configured directory may be shared between processes.
+        self.spill_dir = os.path.join(spill_dir, f"{os.getpid()}-{uuid.uuid4().hex[:8]}") if spill_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()  # key -> Artifact, least recently used first
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.RLock()
+        self._building = {}  # key -> Lock, so concurrent reruns build once
+        self.hits = 0
+        self.misses = 0
+        if self.spill_dir:
+            atexit.register(self.close)
+
+    # --- internal (lock held) ---
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{key}.bin")
+
+    def _evict(self):
+        while self._memory_bytes > self.max_bytes:
+            victim = next((a for a in self._entries.values() if a.data is not None), None)
+            if victim is None or victim is next(reversed(self._entries.values())):
+                # Never evict the artifact that was just used.
+                break
+            self._memory_bytes -= victim.size
+            if self.spill_dir and victim.size <= self.max_disk_bytes:
+                if victim.path is None:
+                    os.makedirs(self.spill_dir, exist_ok=True)
+                    path = self._spill_path(victim.key)
+                    tmp_path = f"{path}.tmp"
+                    with open(tmp_path, "wb") as f:
+                        f.write(victim.data)
+                    os.replace(tmp_path, path)
+                    victim.path = path
+                    self._disk_bytes += victim.size
+                victim.data = None
+            else:
+                del self._entries[victim.key]
+        while self._disk_bytes > self.max_disk_bytes:
+            victim = next((a for a in self._entries.values() if a.path is not None and a.data is None), None)
+            if victim is None:
+                break
+            self._drop(victim)
+
+    def _drop(self, artifact: Artifact):
+        self._entries.pop(artifact.key, None)
+        if artifact.data is not None:
+            self._memory_bytes -= artifact.size
+        if artifact.path is not None:
+            self._disk_bytes -= artifact.size
+            try:
+                os.remove(artifact.path)
+            except FileNotFoundError:
+                pass
+
+    # --- public API ---
+
+    def get(self, key: str) -> bytes | None:
+        return self._get(key, count=True)
+
+    def _get(self, key: str, count: bool) -> bytes | None:
+        with self._lock:
+            artifact = self._entries.get(key)
+            if artifact is None:
+                self.misses += count
+                return None
+            self._entries.move_to_end(key)
+            if artifact.data is None:
+                try:
+                    with open(artifact.path, "rb") as f:
+                        artifact.data = f.read()
+                except OSError:
+                    # Spill file removed behind our back.
+                    self._drop(artifact)
+                    self.misses += count
+                    return None
+                self._memory_bytes += artifact.size
+                self._evict()
+            self.hits += count
+            return artifact.data
+
+    def put(self, key: str, data: bytes, **metadata) -> Artifact:
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                self._drop(existing)
+            artifact = Artifact(key=key, size=len(data), created=time.time(), metadata=metadata, data=data)
+            self._entries[key] = artifact
+            self._memory_bytes += artifact.size
+            self._evict()
+            return artifact
+
+    def get_or_create(self, key: str, factory, **metadata) -> bytes:
+        """Return the stored bytes for `key`, calling factory() once if missing."""
+        data = self.get(key)
+        if data is not None:
+            return data
+        with self._lock:
+            build_lock = self._building.setdefault(key, threading.Lock())
+        with build_lock:
+            data = self._get(key, count=False)
+            if data is None:
+                data = factory()
+                self.put(key, data, **metadata)
+        with self._lock:
+            self._building.pop(key, None)
+        return data
+
+    def describe(self, key: str) -> dict | None:
+        with self._lock:
+            artifact = self._entries.get(key)
+            return artifact.describe() if artifact else None
+
+    def list(self, keys=None) -> list:
+        """Metadata of stored artifacts (optionally only `keys`), newest first."""
+        with self._lock:
+            artifacts = [self._entries[k] for k in keys if k in self._entries] if keys is not None \
+                else list(self._entries.values())
+            return [a.describe() for a in sorted(artifacts, key=lambda a: a.created, reverse=True)]
+
+    def close(self):
+        """Forget all artifacts and remove this store's spill subdirectory."""
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = self._disk_bytes = 0
+            if self.spill_dir:
+                shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._entries), "memory_bytes": self._memory_bytes,
+                    "disk_bytes": self._disk_bytes, "hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / total, 3) if total else 0.0}
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Process-wide store configured from the environment."""
+    global _default_store
+    if _default_store is None:
+        with _default_lock:
+            if _default_store is None:
+                spill_dir = os.getenv("ARTIFACT_SPILL_DIR", DEFAULT_SPILL_DIR) or None
+                _default_store = ArtifactStore(
+                    max_bytes=int(os.getenv("ARTIFACT_MAX_BYTES", DEFAULT_MAX_BYTES)),
+                    spill_dir=spill_dir,
+                    max_disk_bytes=int(os.getenv("ARTIFACT_MAX_DISK_BYTES", DEFAULT_MAX_DISK_BYTES)),
+                )
+    return _default_store
@@ -0,0 +1,290 @@
+"""
+Headless batch runner: payslip texts -> parsed JSON -> analysis report -> PDF.
+
+Runs the same parse -> analyze -> generate_pdf_report chain as app.py, but
+for a whole directory (one .txt or .pdf file per payslip), a JSONL file
+({"id": ..., "text": ...} per line) or a multi-payslip PDF export (see
+ingest.py). LLM calls run in a bounded concurrent
+stage; PDF rendering is CPU-bound and runs in a process pool.
+
+Every finished item is appended to OUTPUT_DIR/manifest.jsonl. Re-running the
+same command skips items already recorded as "ok", so a crashed run resumes
+where it stopped.
+
+Usage:
+    python batch.py payslips/ out/ --country India --tax-year 2024-25
+    python batch.py payslips.jsonl out/ --concurrency 16 --workers 8
+
+Re-rendering from recorded LLM responses (no network, no API cost; see transport.py):
+    SALARY_AGENT_TRANSPORT=record python batch.py payslips/ out/
+    SALARY_AGENT_TRANSPORT=replay python batch.py payslips/ out-v2/
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from agent import AsyncSalaryAgent
+from errors import AgentError
+from tax_rules import get_tax_rules, get_tax_rules_as_string
+
+MANIFEST_NAME = "manifest.jsonl"
+REPORT_TITLE = "Salary Analyzer & Tax Opportunity Report"
+
+logger = logging.getLogger(__name__)
+
+
+# --- Input ------------------------------------------------------------------
+
+def _safe_id(raw: str) -> str:
+    """Make an item id safe to use as a file name."""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(raw)).strip("._") or "item"
+
+
+def _iter_pdf(path: str, item_id: str):
+    from ingest import iter_payslips_from_pdf
+
+    slips = iter_payslips_from_pdf(path)
+    first = next(slips, None)
+    if first is None:
+        return
+    second = next(slips, None)
+    if second is None:
+        yield item_id, first[1]
+        return
+    for first_page, text in (first, second, *slips):
+        yield f"{item_id}_p{first_page + 1}", text
+
+
+def iter_payslips(source: str):
+    """
+    Yield (item_id, payslip_text) pairs from a directory of .txt/.pdf files,
+    a PDF export or a JSONL file. Texts are read lazily, one at a time.
+
+    Ids are unique: an id already used (e.g. "a b.txt" and "a_b.txt" both
+    give "a_b", or a repeated JSONL id) gets a numeric suffix ("a_b-2"), so
+    no two items share output files or a manifest entry. Suffixes follow
+    input order, which is the same on every run over the same input.
+    """
+    seen = set()
+    for item_id, text in _iter_sources(source):
+        unique, n = item_id, 1
+        while unique in seen:
+            n += 1
+            unique = f"{item_id}-{n}"
+        if unique != item_id:
+            logger.warning("Item id %r is already used; writing this item as %r.", item_id, unique)
+        seen.add(unique)
+        yield unique, text
+
+
+def _iter_sources(source: str):
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            path = os.path.join(source, name)
+            if not os.path.isfile(path):
+                continue
+            item_id = _safe_id(os.path.splitext(name)[0])
+            if name.lower().endswith(".txt"):
+                with open(path, encoding="utf-8") as f:
+                    yield item_id, f.read()
+            elif name.lower().endswith(".pdf"):
+                yield from _iter_pdf(path, item_id)
+        return
+
+    if source.lower().endswith(".pdf"):
+        yield from _iter_pdf(source, _safe_id(os.path.splitext(os.path.basename(source))[0]))
+        return
+
+    with open(source, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            yield _safe_id(record.get("id", line_no)), record["text"]
+
+
+# --- Manifest ---------------------------------------------------------------
+
+def load_completed(manifest_path: str) -> set:
+    """Ids already recorded as successfully completed."""
+    done = set()
+    if not os.path.exists(manifest_path):
+        return done
+    with open(manifest_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn final line from a crash; that item is simply redone.
+                continue
+            if entry.get("status") == "ok":
+                done.add(entry["id"])
+            else:
+                done.discard(entry["id"])
+    return done
+
+
+class Manifest:
+    """Append-only JSONL manifest; each entry is flushed to disk immediately."""
+
+    def __init__(self, path: str):
+        self._f = open(path, "a", encoding="utf-8")
+
+    def write(self, entry: dict):
+        self._f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self):
+        self._f.close()
+
+
+def _write_atomic(path: str, data, mode: str = "w"):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+# --- PDF stage (runs in worker processes) -----------------------------------
+
+def _render_pdf(job: dict) -> str:
+    """Render one PDF to disk. Module-level so it can be pickled to workers."""
+    from pdf_report import generate_pdf_report
+
+    pdf_bytes = generate_pdf_report(
+        confirmed_data=job["confirmed_data"],
+        final_report=job["final_report"],
+        payslip_text=job["payslip_text"],
+        country=job["country"],
+        tax_year=job["tax_year"],
+        title=REPORT_TITLE,
+    )
+    _write_atomic(job["pdf_path"], pdf_bytes, mode="wb")
+    return job["pdf_path"]
+
+
+# --- Pipeline ---------------------------------------------------------------
+
+async def _process_item(item_id, payslip_text, args, agent, semaphore, pool, tax_rules_string, manifest):
+    started = time.perf_counter()
+    entry = {"id": item_id, "status": "ok"}
+    stage = "parse"
+    try:
+        # LLM stage: bounded so we never exceed the provider concurrency budget.
+        async with semaphore:
+            parsed = await agent.parse_payslip_text(payslip_text)
+            stage = "analyze"
+            if args.numbers_only:
+                report = agent.generate_numbers_only_report(parsed, args.country, args.tax_year)
+            else:
+                report = await agent.generate_analysis_report(
+                    parsed, args.country, args.tax_year, tax_rules_string
+                )
+
+        stage = "write"
+        json_path = os.path.join(args.output_dir, f"{item_id}.json")
+        _write_atomic(json_path, json.dumps(
+            {"id": item_id, "confirmed_data": parsed, "report": report}, indent=2, ensure_ascii=False
+        ))
+        entry["json"] = os.path.basename(json_path)
+
+        if not args.no_pdf:
+            # CPU stage: offloaded so PDF building uses every core.
+            stage = "render"
+            pdf_path = os.path.join(args.output_dir, f"{item_id}.pdf")
+            await asyncio.get_running_loop().run_in_executor(pool, _render_pdf, {
+                "confirmed_data": parsed,
+                "final_report": report,
+                "payslip_text": payslip_text,
+                "country": args.country,
+                "tax_year": args.tax_year,
+                "pdf_path": pdf_path,
+            })
+            entry["pdf"] = os.path.basename(pdf_path)
+    except AgentError as e:
+        entry.update(status="error", stage=stage, error=str(e))
+    except Exception as e:
+        entry.update(status="error", stage=stage, error=f"{type(e).__name__}: {e}")
+
+    entry["elapsed_s"] = round(time.perf_counter() - started, 3)
+    manifest.write(entry)
+    return entry
+
+
+async def run_batch(args) -> dict:
+    """Process every pending item and return a summary of the run."""
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest_path = os.path.join(args.output_dir, MANIFEST_NAME)
+    completed = load_completed(manifest_path)
+
+    tax_rules_string = get_tax_rules_as_string(args.country, args.tax_year)
+    agent = AsyncSalaryAgent(max_concurrency=args.concurrency)
+    semaphore = asyncio.Semaphore(agent.max_concurrency)
+    manifest = Manifest(manifest_path)
+    summary = {"ok": 0, "error": 0, "skipped": 0}
+
+    try:
+        # Spawned, not forked: the agent runs its steps in threads, which a
+        # forked worker would inherit mid-flight.
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            pending = set()
+            for item_id, payslip_text in iter_payslips(args.input):
+                if item_id in completed:
+                    summary["skipped"] += 1
+                    continue
+                pending.add(asyncio.create_task(_process_item(
+                    item_id, payslip_text, args, agent, semaphore, pool, tax_rules_string, manifest
+                )))
+                # Keep only a bounded window of texts in memory at a time.
+                if len(pending) >= agent.max_concurrency * 4:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        summary[task.result()["status"]] += 1
+            for task in asyncio.as_completed(pending):
+                summary[(await task)["status"]] += 1
+    finally:
+        manifest.close()
+
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Batch payslip parse -> analysis -> PDF runner.")
+    parser.add_argument("input", help="Directory of .txt/.pdf payslips, a PDF export, or a JSONL file of "
+                                      "{\"id\", \"text\"} records.")
+    parser.add_argument("output_dir", help="Directory for JSON/PDF outputs and manifest.jsonl.")
+    parser.add_argument("--country", default="India")
+    parser.add_argument("--tax-year", default="2024-25")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="Max concurrent LLM requests (default: AGENT_MAX_CONCURRENCY or 8).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="PDF rendering processes (default: all cores).")
+    parser.add_argument("--no-pdf", action="store_true", help="Skip PDF rendering.")
+    parser.add_argument("--numbers-only", action="store_true",
+                        help="Skip the analysis LLM call; report only the locally computed figures.")
+    args = parser.parse_args(argv)
+
+    if not get_tax_rules(args.country, args.tax_year):
+        print(f"No tax rules found for {args.country} {args.tax_year}.", file=sys.stderr)
+        return 2
+
+    started = time.perf_counter()
+    summary = asyncio.run(run_batch(args))
+    elapsed = time.perf_counter() - started
+    print(f"Done in {elapsed:.1f}s: {summary['ok']} ok, {summary['error']} failed, "
+          f"{summary['skipped']} skipped (already done). Manifest: "
+          f"{os.path.join(args.output_dir, MANIFEST_NAME)}")
+    return 1 if summary["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
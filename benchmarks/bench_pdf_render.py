@@ -0,0 +1,63 @@
+"""
+Throughput benchmark for pdf_report.generate_pdf_report.
+
+Compares rendering with a fresh PdfRenderContext per call (the old behaviour:
+stylesheet and static flowables rebuilt every time) against the shared,
+reused context.
+
+Usage:
+    python benchmarks/bench_pdf_render.py [--reports 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from pdf_report import PdfRenderContext, generate_pdf_report, get_render_context  # noqa: E402
+
+CONFIRMED_DATA = {
+    "basic_salary": 50000,
+    "house_rent_allowance": 20000,
+    "employee_pf_contribution": 6000,
+    "professional_tax": 200,
+}
+PAYSLIP_TEXT = "Basic Salary: 50,000\nHRA: 20,000\nEmployee PF: 6,000\nProfessional Tax: 200"
+REPORT = """### Analysis complete. Here is your Personalized Tax Opportunity Report:
+
+## Section 1: Your Existing Tax Savings (Already Active)
+- **Standard Deduction:** ₹50,000
+- **Employee's PF Contribution:** ₹72,000 (6,000 x 12)
+
+## Section 2: Potential Optimization Areas (To Explore)
+- **80C gap:** ₹78,000 (1,50,000 - 72,000)
+"""
+
+
+def _render(context):
+    return generate_pdf_report(CONFIRMED_DATA, REPORT, PAYSLIP_TEXT, "India", "2024-25", context=context)
+
+
+def bench(label, make_context, n):
+    _render(make_context())  # warm-up (font registration, imports)
+    started = time.perf_counter()
+    for _ in range(n):
+        _render(make_context())
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {n / elapsed:8.1f} reports/s   {elapsed / n * 1000:7.2f} ms/report")
+    return n / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--reports", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    before = bench("fresh context per call", PdfRenderContext, args.reports)
+    after = bench("shared render context", get_render_context, args.reports)
+    print(f"speed-up: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Synthetic payslip corpus for benchmarks.
+
+Generates payslip texts with known ground truth, varying:
+  - layout:  "colon" (Label: value), "table" (padded columns), "pipe"
+             (| Label | value |) and "two_column" (earnings and deductions
+             side by side)
+  - labels:  synonyms drawn from local_parser.FIELD_SYNONYMS
+  - size:    "small" (components only), "medium" and "large" (employee
+             details, extra earnings/deductions and footer noise)
+  - period:  monthly figures, or annual figures with an annual header
+
+Generation is seeded, so the same arguments always yield the same corpus.
+
+Usage:
+    python benchmarks/corpus.py --count 5 --seed 1
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from local_parser import FIELD_SYNONYMS  # noqa: E402
+
+LAYOUTS = ("colon", "table", "pipe", "two_column")
+SIZES = ("small", "medium", "large")
+
+_EARNINGS = ("basic_salary", "house_rent_allowance", "leave_travel_allowance", "special_allowance")
+_DEDUCTIONS = ("employee_pf_contribution", "professional_tax")
+
+_EXTRA_EARNINGS = ("Conveyance Allowance", "Medical Allowance", "Overtime", "Shift Allowance",
+                   "Performance Bonus", "Meal Coupons", "Internet Reimbursement")
+_EXTRA_DEDUCTIONS = ("Income Tax (TDS)", "Labour Welfare Fund", "Canteen Charges", "Loan Recovery",
+                     "Group Term Insurance")
+_DETAIL_LINES = ("Employee Name: XXXXX XXXXX", "Employee Code: EMP{n:05d}", "Department: Engineering",
+                 "Designation: Senior Engineer", "Bank: XXXX BANK", "Location: Bengaluru",
+                 "Days Paid: 30", "LOP Days: 0", "Date of Joining: 01-04-2019")
+_FOOTER_LINES = ("This is a computer generated payslip and does not require a signature.",
+                 "Please report discrepancies to payroll within 7 days.",
+                 "Net pay has been credited to your registered bank account.")
+
+
+def _format_amount(value: float, rng: random.Random) -> str:
+    whole = int(round(value))
+    style = rng.choice(("western", "indian", "plain", "rupee"))
+    if style == "plain":
+        return str(whole)
+    digits = str(whole)
+    if style == "indian" and len(digits) > 3:
+        head, tail = digits[:-3], digits[-3:]
+        groups = []
+        while len(head) > 2:
+            groups.insert(0, head[-2:])
+            head = head[:-2]
+        if head:
+            groups.insert(0, head)
+        text = ",".join(groups + [tail])
+    else:
+        text = f"{whole:,}"
+    return f"Rs. {text}" if style == "rupee" else text
+
+
+def _components(rng: random.Random) -> dict:
+    basic = rng.randrange(15000, 200000, 500)
+    values = {
+        "basic_salary": basic,
+        "house_rent_allowance": round(basic * rng.choice((0.4, 0.5))),
+        "employee_pf_contribution": min(round(basic * 0.12), 1800) if rng.random() < 0.3 else round(basic * 0.12),
+        "professional_tax": rng.choice((200, 208, 300)),
+    }
+    if rng.random() < 0.7:
+        values["special_allowance"] = rng.randrange(2000, 80000, 250)
+    if rng.random() < 0.4:
+        values["leave_travel_allowance"] = rng.randrange(1000, 10000, 250)
+    return values
+
+
+def _label(field: str, rng: random.Random) -> str:
+    label = rng.choice(FIELD_SYNONYMS[field])
+    return label.upper() if len(label) <= 4 else label.title()
+
+
+def _render(rows_earn, rows_ded, layout):
+    lines = []
+    if layout == "colon":
+        lines.append("Earnings")
+        lines += [f"{label}: {amount}" for label, amount in rows_earn]
+        lines.append("Deductions")
+        lines += [f"{label}: {amount}" for label, amount in rows_ded]
+    elif layout == "table":
+        lines.append(f"{'Earnings':<32}{'Amount':>14}")
+        lines += [f"{label:<32}{amount:>14}" for label, amount in rows_earn]
+        lines.append(f"{'Deductions':<32}{'Amount':>14}")
+        lines += [f"{label:<32}{amount:>14}" for label, amount in rows_ded]
+    elif layout == "pipe":
+        lines.append("| Component | Amount |")
+        lines.append("|---|---|")
+        lines += [f"| {label} | {amount} |" for label, amount in rows_earn + rows_ded]
+    else:  # two_column: one earning and one deduction per line
+        lines.append(f"{'Earnings':<28}{'Amount':>12}    {'Deductions':<28}{'Amount':>12}")
+        for i in range(max(len(rows_earn), len(rows_ded))):
+            left = rows_earn[i] if i < len(rows_earn) else ("", "")
+            right = rows_ded[i] if i < len(rows_ded) else ("", "")
+            lines.append(f"{left[0]:<28}{left[1]:>12}    {right[0]:<28}{right[1]:>12}".rstrip())
+    return lines
+
+
+def generate_payslip(rng: random.Random, layout: str = None, size: str = None, annual: bool = None):
+    """
+    One synthetic payslip. Returns (text, expected) where `expected` holds the
+    monthly PayslipComponents values and the generation parameters.
+    """
+    layout = layout or rng.choice(LAYOUTS)
+    size = size or rng.choice(SIZES)
+    annual = rng.random() < 0.2 if annual is None else annual
+    values = _components(rng)
+    factor = 12 if annual else 1
+
+    rows_earn, rows_ded = [], []
+    for field in _EARNINGS:
+        if field in values:
+            rows_earn.append((_label(field, rng), _format_amount(values[field] * factor, rng)))
+    for field in _DEDUCTIONS:
+        rows_ded.append((_label(field, rng), _format_amount(values[field] * factor, rng)))
+
+    if size != "small":
+        extra = 2 if size == "medium" else len(_EXTRA_EARNINGS)
+        rows_earn += [(label, _format_amount(rng.randrange(500, 20000, 50) * factor, rng))
+                      for label in rng.sample(_EXTRA_EARNINGS, extra)]
+        extra = 1 if size == "medium" else len(_EXTRA_DEDUCTIONS)
+        rows_ded += [(label, _format_amount(rng.randrange(100, 15000, 50) * factor, rng))
+                     for label in rng.sample(_EXTRA_DEDUCTIONS, extra)]
+
+    header = ["ACME TECHNOLOGIES PVT LTD",
+              "Annual Salary Statement (per annum)" if annual else "Payslip for the month of March 2025"]
+    if size != "small":
+        details = _DETAIL_LINES if size == "large" else _DETAIL_LINES[:3]
+        header += [line.format(n=rng.randrange(100000)) for line in details]
+    body = _render(rows_earn, rows_ded, layout)
+    footer = list(_FOOTER_LINES) if size == "large" else []
+
+    text = "\n".join(header + [""] + body + [""] + footer).strip()
+    expected = {"components": values, "layout": layout, "size": size, "annual": annual}
+    return text, expected
+
+
+def generate_corpus(count: int, seed: int = 0, **kwargs) -> list:
+    """`count` payslips as a list of (text, expected) pairs."""
+    rng = random.Random(seed)
+    return [generate_payslip(rng, **kwargs) for _ in range(count)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print synthetic payslips.")
+    parser.add_argument("--count", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--layout", choices=LAYOUTS)
+    parser.add_argument("--size", choices=SIZES)
+    args = parser.parse_args()
+    for text, expected in generate_corpus(args.count, args.seed, layout=args.layout, size=args.size):
+        print(f"# {expected}\n{text}\n")
@@ -0,0 +1,147 @@
+"""
+In-process stand-in for the OpenAI chat-completions client, so SalaryAgent
+and AsyncSalaryAgent can be exercised fully offline.
+
+    agent = SalaryAgent(client=FakeOpenAI(latency_s=0.05))
+
+Parsing requests (those with `tools`) get a PayslipComponents tool call built
+by extracting the payslip with local_parser. Analysis requests get a fixed
+Markdown report that reuses the "Precomputed Figures" block when present.
+Streaming is supported (including a final usage chunk). Latency is simulated
+as a fixed delay plus an optional per-output-token delay.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from local_parser import parse_payslip_locally  # noqa: E402
+from tokens import count_tokens, estimate_request_tokens  # noqa: E402
+
+_REPORT_TEMPLATE = """### Analysis complete. Here is your Personalized Tax Opportunity Report:
+
+## Section 1: Your Existing Tax Savings (Already Active)
+{section_1}
+
+## Section 2: Potential Optimization Areas (To Explore)
+{section_2}
+
+## Section 3: Recommended Next Steps
+- Review the 80C gap above before the end of the financial year.
+- Keep rent receipts ready if you plan to claim the HRA exemption.
+- Compare the old and new regimes with the figures above.
+"""
+
+
+def _payslip_from_messages(messages) -> str:
+    content = messages[-1]["content"]
+    return content.split("\n\n", 1)[1] if "\n\n" in content else content
+
+
+def _report_from_messages(messages) -> str:
+    content = messages[-1]["content"]
+    section_1, section_2 = [], []
+    if "Precomputed Figures" in content:
+        for line in content.split("Precomputed Figures", 1)[1].splitlines()[1:]:
+            if line.startswith("- [S1] "):
+                section_1.append("- **" + line[7:].replace(": ", ":** ", 1))
+            elif line.startswith("- [S2] "):
+                section_2.append("- **" + line[7:].replace(": ", ":** ", 1))
+    return _REPORT_TEMPLATE.format(
+        section_1="\n".join(section_1) or "- No active deductions were detected.",
+        section_2="\n".join(section_2) or "- No optimization areas were detected.",
+    )
+
+
+class _Completions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def _respond(self, kwargs):
+        owner = self._owner
+        owner.calls += 1
+        prompt_tokens = estimate_request_tokens(kwargs)
+        if kwargs.get("tools"):
+            components = parse_payslip_locally(_payslip_from_messages(kwargs["messages"])).components
+            arguments = json.dumps(components)
+            message = SimpleNamespace(
+                content=None,
+                tool_calls=[SimpleNamespace(
+                    id="call_fake", type="function",
+                    function=SimpleNamespace(name=kwargs["tool_choice"]["function"]["name"], arguments=arguments),
+                )],
+            )
+            completion_tokens = count_tokens(arguments)
+        else:
+            text = _report_from_messages(kwargs["messages"])
+            message = SimpleNamespace(content=text, tool_calls=None)
+            completion_tokens = count_tokens(text)
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                total_tokens=prompt_tokens + completion_tokens)
+        return message, usage
+
+    def _delay(self, completion_tokens: int) -> float:
+        return self._owner.latency_s + completion_tokens * self._owner.per_token_s
+
+    def _chunks(self, message, usage):
+        text = message.content or ""
+        step = self._owner.chunk_chars
+        for start in range(0, len(text), step):
+            delta = SimpleNamespace(content=text[start:start + step])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta, index=0)], usage=None)
+        yield SimpleNamespace(choices=[], usage=usage)
+
+    def create(self, **kwargs):
+        message, usage = self._respond(kwargs)
+        if kwargs.get("stream"):
+            return self._stream(message, usage)
+        time.sleep(self._delay(usage.completion_tokens))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=usage)
+
+    def _stream(self, message, usage):
+        time.sleep(self._owner.latency_s)
+        chunks = list(self._chunks(message, usage))
+        for chunk in chunks:
+            if self._owner.per_token_s and chunk.choices:
+                time.sleep(count_tokens(chunk.choices[0].delta.content) * self._owner.per_token_s)
+            yield chunk
+
+
+class _AsyncCompletions(_Completions):
+    async def create(self, **kwargs):
+        message, usage = self._respond(kwargs)
+        if kwargs.get("stream"):
+            return self._astream(message, usage)
+        await asyncio.sleep(self._delay(usage.completion_tokens))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=usage)
+
+    async def _astream(self, message, usage):
+        await asyncio.sleep(self._owner.latency_s)
+        for chunk in self._chunks(message, usage):
+            if self._owner.per_token_s and chunk.choices:
+                await asyncio.sleep(count_tokens(chunk.choices[0].delta.content) * self._owner.per_token_s)
+            yield chunk
+
+
+class FakeOpenAI:
+    """Drop-in for `openai.OpenAI` as used by SalaryAgent (chat.completions.create only)."""
+
+    _completions_class = _Completions
+
+    def __init__(self, latency_s: float = 0.0, per_token_s: float = 0.0, chunk_chars: int = 16):
+        self.api_key = "fake-key"
+        self.latency_s = latency_s
+        self.per_token_s = per_token_s
+        self.chunk_chars = chunk_chars
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=self._completions_class(self))
+
+
+class FakeAsyncOpenAI(FakeOpenAI):
+    """Drop-in for `openai.AsyncOpenAI` as used by AsyncSalaryAgent."""
+
+    _completions_class = _AsyncCompletions
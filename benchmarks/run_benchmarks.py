@@ -0,0 +1,177 @@
+"""
+Benchmark suite: parse, analysis, Markdown -> flowables and PDF rendering.
+
+Runs fully offline against benchmarks/fake_openai.py over a seeded synthetic
+corpus (benchmarks/corpus.py), so numbers are reproducible. Each case
+reports throughput (ops/s) and p50/p95 latency in ms; the simulated LLM
+latency defaults to 0 so the numbers measure this code, not the network.
+
+Results are compared with benchmarks/baseline.json and the run exits with
+status 1 if any case is slower than the baseline by more than --tolerance
+(throughput lower, or p95 higher). Baselines are machine-specific: refresh
+them with --update-baseline on the machine that runs the check.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --cases parse.llm,pdf.render --iterations 200
+    python benchmarks/run_benchmarks.py --update-baseline
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+# Benchmarks must not append to the app's span log.
+os.environ.setdefault("TRACE_SINK", "none")
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from corpus import generate_corpus  # noqa: E402
+from fake_openai import FakeOpenAI  # noqa: E402
+
+from agent import SalaryAgent  # noqa: E402
+from pdf_report import _markdown_to_flowables, generate_pdf_report, get_render_context  # noqa: E402
+from tax_rules import get_tax_rules_as_string  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+COUNTRY, TAX_YEAR = "India", "2024-25"
+
+
+class _NoCache:
+    """Cache stand-in that always misses, so every iteration does the real work."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+
+def _percentile(sorted_values, pct):
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def measure(func, inputs, iterations: int, warmup: int = 3) -> dict:
+    """Call func(item) `iterations` times, cycling through `inputs`."""
+    for i in range(min(warmup, iterations)):
+        func(inputs[i % len(inputs)])
+    timings = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        func(inputs[i % len(inputs)])
+        timings.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        "iterations": iterations,
+        "ops_per_s": round(iterations / elapsed, 2),
+        "p50_ms": round(_percentile(timings, 50), 3),
+        "p95_ms": round(_percentile(timings, 95), 3),
+    }
+
+
+# --- Cases --------------------------------------------------------------------
+
+def build_cases(corpus_size: int, seed: int, latency_s: float) -> dict:
+    """name -> (callable, inputs)"""
+    corpus = generate_corpus(corpus_size, seed=seed)
+    texts = [text for text, _ in corpus]
+    client = FakeOpenAI(latency_s=latency_s)
+    fast_agent = SalaryAgent(cache=_NoCache(), client=client)
+    llm_agent = SalaryAgent(fast_path_threshold=2.0, cache=_NoCache(), client=client)
+
+    confirmed = [expected["components"] for _, expected in corpus]
+    rules_string = get_tax_rules_as_string(COUNTRY, TAX_YEAR)
+    reports = [llm_agent.generate_analysis_report(data, COUNTRY, TAX_YEAR, rules_string) for data in confirmed]
+    styles = get_render_context().styles
+
+    return {
+        # Local fast path first, LLM fallback only below the confidence threshold.
+        "parse.fast_path": (fast_agent.parse_payslip_text, texts),
+        # Always the (fake) LLM: request building, tool-call validation, accounting.
+        "parse.llm": (llm_agent.parse_payslip_text, texts),
+        "analysis": (lambda data: llm_agent.generate_analysis_report(data, COUNTRY, TAX_YEAR, rules_string),
+                     confirmed),
+        "analysis.stream": (lambda data: "".join(llm_agent.stream_analysis_report(
+            data, COUNTRY, TAX_YEAR, rules_string)), confirmed),
+        "pdf.markdown_to_flowables": (lambda report: _markdown_to_flowables(report, styles), reports),
+        "pdf.render": (lambda i: generate_pdf_report(confirmed[i], reports[i], texts[i], COUNTRY, TAX_YEAR),
+                       list(range(len(texts)))),
+    }
+
+
+# --- Baseline -------------------------------------------------------------------
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regression messages for cases that are slower than baseline beyond tolerance."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result["ops_per_s"] < base["ops_per_s"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['ops_per_s']} ops/s vs baseline {base['ops_per_s']}")
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {result['p95_ms']} ms vs baseline {base['p95_ms']}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmark suite with regression check.")
+    parser.add_argument("--cases", help="Comma-separated case names (default: all).")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--corpus-size", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated LLM latency in seconds.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown vs baseline before failing (0.25 = 25%%).")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Write these results as the new baseline.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args(argv)
+
+    cases = build_cases(args.corpus_size, args.seed, args.latency)
+    selected = args.cases.split(",") if args.cases else list(cases)
+    unknown = [name for name in selected if name not in cases]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}; available: {', '.join(cases)}")
+
+    results = {}
+    for name in selected:
+        func, inputs = cases[name]
+        results[name] = measure(func, inputs, args.iterations)
+        if not args.json:
+            r = results[name]
+            print(f"{name:<28} {r['ops_per_s']:10.1f} ops/s   p50 {r['p50_ms']:8.3f} ms   p95 {r['p95_ms']:8.3f} ms")
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --update-baseline to create one.")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
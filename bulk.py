@@ -0,0 +1,249 @@
+"""
+Bulk payroll runner for structured exports (CSV or Parquet).
+
+Employer payroll data is already tabular, so there is no text parsing and
+no LLM call: columns are mapped onto PayslipComponents fields, the export is
+streamed in fixed-size chunks, and the tax rules are evaluated for a whole
+chunk at once with array operations (tax_engine.compute_columns). Chunks are
+spread over a process pool with a bounded number in flight, and results are
+written back per employee, in input order, as a Parquet or CSV file.
+Memory use is bounded by chunk size x chunks in flight, not by file size.
+
+Columns are matched by field name or payslip label synonym ("Basic Pay",
+"HRA", "PF", ...); use --map to map anything else. Values are monthly unless
+--annual is given.
+
+Usage:
+    python bulk.py payroll.csv results.parquet --country India --tax-year 2024-25
+    python bulk.py payroll.parquet results.csv --map basic_salary="Basic Wage" --annual
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from local_parser import match_label, normalize_label
+from tax_engine import CompiledRuleSet
+from tax_rules import get_tax_rules
+from tools import AMOUNT_FIELDS
+
+DEFAULT_CHUNK_ROWS = 50_000
+FIELDS = AMOUNT_FIELDS
+# Columns recognized as the employee identifier, in order of preference.
+_ID_COLUMNS = ("employee id", "emp id", "employee code", "emp code", "employee no", "employee number",
+               "staff id", "id")
+
+
+# --- Column mapping -----------------------------------------------------------
+
+def map_columns(columns, overrides: dict | None = None) -> dict:
+    """
+    {field: source column} for every PayslipComponents field found among
+    `columns`. `overrides` ({field: column}) take precedence; other columns
+    match by field name or by an exact payslip label synonym.
+    """
+    overrides = dict(overrides or {})
+    unknown = set(overrides) - set(FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown PayslipComponents field(s) in mapping: {', '.join(sorted(unknown))}")
+    missing = [column for column in overrides.values() if column not in columns]
+    if missing:
+        raise ValueError(f"Mapped column(s) not in the input: {', '.join(missing)}")
+
+    mapping = dict(overrides)
+    for column in columns:
+        if column in mapping.values():
+            continue
+        name = str(column).strip().lower().replace(" ", "_")
+        field = name if name in FIELDS else None
+        if field is None:
+            field, score = match_label(normalize_label(str(column)))
+            field = field if score == 1.0 else None
+        if field and field not in mapping:
+            mapping[field] = column
+    return mapping
+
+
+def find_id_column(columns) -> str | None:
+    by_label = {normalize_label(str(c)): c for c in columns}
+    return next((by_label[label] for label in _ID_COLUMNS if label in by_label), None)
+
+
+# --- Input ----------------------------------------------------------------------
+
+def _is_parquet(path: str) -> bool:
+    return path.lower().endswith((".parquet", ".pq"))
+
+
+def _parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet files need pyarrow (pip install pyarrow).") from e
+    return pq
+
+
+def read_columns(path: str) -> list:
+    if _is_parquet(path):
+        return list(_parquet().ParquetFile(path).schema_arrow.names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def iter_chunks(path: str, columns: list, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+    """Yield DataFrames of at most `chunk_rows` rows with only `columns` loaded."""
+    if _is_parquet(path):
+        for batch in _parquet().ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+
+
+# --- Chunk evaluation (runs in worker processes) --------------------------------
+
+def process_chunk(job) -> pd.DataFrame:
+    """
+    Evaluate one chunk. `job` is (frame, mapping, id_column, country,
+    tax_year, rules, annualize_factor); the rules dict is passed in so every
+    worker uses the rules version the run started with.
+    """
+    frame, mapping, id_column, country, tax_year, rules, annualize_factor = job
+    columns = {field: pd.to_numeric(frame[column], errors="coerce").to_numpy(dtype=np.float64)
+               for field, column in mapping.items()}
+    figures = CompiledRuleSet(country, tax_year, rules).compute_columns(columns, annualize_factor)
+
+    out = {}
+    if id_column is not None:
+        out["employee_id"] = frame[id_column].to_numpy()
+    out.update(columns)
+    out.update(figures)
+    return pd.DataFrame(out, index=frame.index)
+
+
+# --- Output ---------------------------------------------------------------------
+
+class ResultWriter:
+    """Appends result chunks to one Parquet (row group per chunk) or CSV file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self._parquet_writer = None
+        self._tmp_path = f"{path}.{os.getpid()}.tmp"
+
+    def write(self, frame: pd.DataFrame):
+        if _is_parquet(self.path):
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = _parquet().ParquetWriter(self._tmp_path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            frame.to_csv(self._tmp_path, mode="a" if self.rows else "w", header=not self.rows, index=False)
+        self.rows += len(frame)
+
+    def close(self):
+        """Finish the file and move it into place (so a failed run leaves no partial output)."""
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        if os.path.exists(self._tmp_path):
+            os.replace(self._tmp_path, self.path)
+
+    def discard(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+# --- Runner -------------------------------------------------------------------------
+
+def run_bulk(input_path: str, output_path: str, country: str, tax_year: str, overrides: dict | None = None,
+             chunk_rows: int = DEFAULT_CHUNK_ROWS, workers: int | None = None, annualize_factor: int = 12) -> dict:
+    """Stream `input_path` through the vectorized engine into `output_path`. Returns a summary dict."""
+    rules = get_tax_rules(country, tax_year)
+    if not rules:
+        raise ValueError(f"No tax rules found for {country} {tax_year}.")
+    rules = dict(rules)  # plain dict so it can be sent to worker processes
+    columns = read_columns(input_path)
+    mapping = map_columns(columns, overrides)
+    if not mapping:
+        raise ValueError("No input column matches a PayslipComponents field; use --map FIELD=COLUMN.")
+    id_column = find_id_column(columns)
+    wanted = ([id_column] if id_column else []) + [c for c in columns if c in mapping.values()]
+
+    started = time.perf_counter()
+    jobs = ((frame, mapping, id_column, country, tax_year, rules, annualize_factor)
+            for frame in iter_chunks(input_path, wanted, chunk_rows))
+    writer = ResultWriter(output_path)
+    chunks = 0
+    try:
+        if workers == 1:
+            for job in jobs:
+                writer.write(process_chunk(job))
+                chunks += 1
+        else:
+            workers = workers or os.cpu_count() or 1
+            window = workers * 2
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                for job in jobs:
+                    pending.append(pool.submit(process_chunk, job))
+                    if len(pending) >= window:
+                        writer.write(pending.popleft().result())
+                        chunks += 1
+                while pending:
+                    writer.write(pending.popleft().result())
+                    chunks += 1
+    except BaseException:
+        writer.discard()
+        raise
+    writer.close()
+
+    return {"rows": writer.rows, "chunks": chunks, "mapping": mapping, "id_column": id_column,
+            "seconds": round(time.perf_counter() - started, 3), "output": output_path}
+
+
+def _parse_mapping(pairs) -> dict:
+    mapping = {}
+    for pair in pairs or []:
+        field, sep, column = pair.partition("=")
+        if not sep:
+            raise argparse.ArgumentTypeError(f"--map expects FIELD=COLUMN, got {pair!r}")
+        mapping[field.strip()] = column.strip()
+    return mapping
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Vectorized tax figures for a CSV/Parquet payroll export.")
+    parser.add_argument("input", help="Payroll export (.csv, .parquet).")
+    parser.add_argument("output", help="Results file (.parquet or .csv), one row per employee.")
+    parser.add_argument("--country", default="India")
+    parser.add_argument("--tax-year", default="2024-25")
+    parser.add_argument("--map", action="append", metavar="FIELD=COLUMN",
+                        help="Map an input column onto a PayslipComponents field (repeatable).")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores).")
+    parser.add_argument("--annual", action="store_true", help="Input amounts are annual, not monthly.")
+    args = parser.parse_args(argv)
+
+    try:
+        summary = run_bulk(args.input, args.output, args.country, args.tax_year, _parse_mapping(args.map),
+                           chunk_rows=args.chunk_rows, workers=args.workers,
+                           annualize_factor=1 if args.annual else 12)
+    except (ValueError, RuntimeError, argparse.ArgumentTypeError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    mapped = ", ".join(f"{field}<-{column}" for field, column in summary["mapping"].items())
+    print(f"Done in {summary['seconds']:.2f}s: {summary['rows']} employees in {summary['chunks']} chunks "
+          f"-> {summary['output']} ({mapped})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+Content-addressed, two-tier cache for LLM responses.
+
+Tier 1 is an in-process LRU (bounded size, TTL eviction).
+Tier 2 is an on-disk SQLite database shared by every Streamlit worker process
+on the host, bounded in rows: expired rows, and the oldest rows past
+max_disk_entries, are purged periodically as entries are written. Keys are derived from the normalized request input, the model
+name, the prompt version and the tax-rules version, so a change to any of
+those naturally invalidates old entries.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), ".cache", "llm_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_MAX_DISK_ENTRIES = 50_000
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+# The disk tier is purged at most this often, or after max_disk_entries / 10 writes.
+DEFAULT_PURGE_INTERVAL_SECONDS = 600
+
+
+def normalize_text(text: str) -> str:
+    """Normalize pasted text so trivially different pastes share a cache entry."""
+    if not text:
+        return ""
+    text = re.sub(r"\r\n?", "\n", text)
+    lines = [re.sub(r"[ \t\u00a0]+", " ", line).strip() for line in text.split("\n")]
+    return "\n".join(line for line in lines if line)
+
+
+def canonical_json(data) -> str:
+    """Stable JSON encoding (sorted keys, no whitespace) used for hashing."""
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def make_cache_key(kind: str, payload, model: str, prompt_version: str, rules_version: str = "") -> str:
+    """
+    Build a content-addressed key. `payload` is any JSON-serializable value and
+    should already be normalized (see normalize_text / canonical_json).
+    """
+    material = canonical_json([kind, model, prompt_version, rules_version, payload])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-tier cache of JSON-serializable values.
+
+    Values are stored serialized in both tiers, so callers always get a fresh
+    copy back and can mutate it freely. The lock only guards the in-process
+    LRU and counters; each thread uses its own SQLite connection, so disk
+    reads and writes do not serialize other threads.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 db_path: str | None = DEFAULT_DB_PATH, max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES,
+                 purge_interval: float = DEFAULT_PURGE_INTERVAL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self.purge_interval = purge_interval
+        self._memory = OrderedDict()  # key -> (stored_at, serialized value)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._next_purge = 0.0
+        self._sets_since_purge = 0
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0, "evictions": 0,
+                          "disk_evictions": 0}
+
+    # --- SQLite tier --------------------------------------------------------
+
+    def _connection(self):
+        # One connection per thread; connections must not be shared across
+        # fork(), so reopen in child processes.
+        if self.db_path is None:
+            return None
+        local = self._local
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_stored_at ON llm_cache (stored_at)")
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    def _disk_get(self, key: str):
+        conn = self._connection()
+        if conn is None:
+            return None
+        row = conn.execute("SELECT value, stored_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, stored_at = row
+        if time.time() - stored_at > self.ttl_seconds:
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            conn.commit()
+            return None
+        return stored_at, value
+
+    def _disk_set(self, key: str, stored_at: float, value: str):
+        conn = self._connection()
+        if conn is None:
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, stored_at) VALUES (?, ?, ?)",
+            (key, value, stored_at),
+        )
+        conn.commit()
+
+    def _purge_due(self) -> bool:
+        """True (once) when the disk tier is due for a purge; call under the lock."""
+        self._sets_since_purge += 1
+        now = time.monotonic()
+        if now < self._next_purge and self._sets_since_purge < max(self.max_disk_entries // 10, 1):
+            return False
+        self._next_purge = now + self.purge_interval
+        self._sets_since_purge = 0
+        return True
+
+    def _disk_purge(self) -> int:
+        """Delete expired rows, then the oldest rows past max_disk_entries. Returns rows removed."""
+        conn = self._connection()
+        if conn is None:
+            return 0
+        removed = conn.execute("DELETE FROM llm_cache WHERE stored_at < ?",
+                               (time.time() - self.ttl_seconds,)).rowcount
+        if self.max_disk_entries:
+            excess = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_disk_entries
+            if excess > 0:
+                removed += conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY stored_at LIMIT ?)",
+                    (excess,),
+                ).rowcount
+        conn.commit()
+        return removed
+
+    # --- In-process LRU tier ------------------------------------------------
+
+    def _memory_put(self, key: str, stored_at: float, value: str):
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    # --- Public API ---------------------------------------------------------
+
+    def get(self, key: str):
+        """Return the cached value for `key`, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return json.loads(value)
+                del self._memory[key]
+
+        try:
+            entry = self._disk_get(key)
+        except sqlite3.Error as e:
+            logger.warning("SQLite cache read failed: %s", e)
+            entry = None
+        with self._lock:
+            if entry is not None:
+                stored_at, value = entry
+                self._memory_put(key, stored_at, value)
+                self._counters["disk_hits"] += 1
+                return json.loads(value)
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value):
+        """Store a JSON-serializable value in both tiers."""
+        serialized = json.dumps(value, ensure_ascii=False)
+        stored_at = time.time()
+        with self._lock:
+            self._memory_put(key, stored_at, serialized)
+            self._counters["sets"] += 1
+            purge = self.db_path is not None and self._purge_due()
+        try:
+            self._disk_set(key, stored_at, serialized)
+            removed = self._disk_purge() if purge else 0
+        except sqlite3.Error as e:
+            logger.warning("SQLite cache write failed: %s", e)
+            return
+        if removed:
+            with self._lock:
+                self._counters["disk_evictions"] += removed
+
+    def clear(self):
+        """Drop every entry from both tiers (counters are kept)."""
+        with self._lock:
+            self._memory.clear()
+        conn = self._connection()
+        if conn is not None:
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+
+    def stats(self) -> dict:
+        """Hit/miss counters plus current tier sizes, for sizing the cache."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+            stats["max_entries"] = self.max_entries
+            lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+            stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        stats["max_disk_entries"] = self.max_disk_entries
+        try:
+            conn = self._connection()
+            stats["disk_entries"] = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] if conn else 0
+        except sqlite3.Error:
+            stats["disk_entries"] = None
+        return stats
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> LLMCache:
+    """
+    Process-wide cache configured from the environment:
+    LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_MAX_DISK_ENTRIES,
+    LLM_CACHE_TTL_SECONDS.
+    Set LLM_CACHE_PATH to an empty string to keep the cache in memory only.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            db_path = os.getenv("LLM_CACHE_PATH", DEFAULT_DB_PATH) or None
+            _default_cache = LLMCache(
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+                db_path=db_path,
+                max_disk_entries=int(os.getenv("LLM_CACHE_MAX_DISK_ENTRIES", DEFAULT_MAX_DISK_ENTRIES)),
+            )
+        return _default_cache
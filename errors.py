@@ -0,0 +1,52 @@
+"""
+Typed errors raised by the agent layer.
+
+Both agents raise these; the batch APIs return them per item. Provider
+failures are classified by resilience.py so callers can tell a rate limit or
+an outage (worth retrying later) from a rejected request.
+"""
+
+
+class AgentError(Exception):
+    """Base class for every error raised by the salary agent."""
+
+
+class ParseError(AgentError):
+    """The payslip text could not be turned into validated PayslipComponents."""
+
+
+class AnalysisError(AgentError):
+    """The analysis report could not be generated."""
+
+
+class TokenBudgetExceededError(AgentError):
+    """A request was not sent because it would exceed the configured token budget."""
+
+
+class CassetteMissError(AgentError):
+    """Strict replay mode received a request that is not in the cassette."""
+
+
+class ProviderError(AgentError):
+    """The LLM provider call failed (base for the provider errors below)."""
+
+    def __init__(self, message: str, status_code: int | None = None, retry_after: float | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class RateLimitedError(ProviderError):
+    """The provider returned 429; `retry_after` holds the requested wait, if any."""
+
+
+class ProviderTimeoutError(ProviderError):
+    """The provider did not respond within the configured timeout."""
+
+
+class ProviderUnavailableError(ProviderError):
+    """Connection failure or 5xx from the provider."""
+
+
+class CircuitOpenError(ProviderError):
+    """Calls are being short-circuited because the provider is failing."""
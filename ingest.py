@@ -0,0 +1,231 @@
+"""
+Payslip ingestion from PDF and image files.
+
+PDF pages are extracted with pypdf's layout mode in a thread pool (one task
+per page, a bounded window of pages in flight) and yielded in page order, so
+a large multi-page payroll export streams through instead of being held in
+memory whole. Each page's layout text is then normalized so that label/value
+pairs that were visually aligned ("Basic Salary      50,000") become
+"Basic Salary: 50,000" lines that parse_payslip_text handles well, including
+two-column earnings/deductions tables.
+
+Pages with (almost) no text layer are treated as scanned and passed to an
+OCR hook: a callable (image_bytes, page_index) -> str. Register one with
+register_ocr_hook(), or set PAYSLIP_OCR_HOOK="package.module:function". If
+none is configured, pytesseract is used when installed; otherwise the page
+is reported as having no text.
+
+Threads, not processes: this runs inside the multithreaded Streamlit
+server, where forking is unsafe (children inherit other threads' locks)
+and spawned workers take seconds to start, against a few milliseconds to
+extract a text page. OCR, the slow part, waits on the tesseract process or
+a remote service outside the GIL, so scanned pages still run in parallel.
+
+Usage:
+    python ingest.py payroll_export.pdf            # print extracted payslips
+"""
+import importlib
+import io
+import os
+import re
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+# Below this many non-space characters a page is treated as scanned.
+MIN_TEXT_CHARS = 20
+# Documents shorter than this are extracted in the calling thread.
+PARALLEL_MIN_PAGES = 4
+# Starts a new payslip when found on a page of a multi-slip export.
+_SLIP_HEADER = re.compile(r"\b(pay\s*slip|salary\s+slip|pay\s+statement|earnings\s+statement)\b", re.I)
+
+_CELL_SPLIT = re.compile(r"\s{3,}|\t+|\s*\|\s*")
+_AMOUNT_CELL = re.compile(r"^(?:(?:Rs\.?|INR|₹|\$|USD)\s*)?-?\d[\d,]*(?:\.\d+)?(?:\s*/-)?$")
+
+
+@dataclass
+class PageText:
+    """Extracted text of one page. `method` is "text", "ocr" or "empty"."""
+    index: int
+    text: str
+    method: str
+
+
+# --- Layout normalization -----------------------------------------------------
+
+def normalize_layout(text: str) -> str:
+    """
+    Turn column-aligned layout text into one "Label: value" line per pair.
+    Lines without amounts are kept (with runs of spaces collapsed).
+    """
+    lines = []
+    for raw in text.splitlines():
+        cells = [c.strip() for c in _CELL_SPLIT.split(raw.strip()) if c and c.strip()]
+        if not cells:
+            continue
+        if not any(_AMOUNT_CELL.match(c) for c in cells):
+            lines.append(" ".join(cells))
+            continue
+        pending = []
+        for cell in cells:
+            if _AMOUNT_CELL.match(cell) and pending:
+                lines.append(f"{' '.join(pending)}: {cell}")
+                pending = []
+            elif _AMOUNT_CELL.match(cell):
+                # An amount with no label on its left (e.g. a totals column): keep it on its own.
+                lines.append(cell)
+            else:
+                pending.append(cell)
+        if pending:
+            lines.append(" ".join(pending))
+    return "\n".join(lines)
+
+
+# --- OCR hook -----------------------------------------------------------------
+
+_ocr_hook = None
+
+
+def register_ocr_hook(hook):
+    """Use `hook(image_bytes, page_index) -> str` for scanned pages (None to reset)."""
+    global _ocr_hook
+    _ocr_hook = hook
+
+
+def _tesseract_ocr(image_bytes: bytes, page_index: int) -> str:
+    import pytesseract
+    from PIL import Image
+
+    return pytesseract.image_to_string(Image.open(io.BytesIO(image_bytes)))
+
+
+def get_ocr_hook():
+    """The registered hook, else PAYSLIP_OCR_HOOK, else pytesseract if installed, else None."""
+    if _ocr_hook is not None:
+        return _ocr_hook
+    spec = os.getenv("PAYSLIP_OCR_HOOK")
+    if spec:
+        module_name, _, attr = spec.partition(":")
+        return getattr(importlib.import_module(module_name), attr)
+    try:
+        import pytesseract  # noqa: F401
+        import PIL  # noqa: F401
+    except ImportError:
+        return None
+    return _tesseract_ocr
+
+
+def _ocr_page(page, index: int) -> str:
+    hook = get_ocr_hook()
+    if hook is None:
+        return ""
+    texts = []
+    for image in page.images:
+        text = hook(image.data, index)
+        if text and text.strip():
+            texts.append(text)
+    return "\n".join(texts)
+
+
+# --- Page extraction (runs in worker threads) ---------------------------------
+
+_local = threading.local()
+
+
+def _reader(path: str):
+    """
+    One PdfReader per file per thread (a reader's file position is not
+    thread-safe); pages are read lazily from disk.
+    """
+    from pypdf import PdfReader  # imported with the first PDF, not at app start-up
+
+    key = (path, os.path.getmtime(path))
+    if getattr(_local, "key", None) != key:
+        _local.key, _local.reader = key, PdfReader(path)
+    return _local.reader
+
+
+def extract_page(path: str, index: int) -> PageText:
+    """Extract and normalize one page."""
+    page = _reader(path).pages[index]
+    text = page.extract_text(extraction_mode="layout") or ""
+    if len(re.sub(r"\s", "", text)) >= MIN_TEXT_CHARS:
+        return PageText(index, normalize_layout(text), "text")
+    ocr_text = _ocr_page(page, index)
+    if ocr_text.strip():
+        return PageText(index, normalize_layout(ocr_text), "ocr")
+    return PageText(index, "", "empty")
+
+
+def iter_pdf_pages(path: str, workers: int | None = None):
+    """
+    Yield PageText for every page of the PDF at `path`, in page order. Pages are
+    extracted in parallel with at most a few pages per worker in flight.
+    """
+    page_count = len(_reader(path).pages)
+    if page_count < PARALLEL_MIN_PAGES or workers == 1:
+        for index in range(page_count):
+            yield extract_page(path, index)
+        return
+
+    workers = min(workers or os.cpu_count() or 1, page_count)
+    window = workers * 4
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest") as pool:
+        futures = {}
+        next_page = 0
+        for index in range(page_count):
+            while next_page < page_count and next_page < index + window:
+                futures[next_page] = pool.submit(extract_page, path, next_page)
+                next_page += 1
+            yield futures.pop(index).result()
+
+
+def iter_payslips_from_pdf(path: str, workers: int | None = None):
+    """
+    Yield (first_page_index, text) per payslip in a PDF. A page that carries a
+    payslip header starts a new payslip; pages without one continue the
+    current payslip (a single-slip PDF therefore yields one item).
+    """
+    start, parts = None, []
+    for page in iter_pdf_pages(path, workers=workers):
+        if parts and _SLIP_HEADER.search(page.text):
+            yield start, "\n".join(parts)
+            start, parts = None, []
+        if page.text:
+            if start is None:
+                start = page.index
+            parts.append(page.text)
+    if parts:
+        yield start, "\n".join(parts)
+
+
+# --- Uploads --------------------------------------------------------------------
+
+def extract_upload(data: bytes, filename: str, workers: int | None = None) -> list:
+    """
+    Payslip texts from an uploaded PDF or image file. PDFs are spooled to a
+    temporary file so worker threads can read pages straight from disk.
+    """
+    name = filename.lower()
+    if name.endswith(".pdf"):
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            f.write(data)
+            path = f.name
+        try:
+            return [text for _, text in iter_payslips_from_pdf(path, workers=workers)]
+        finally:
+            os.remove(path)
+
+    hook = get_ocr_hook()
+    if hook is None:
+        raise RuntimeError("No OCR hook is configured for image payslips "
+                           "(install pytesseract or set PAYSLIP_OCR_HOOK).")
+    text = hook(data, 0)
+    return [normalize_layout(text)] if text and text.strip() else []
+
+
+if __name__ == "__main__":
+    for first_page, slip in iter_payslips_from_pdf(sys.argv[1]):
+        print(f"# --- payslip starting on page {first_page + 1} ---\n{slip}\n")
@@ -0,0 +1,304 @@
+"""
+Deterministic, rule-based payslip extractor.
+
+This is the "fast path" that sits in front of the LLM parser call in
+agent.SalaryAgent.parse_payslip_text. Well-formed slips ("Basic Salary: 50,000")
+are handled locally in microseconds; anything the rules are unsure about is
+reported with a low confidence so the agent can fall back to the LLM.
+"""
+import re
+from dataclasses import dataclass, field
+
+from tools import AMOUNT_FIELDS, PayslipComponents
+
+# --- Label synonyms ---------------------------------------------------------
+# Keys are PayslipComponents field names; values are normalized labels
+# (lowercase, punctuation stripped). Longer, more specific labels come first.
+FIELD_SYNONYMS = {
+    "basic_salary": [
+        "basic salary", "basic pay", "basic wage", "basic wages", "basic",
+    ],
+    "house_rent_allowance": [
+        "house rent allowance", "house rent", "hra",
+    ],
+    "employee_pf_contribution": [
+        "employee pf contribution", "employees pf contribution", "employee provident fund",
+        "employees provident fund", "provident fund", "employee pf", "pf contribution",
+        "epf", "pf",
+    ],
+    "professional_tax": [
+        "professional tax", "profession tax", "prof tax", "p tax", "ptax", "pt",
+    ],
+    "leave_travel_allowance": [
+        "leave travel allowance", "leave travel assistance", "leave travel concession",
+        "lta", "ltc",
+    ],
+    "special_allowance": [
+        "special allowance", "spl allowance", "special allow", "other allowance",
+        "other allowances",
+    ],
+    "health_insurance_premium": [
+        "health insurance premium", "medical insurance premium", "health insurance", "medical insurance",
+        "group health insurance", "group medical insurance", "mediclaim premium", "mediclaim",
+    ],
+}
+
+# Make sure every schema field has at least one synonym.
+assert set(FIELD_SYNONYMS) == set(AMOUNT_FIELDS), "FIELD_SYNONYMS out of sync with PayslipComponents"
+
+# Short labels that are only trusted on an exact match (never as a prefix).
+_EXACT_ONLY = {"pf", "pt", "epf", "hra", "lta", "ltc", "basic", "ptax", "p tax"}
+
+# Labels that carry an amount but are not components (totals, employer side, etc.).
+# Lines with these labels are ignored rather than counted as "unrecognized".
+_IGNORED_LABEL_WORDS = (
+    "gross", "total", "net", "employer", "ctc", "take home", "in words", "days",
+    "leave balance", "leave", "lop", "arrear", "income tax", "tds", "uan", "account",
+    "pan", "employee id", "emp id", "code", "ifsc", "esi", "esic", "period",
+    "date", "month", "year", "jan", "feb", "mar", "apr", "may", "jun", "jul",
+    "aug", "sep", "oct", "nov", "dec", "phone", "mobile", "pin",
+)
+
+# Period/unit words that may decorate a label ("Basic (Monthly)", "HRA Rs.").
+_LABEL_NOISE = re.compile(
+    r"\b(monthly|annual|annually|yearly|per month|per annum|per year|pm|pa|"
+    r"amount|amt|rs|inr|usd|current|earnings?|deductions?)\b"
+)
+
+# --- Period detection -------------------------------------------------------
+_ANNUAL_HINT = re.compile(r"\b(per\s+annum|p\.\s?a\.?|annual(?:ly)?|yearly|per\s+year|/\s*(?:year|yr|annum))\b|/\s*(?:year|yr|annum)\b", re.I)
+_MONTHLY_HINT = re.compile(r"\b(per\s+month|p\.\s?m\.?|monthly|for\s+the\s+month|pay\s+period|month\s+of)\b|/\s*(?:month|mon|mo)\b", re.I)
+# "Annual CTC", "Annual Leave", "Annual Bonus": "annual" describes that item, not the slip's figures.
+_PERIOD_EXEMPT = re.compile(r"\b(ctc|cost\s+to\s+company|leaves?(?!\s+travel)|bonus|incentives?)\b", re.I)
+# Score when the document-level and line-level periods disagree: below the
+# fast-path threshold, so the LLM decides.
+_PERIOD_CONFLICT_SCORE = 0.6
+
+# --- Amounts ----------------------------------------------------------------
+# A label followed by an optional separator/currency marker and a number
+# (not one glued to the label, as in an "E1042" employee code).
+_PAIR_RE = re.compile(
+    r"(?P<label>[A-Za-z][A-Za-z0-9 .&/()%'_-]*?)\s*[:=\-–|]*\s*"
+    r"(?:(?:Rs\.?|INR|₹|\$|USD)\s*)?"
+    r"(?<![A-Za-z0-9])(?P<amount>\d[\d,]*(?:\.\d+)?)(?![\d,.]*\d)(?!\s*%)(?:\s*/-)?"
+)
+_AMOUNT_RE = re.compile(r"(?:(?:Rs\.?|INR|₹|\$|USD)\s*)?(\d[\d,]*(?:\.\d+)?)(?:\s*/-)?")
+
+# Indian grouping (1,50,000), western grouping (150,000) or plain digits.
+_INDIAN_GROUPING = re.compile(r"^\d{1,2}(?:,\d{2})*,\d{3}$")
+_WESTERN_GROUPING = re.compile(r"^\d{1,3}(?:,\d{3})+$")
+_PLAIN_DIGITS = re.compile(r"^\d+$")
+# A calendar year written next to a label ("Basic 2024: 50,000"), not an amount.
+_YEAR_TOKEN = re.compile(r"^(?:19[89]\d|20[0-4]\d)$")
+_SEPARATOR_AFTER = re.compile(r"\s*[:=\-–|]")
+
+DEFAULT_CONFIDENCE_THRESHOLD = 0.85
+
+
+@dataclass
+class LocalParseResult:
+    """Result of a local extraction: values, per-field confidence and period."""
+    components: dict = field(default_factory=dict)
+    confidence: dict = field(default_factory=dict)
+    period: str = "monthly"
+    unrecognized_lines: int = 0
+
+    @property
+    def overall_confidence(self) -> float:
+        """
+        The weakest field confidence, scaled down when amount-bearing lines were
+        left unrecognized (the LLM may map those to a field we missed).
+        """
+        if not self.components:
+            return 0.0
+        score = min(self.confidence.values())
+        recognized = len(self.components)
+        if self.unrecognized_lines:
+            score *= recognized / (recognized + self.unrecognized_lines)
+        return round(score, 4)
+
+    def to_dict(self) -> dict:
+        """Validated dictionary in the same shape the LLM parser returns."""
+        return PayslipComponents(**self.components).to_dict()
+
+
+def normalize_label(label: str) -> str:
+    """Lower-case a label and drop punctuation and period/currency words: "Basic (Monthly) Rs." -> "basic"."""
+    label = label.lower().replace("'", "")
+    label = re.sub(r"[^a-z&]+", " ", label)
+    label = _LABEL_NOISE.sub(" ", label)
+    return re.sub(r"\s+", " ", label).strip()
+
+
+def match_label(label: str):
+    """
+    Map a normalized label to a PayslipComponents field.
+    Returns (field_name, score) or (None, 0.0).
+    """
+    if not label:
+        return None, 0.0
+    if "employer" in label or "employers" in label:
+        return None, 0.0
+    for field_name, synonyms in FIELD_SYNONYMS.items():
+        for synonym in synonyms:
+            if label == synonym:
+                return field_name, 1.0
+    for field_name, synonyms in FIELD_SYNONYMS.items():
+        for synonym in synonyms:
+            if synonym in _EXACT_ONLY:
+                continue
+            if label.startswith(synonym + " ") or label.endswith(" " + synonym):
+                return field_name, 0.9
+    return None, 0.0
+
+
+def _parse_amount(raw: str):
+    """
+    Parse an amount with Indian or western digit grouping.
+    Returns (value, score); irregular grouping lowers the score.
+    """
+    whole, _, _ = raw.partition(".")
+    if _INDIAN_GROUPING.match(whole) or _WESTERN_GROUPING.match(whole) or _PLAIN_DIGITS.match(whole):
+        score = 1.0
+    else:
+        score = 0.6
+    try:
+        return float(raw.replace(",", "")), score
+    except ValueError:
+        return None, 0.0
+
+
+def _is_ignored(label: str) -> bool:
+    return any(word in label for word in _IGNORED_LABEL_WORDS)
+
+
+def _line_period(line: str):
+    """
+    "annual" or "monthly" from hints on this line, else None. Lines about
+    CTC, leave or bonuses are skipped ("Annual CTC" does not make the slip annual).
+    """
+    if _PERIOD_EXEMPT.search(line):
+        return None
+    annual = bool(_ANNUAL_HINT.search(line))
+    monthly = bool(_MONTHLY_HINT.search(line))
+    if annual and not monthly:
+        return "annual"
+    if monthly and not annual:
+        return "monthly"
+    return None
+
+
+def _document_period(text: str):
+    """
+    Detect whether the figures are monthly or annual from document-level hints.
+    Returns (period, score); period is None when there are no hints or they
+    are mixed (e.g. a "Monthly | Annual" table), leaving it to each line.
+    """
+    annual = monthly = False
+    for line in text.splitlines():
+        if _PERIOD_EXEMPT.search(line):
+            continue
+        annual = annual or bool(_ANNUAL_HINT.search(line))
+        monthly = monthly or bool(_MONTHLY_HINT.search(line))
+    if annual and not monthly:
+        return "annual", 0.95
+    if monthly and not annual:
+        return "monthly", 1.0
+    if monthly and annual:
+        return None, 0.9
+    return None, 0.95
+
+
+def _component_period(line_period, doc_period, doc_period_score: float):
+    """
+    (period, score) for one component. Only a hint on the component's own
+    line converts it; a document-level hint the line does not confirm (or
+    contradicts) drops the score below the fast-path threshold.
+    """
+    if line_period:
+        if doc_period and doc_period != line_period:
+            return line_period, _PERIOD_CONFLICT_SCORE
+        return line_period, 1.0
+    if doc_period == "annual":
+        return "monthly", _PERIOD_CONFLICT_SCORE
+    return "monthly", doc_period_score
+
+
+def parse_payslip_locally(payslip_text: str) -> LocalParseResult:
+    """
+    Extract PayslipComponents fields from payslip text without any network call.
+
+    Handles label synonyms, Indian/western digit grouping, several label/value
+    pairs on one line (two-column layouts), "Monthly | Annual" or "Current | YTD"
+    columns and monthly vs. annual detection. Annual figures are converted to
+    monthly, matching what PARSER_SYSTEM_PROMPT asks of the LLM.
+    """
+    result = LocalParseResult()
+    if not payslip_text:
+        return result
+
+    doc_period, doc_period_score = _document_period(payslip_text)
+    result.period = doc_period or "monthly"
+    values = {}
+
+    for line in payslip_text.splitlines():
+        line = line.strip()
+        if not line or not any(ch.isdigit() for ch in line):
+            continue
+
+        matches = list(_PAIR_RE.finditer(line))
+        if not matches:
+            continue
+
+        line_period = _line_period(line)
+
+        for idx, match in enumerate(matches):
+            label = normalize_label(match.group("label"))
+            field_name, label_score = match_label(label)
+            if field_name is None:
+                if label and not _is_ignored(label):
+                    result.unrecognized_lines += 1
+                continue
+
+            amount, amount_score = _parse_amount(match.group("amount"))
+            if amount is None:
+                continue
+
+            # Any further bare numbers before the next label belong to this label
+            # (e.g. "Basic  50,000  6,00,000" or "Basic  50,000  3,00,000 (YTD)").
+            tail_end = matches[idx + 1].start() if idx + 1 < len(matches) else len(line)
+            extra = [_parse_amount(m.group(1))[0] for m in _AMOUNT_RE.finditer(line, match.end(), tail_end)]
+            extra = [x for x in extra if x is not None]
+
+            if _YEAR_TOKEN.match(match.group("amount")):
+                if extra and _SEPARATOR_AFTER.match(line, match.end()):
+                    # "Basic 2024: 50,000": the year belongs to the label.
+                    amount, extra = extra[0], extra[1:]
+                else:
+                    # A lone year-like number: could be either, let the LLM decide.
+                    amount_score = min(amount_score, 0.8)
+
+            period, period_score = _component_period(line_period, doc_period, doc_period_score)
+            if extra:
+                # Second column equal to 12x the first: a "Monthly | Annual" table.
+                if abs(extra[0] - amount * 12) < 1.0:
+                    period, period_score = "monthly", 1.0
+                else:
+                    period_score = min(period_score, 0.9)
+
+            if period == "annual":
+                amount = round(amount / 12, 2)
+
+            score = round(label_score * amount_score * period_score, 4)
+            values.setdefault(field_name, []).append((amount, score))
+
+    for field_name, candidates in values.items():
+        amounts = {amount for amount, _ in candidates}
+        best_amount, best_score = max(candidates, key=lambda c: c[1])
+        if len(amounts) > 1:
+            # Conflicting values for the same component: let the LLM decide.
+            best_score = min(best_score, 0.5)
+        result.components[field_name] = best_amount
+        result.confidence[field_name] = best_score
+
+    return result
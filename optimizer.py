@@ -0,0 +1,195 @@
+"""
+Local what-if optimizer for tax-saving allocations.
+
+Section 2 of the report names the gaps (unused 80C, 80D, 401k room); this
+module answers "what if I invest X here and Y there" without an LLM call.
+For the confirmed data and the tax rules (limits, Tax_Slabs, rebate and
+cess) it evaluates the exact tax of many scenarios at once with numpy and
+keeps the Pareto front: for each amount invested, the most tax saved,
+dropping any amount that costs more without saving more.
+
+Every lever below is a deduction from taxable income, so a rupee (or
+dollar) in one saves exactly as much as a rupee in another: only the total
+matters. The levers are therefore one axis, the total deduction, up to the
+sum of their caps. Tax is piecewise linear in that total, so the
+candidates are evenly spaced amounts plus the amounts that bring taxable
+income to a slab boundary or the rebate limit; the front is exact at its
+kinks. Each scenario is split across the levers in the order listed below
+(any other split within the caps saves the same tax).
+
+Levers by rules key:
+    80C_Limit          extra 80C investment (ELSS, PPF, ...) on top of the PF already counted
+    80D_Self_Limit     health insurance premium for self/family, less any premium on the payslip
+    80D_Parents_Limit  health insurance premium for parents (80D_Senior_Citizen_Limit
+                       with senior_parents=True)
+    401k_Limit         pre-tax 401k contribution
+
+The starting taxable income and the room left under each limit come from
+tax_engine.compute_columns, so the standard deduction, professional tax
+and the PF and premium already on the payslip are counted exactly as in
+the report and bulk runs. HRA exemption depends on rent paid and is left
+out, so taxable income is an upper bound when HRA applies.
+"""
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from tax_engine import compile_rules, format_amount, income_tax
+from tools import AMOUNT_FIELDS
+
+DEFAULT_STEPS = 21
+
+
+@dataclass
+class Lever:
+    key: str
+    label: str
+    maximum: float
+
+
+@dataclass
+class OptimizationResult:
+    """Pareto-best scenarios, cheapest first, each a dict of lever amounts and tax impact."""
+    country: str
+    tax_year: str
+    levers: list
+    baseline_tax: float
+    taxable_income: float
+    scenarios_evaluated: int
+    elapsed_ms: float
+    front: list = field(default_factory=list)
+
+    def best_within(self, budget: float) -> dict | None:
+        """The scenario saving the most tax for at most `budget` invested."""
+        affordable = [s for s in self.front if s["invested"] <= budget]
+        return affordable[-1] if affordable else None
+
+    def table(self, limit: int | None = None) -> list:
+        """Rows with formatted amounts for display (app table, PDF); at most `limit`, evenly spread."""
+        rows = self.front
+        if limit and len(rows) > limit:
+            picks = np.unique(np.linspace(0, len(rows) - 1, limit).round().astype(int))
+            rows = [rows[i] for i in picks]
+        money = lambda v: format_amount(v, self.country)  # noqa: E731
+        return [
+            {**{lever.label: money(row[lever.key]) for lever in self.levers},
+             "Invested": money(row["invested"]), "Tax": money(row["tax"]),
+             "Tax saved": money(row["tax_saved"]), "Saved per 100": f"{row['saved_per_100']:.1f}"}
+            for row in rows
+        ]
+
+
+def engine_figures(confirmed_data: dict, rule_set, annualize_factor: int = 12) -> dict:
+    """The engine's annual figures for one slip ({key: float}), from compute_columns."""
+    columns = {field: np.array([float(confirmed_data[field]) if confirmed_data.get(field) is not None else np.nan])
+               for field in AMOUNT_FIELDS}
+    return {key: float(values[0]) for key, values in rule_set.compute_columns(columns, annualize_factor).items()}
+
+
+def available_levers(figures: dict, rules, senior_parents: bool = False) -> list:
+    """Levers the rules allow, each capped at the room `figures` (engine_figures) leave, in fill order."""
+    levers = []
+    if "80C_Limit" in rules:
+        room = max(rules["80C_Limit"] - figures.get("total_80c_used", 0.0), 0.0)
+        if room:
+            levers.append(Lever("80c_investment", "80C investment (ELSS/PPF)", room))
+    if "80D_Self_Limit" in rules:
+        room = max(rules["80D_Self_Limit"] - figures.get("80d_detected", 0.0), 0.0)
+        if room:
+            levers.append(Lever("80d_self", "80D premium (self/family)", room))
+    parents_key = "80D_Senior_Citizen_Limit" if senior_parents else "80D_Parents_Limit"
+    if parents_key in rules:
+        levers.append(Lever("80d_parents", "80D premium (parents)", float(rules[parents_key])))
+    if "401k_Limit" in rules:
+        levers.append(Lever("401k", "401k contribution", float(rules["401k_Limit"])))
+    return levers
+
+
+def deduction_points(taxable: float, total: float, rules, steps: int = DEFAULT_STEPS) -> np.ndarray:
+    """
+    Candidate total deductions in [0, total]: `steps` evenly spaced amounts
+    plus those that bring taxable income down to a slab boundary or the
+    rebate limit (where the tax saved per unit changes), sorted.
+    """
+    kinks = [lower for lower, _ in rules.get("Tax_Slabs", [])]
+    if "Rebate_87A_Income_Limit" in rules:
+        kinks.append(rules["Rebate_87A_Income_Limit"])
+    points = taxable - np.array(kinks, dtype=np.float64)
+    points = points[(points > 0) & (points < total)]
+    return np.unique(np.concatenate((np.linspace(0.0, total, max(steps, 2)), points)))
+
+
+def split_deduction(amount: float, levers: list) -> dict:
+    """`amount` spread over the levers in order, each up to its maximum."""
+    split = {}
+    for lever in levers:
+        split[lever.key] = min(amount, lever.maximum)
+        amount -= split[lever.key]
+    return split
+
+
+def pareto_front(invested: np.ndarray, saved: np.ndarray) -> np.ndarray:
+    """
+    Indices of the scenarios not dominated on (invested: lower is better,
+    saved: higher is better), in order of increasing investment.
+    """
+    order = np.lexsort((-saved, invested))
+    ranked = saved[order]
+    # Keep a scenario only if it saves more than every cheaper (or equal-cost) one.
+    previous_best = np.concatenate(([-np.inf], np.maximum.accumulate(ranked)[:-1]))
+    return order[ranked > previous_best]
+
+
+def optimize(confirmed_data: dict, country: str, tax_year: str, annualize_factor: int = 12,
+             steps: int = DEFAULT_STEPS, senior_parents: bool = False) -> OptimizationResult | None:
+    """
+    Evaluate candidate total deductions (see deduction_points) and return the
+    Pareto front, each row split across the levers. Returns None if there
+    are no tax rules (or no Tax_Slabs) for the country/year.
+    """
+    rule_set = compile_rules(country, tax_year)
+    if rule_set is None or "Tax_Slabs" not in rule_set.rules:
+        return None
+    rules = rule_set.rules
+    started = time.perf_counter()
+    figures = engine_figures(confirmed_data or {}, rule_set, annualize_factor)
+    levers = available_levers(figures, rules, senior_parents)
+    taxable = figures["taxable_before_exemptions"]
+    baseline = figures["tax_before_exemptions"]
+
+    # The levers are interchangeable deductions: one axis, their total.
+    total = sum(lever.maximum for lever in levers)
+    invested = deduction_points(taxable, total, rules, steps) if total else np.zeros(1)
+    tax = income_tax(taxable - invested, rules)
+    saved = baseline - tax
+
+    front = []
+    for i in pareto_front(invested, saved):
+        scenario = {key: float(value) for key, value in split_deduction(float(invested[i]), levers).items()}
+        scenario.update(invested=float(invested[i]), tax=round(float(tax[i]), 2),
+                        tax_saved=round(float(saved[i]), 2),
+                        saved_per_100=float(saved[i] / invested[i] * 100) if invested[i] else 0.0)
+        front.append(scenario)
+
+    return OptimizationResult(
+        country=country, tax_year=tax_year, levers=levers, baseline_tax=round(baseline, 2),
+        taxable_income=taxable, scenarios_evaluated=len(invested),
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 3), front=front,
+    )
+
+
+if __name__ == "__main__":
+    # python optimizer.py '{"basic_salary": 80000, "employee_pf_contribution": 9600}' India 2024-25
+    import json
+    import sys
+
+    data = json.loads(sys.argv[1])
+    result = optimize(data, sys.argv[2] if len(sys.argv) > 2 else "India",
+                      sys.argv[3] if len(sys.argv) > 3 else "2024-25")
+    if result is None:
+        sys.exit("No tax slabs found for that country/year.")
+    print(f"{result.scenarios_evaluated} scenarios in {result.elapsed_ms} ms; "
+          f"baseline tax {format_amount(result.baseline_tax, result.country)}")
+    for row in result.table(limit=12):
+        print(row)
@@ -0,0 +1,80 @@
+import hmac
+import os
+
+import streamlit as st
+
+from artifacts import get_artifact_store
+from cache import get_default_cache
+from tracing import error_summary, load_spans, stage_summary
+
+# --- Page Configuration ---
+st.set_page_config(page_title="Admin: Latency & Cost", page_icon="⏱️", layout="wide")
+
+
+# --- Access check ---
+# The page is off unless an admin token is configured (ADMIN_PAGE_TOKEN or
+# the "admin_token" Streamlit secret), and then asks for that token.
+def _admin_token() -> str:
+    token = os.getenv("ADMIN_PAGE_TOKEN", "")
+    if not token:
+        try:
+            token = st.secrets.get("admin_token", "")
+        except Exception:  # no secrets.toml
+            token = ""
+    return token
+
+
+admin_token = _admin_token()
+if not admin_token:
+    st.info("The admin page is disabled. Set ADMIN_PAGE_TOKEN (or the admin_token secret) to enable it.")
+    st.stop()
+if not st.session_state.get("admin_unlocked"):
+    entered = st.text_input("Admin token", type="password")
+    if entered and hmac.compare_digest(entered.encode(), admin_token.encode()):
+        st.session_state.admin_unlocked = True
+        st.rerun()
+    if entered:
+        st.error("Invalid token.")
+    st.stop()
+
+st.title("⏱️ Latency & Cost by Stage")
+st.caption("Built from the spans written by tracing.py (TRACE_SINK=jsonl). Percentiles use the nearest-rank method.")
+
+limit = st.sidebar.number_input("Spans to load (most recent)", min_value=100, max_value=200000, value=20000, step=1000)
+if st.sidebar.button("Refresh"):
+    st.rerun()
+
+records = load_spans(limit=int(limit))
+if not records:
+    st.info("No spans recorded yet. Run an analysis in the main app first.")
+else:
+    summary = stage_summary(records)
+    st.subheader("Per-stage latency (ms), tokens and estimated cost")
+    st.dataframe(summary, use_container_width=True)
+
+    total_cost = sum(row["cost_usd"] for row in summary)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Spans", len(records))
+    col2.metric("Errors", sum(row["errors"] for row in summary))
+    col3.metric("Estimated cost (USD)", f"{total_cost:.4f}")
+
+    # Where do parses come from? local fast path vs cache vs LLM.
+    sources = {}
+    for record in records:
+        if record["name"] == "agent.parse" and record.get("source"):
+            sources[record["source"]] = sources.get(record["source"], 0) + 1
+    if sources:
+        st.subheader("Parse source breakdown")
+        st.bar_chart(sources)
+
+    # Types and counts only: error messages can quote payslip values.
+    errors = error_summary(records)
+    if errors:
+        st.subheader("Errors by type")
+        st.dataframe(errors, use_container_width=True)
+
+st.subheader("LLM response cache")
+st.json(get_default_cache().stats())
+
+st.subheader("Rendered report artifacts")
+st.json(get_artifact_store().stats())
@@ -2,21 +2,34 @@
 from io import BytesIO
 from datetime import datetime
 from zoneinfo import ZoneInfo
+from typing import Iterable
 import json
 import textwrap
 import re
 import os
+import copy
 import logging
+import tempfile
+import threading
+from xml.sax.saxutils import escape
+
+from tracing import span
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import (
     SimpleDocTemplate,
+    BaseDocTemplate,
+    PageTemplate,
+    Frame,
+    PageBreak,
     Paragraph,
     Spacer,
     Preformatted,
     ListFlowable,
     ListItem,
+    Table,
+    TableStyle,
 )
 from reportlab.lib.units import mm
 
@@ -39,6 +52,8 @@ logger.setLevel(logging.INFO)
 FONTS_DIR = os.path.join(os.path.dirname(__file__), "fonts")
 _font_family_registered = False
 _mono_registered = False
+_fonts_attempted = False
+_fonts_lock = threading.Lock()
 
 def _register_fonts():
     global _font_family_registered, _mono_registered
@@ -72,8 +87,15 @@ def _register_fonts():
         _mono_registered = False
         logger.warning(f"Could not register DejaVuSansMono from {FONTS_DIR}: {e}")
 
-# Attempt registration at import time (safe; internal flags used later)
-_register_fonts()
+def _ensure_fonts():
+    """Register fonts on first use (not at import time); later calls are free."""
+    global _fonts_attempted
+    if _fonts_attempted:
+        return
+    with _fonts_lock:
+        if not _fonts_attempted:
+            _register_fonts()
+            _fonts_attempted = True
 
 # --- Helpers --------------------------------------------------------------
 
@@ -94,14 +116,14 @@ def _simple_md_to_html(text: str) -> str:
     Convert a few markdown markers to HTML tags safe for ReportLab Paragraph:
     - **bold** -> <b>bold</b>
     - *italic* -> <i>italic</i>
+    Everything else is escaped first, so "<", ">" and "&" in the text (or
+    tags an LLM or API caller wrote) come out literally instead of as markup.
     """
+    text = escape(text)
     # Replace bold **text**
     text = re.sub(r"\*\*(.+?)\*\*", r"<b>\1</b>", text)
     # Replace italics *text* (avoid replacing inside bold)
     text = re.sub(r"(?<!<b>)\*(.+?)\*(?!</b>)", r"<i>\1</i>", text)
-    # Minimal escaping for angle brackets that could confuse parser
-    # (note: ReportLab accepts a subset of HTML-like tags)
-    text = text.replace("< ", "&lt; ").replace(" >", " &gt;")
     return text
 
 def _wrap_text(text: str, width: int = 95) -> str:
@@ -175,62 +197,146 @@ def _markdown_to_flowables(md: str, styles):
     flush_bullets()
     return flowables
 
+# --- Render context ---------------------------------------------------------
+
+DISCLAIMER_TEXT = (
+    "Disclaimer: This report was automatically generated by an AI agent for informational and educational "
+    "purposes only. It does not constitute professional tax, legal, or financial advice. "
+    "Please consult a qualified tax or financial professional before making any decisions based on this report."
+)
+
+class PdfRenderContext:
+    """
+    Everything generate_pdf_report needs that does not depend on the report
+    itself: fonts (registered lazily), the stylesheet with our custom styles,
+    and pre-parsed static flowables (section titles, disclaimer).
+    Build once and reuse across calls; get_render_context() returns a shared one.
+    """
+
+    def __init__(self):
+        _ensure_fonts()
+        self.font_family_registered = _font_family_registered
+        self.styles = self._build_styles()
+
+        # Static flowables are parsed once; the accessors below hand out shallow copies,
+        # which share the parsed text but get their own layout state.
+        self._payslip_title = Paragraph("Original Payslip Text (as pasted):", self.styles["Heading2Custom"])
+        self._data_title = Paragraph("Parsed / Confirmed Monthly Data (JSON):", self.styles["Heading2Custom"])
+        self._report_title = Paragraph("AI Analysis Report:", self.styles["Heading2Custom"])
+        self._scenarios_title = Paragraph("What-if: Tax-Saving Scenarios:", self.styles["Heading2Custom"])
+        self._disclaimer = Paragraph(DISCLAIMER_TEXT, self.styles["Disclaimer"])
+
+    def _build_styles(self):
+        styles = getSampleStyleSheet()
+
+        # Apply Unicode font family if registered; otherwise keep defaults but avoid using <b> tags in header
+        if _font_family_registered:
+            try:
+                styles["Normal"].fontName = "DejaVuSans"
+            except Exception:
+                pass
+
+        # Heading and monospace styles
+        styles.add(ParagraphStyle(
+            name="Heading1Custom",
+            parent=styles["Heading1"],
+            fontSize=14,
+            leading=16,
+            spaceAfter=6,
+            fontName="DejaVuSans" if _font_family_registered else styles["Heading1"].fontName
+        ))
+        styles.add(ParagraphStyle(
+            name="Heading2Custom",
+            parent=styles["Heading2"],
+            fontSize=12,
+            leading=14,
+            spaceAfter=4,
+            fontName="DejaVuSans" if _font_family_registered else styles["Heading2"].fontName
+        ))
+        styles.add(ParagraphStyle(
+            name="Heading3Custom",
+            parent=styles["Heading3"],
+            fontSize=11,
+            leading=13,
+            spaceAfter=3,
+            fontName="DejaVuSans" if _font_family_registered else styles["Heading3"].fontName
+        ))
+
+        mono_font_name = "DejaVuSansMono" if _mono_registered else (styles["Code"].fontName if "Code" in styles else None)
+        styles.add(ParagraphStyle(
+            name="Monospace",
+            parent=styles.get("Code", styles["Normal"]),
+            fontName=mono_font_name,
+            fontSize=9,
+            leading=12
+        ))
+
+        styles.add(ParagraphStyle(
+            name="Disclaimer",
+            parent=styles["Normal"],
+            fontSize=9,
+            leading=11,
+            italic=True,
+            textColor="#333333",
+            fontName="DejaVuSans" if _font_family_registered else styles["Normal"].fontName
+        ))
+        return styles
+
+    def payslip_title(self):
+        return copy.copy(self._payslip_title)
+
+    def data_title(self):
+        return copy.copy(self._data_title)
+
+    def report_title(self):
+        return copy.copy(self._report_title)
+
+    def scenarios_title(self):
+        return copy.copy(self._scenarios_title)
+
+    def disclaimer(self):
+        return [copy.copy(self._disclaimer), Spacer(1, 4)]
+
+
+_default_context = None
+_default_context_lock = threading.Lock()
+
+def get_render_context() -> PdfRenderContext:
+    """Process-wide shared render context, built on first use."""
+    global _default_context
+    if _default_context is None:
+        with _default_context_lock:
+            if _default_context is None:
+                _default_context = PdfRenderContext()
+    return _default_context
+
 # --- Main PDF builder -----------------------------------------------------
 
 def generate_pdf_report(confirmed_data: dict, final_report: str, payslip_text: str | None,
-                        country: str, tax_year: str, title: str = "Salary Analyzer & Tax Opportunity Report") -> bytes:
+                        country: str, tax_year: str, title: str = "Salary Analyzer & Tax Opportunity Report",
+                        context: PdfRenderContext | None = None, scenarios: list | None = None) -> bytes:
     """
     Build a readable PDF bytes object containing: header, payslip, parsed JSON and AI report.
+    `scenarios` are optional what-if rows (OptimizationResult.table(), see optimizer.py).
+    Pass a PdfRenderContext to control style/font reuse; defaults to the shared one.
     """
+    with span("pdf.render", report_chars=len(final_report or "")) as s:
+        pdf_bytes = _build_pdf_report(confirmed_data, final_report, payslip_text, country, tax_year, title,
+                                      context or get_render_context(), scenarios)
+        s.set(pdf_bytes=len(pdf_bytes))
+    return pdf_bytes
+
+
+def _build_pdf_report(confirmed_data: dict, final_report: str, payslip_text: str | None,
+                      country: str, tax_year: str, title: str, ctx: PdfRenderContext,
+                      scenarios: list | None = None) -> bytes:
+    styles = ctx.styles
+
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4,
                             leftMargin=18*mm, rightMargin=18*mm,
                             topMargin=18*mm, bottomMargin=18*mm)
 
-    styles = getSampleStyleSheet()
-
-    # Apply Unicode font family if registered; otherwise keep defaults but avoid using <b> tags in header
-    if _font_family_registered:
-        try:
-            styles["Normal"].fontName = "DejaVuSans"
-        except Exception:
-            pass
-
-    # Heading and monospace styles
-    styles.add(ParagraphStyle(
-        name="Heading1Custom",
-        parent=styles["Heading1"],
-        fontSize=14,
-        leading=16,
-        spaceAfter=6,
-        fontName="DejaVuSans" if _font_family_registered else styles["Heading1"].fontName
-    ))
-    styles.add(ParagraphStyle(
-        name="Heading2Custom",
-        parent=styles["Heading2"],
-        fontSize=12,
-        leading=14,
-        spaceAfter=4,
-        fontName="DejaVuSans" if _font_family_registered else styles["Heading2"].fontName
-    ))
-    styles.add(ParagraphStyle(
-        name="Heading3Custom",
-        parent=styles["Heading3"],
-        fontSize=11,
-        leading=13,
-        spaceAfter=3,
-        fontName="DejaVuSans" if _font_family_registered else styles["Heading3"].fontName
-    ))
-
-    mono_font_name = "DejaVuSansMono" if _mono_registered else (styles["Code"].fontName if "Code" in styles else None)
-    styles.add(ParagraphStyle(
-        name="Monospace",
-        parent=styles.get("Code", styles["Normal"]),
-        fontName=mono_font_name,
-        fontSize=9,
-        leading=12
-    ))
-
     flowables = []
 
     # Header / metadata
@@ -242,17 +348,17 @@ def generate_pdf_report(confirmed_data: dict, final_report: str, payslip_text: s
 
     # If font family is registered, it's safe to use <b> (ReportLab will map to bold TTF).
     # Otherwise, use plain text header to avoid mapping errors.
-    if _font_family_registered:
-        header_text = f"<b>{title}</b><br/>{country} \u2014 {tax_year} <br/>Generated: {timestamp}"
+    if ctx.font_family_registered:
+        header_text = f"<b>{escape(title)}</b><br/>{escape(country)} \u2014 {escape(tax_year)} <br/>Generated: {timestamp}"
     else:
-        header_text = f"{title}\n{country} — {tax_year}\nGenerated: {timestamp}"
+        header_text = escape(f"{title}\n{country} — {tax_year}\nGenerated: {timestamp}")
 
     flowables.append(Paragraph(header_text, styles["Heading1Custom"]))
     flowables.append(Spacer(1, 6))
 
     # Original Payslip (if present)
     if payslip_text:
-        flowables.append(Paragraph("Original Payslip Text (as pasted):", styles["Heading2Custom"]))
+        flowables.append(ctx.payslip_title())
         sanitized = _sanitize_text(payslip_text)
         wrapped = _wrap_text(sanitized, width=95)
         # Use Preformatted to preserve basic structure but wrapped to avoid cutoff
@@ -260,39 +366,358 @@ def generate_pdf_report(confirmed_data: dict, final_report: str, payslip_text: s
         flowables.append(Spacer(1, 8))
 
     # Confirmed Parsed JSON
-    flowables.append(Paragraph("Parsed / Confirmed Monthly Data (JSON):", styles["Heading2Custom"]))
+    flowables.append(ctx.data_title())
     pretty_json = json.dumps(confirmed_data or {}, indent=2, ensure_ascii=False)
     wrapped_json = _wrap_text(pretty_json, width=95)
     flowables.append(Preformatted(wrapped_json, styles["Monospace"]))
     flowables.append(Spacer(1, 8))
 
     # AI Report - convert markdown-like to flowables
-    flowables.append(Paragraph("AI Analysis Report:", styles["Heading2Custom"]))
+    flowables.append(ctx.report_title())
     sanitized_report = _sanitize_text(final_report or "")
     sanitized_report = re.sub(r"\n{3,}", "\n\n", sanitized_report)
     md_flowables = _markdown_to_flowables(sanitized_report, styles)
     flowables.extend(md_flowables)
     flowables.append(Spacer(1, 8))
 
+    # What-if scenarios (computed locally)
+    if scenarios:
+        flowables.append(ctx.scenarios_title())
+        flowables.append(_scenarios_table(scenarios, styles))
+        flowables.append(Spacer(1, 8))
+
     # AI disclaimer
-    disclaimer = (
-        "Disclaimer: This report was automatically generated by an AI agent for informational and educational "
-        "purposes only. It does not constitute professional tax, legal, or financial advice. "
-        "Please consult a qualified tax or financial professional before making any decisions based on this report."
-    )
-    flowables.append(Paragraph(disclaimer, ParagraphStyle(
-        name="Disclaimer",
-        parent=styles["Normal"],
-        fontSize=9,
-        leading=11,
-        italic=True,
-        textColor="#333333",
-        fontName="DejaVuSans" if _font_family_registered else styles["Normal"].fontName
-    )))
-    flowables.append(Spacer(1, 4))
+    flowables.extend(ctx.disclaimer())
 
     # Build PDF
     doc.build(flowables)
     pdf_bytes = buffer.getvalue()
     buffer.close()
     return pdf_bytes
+
+
+def _scenarios_table(rows: list, styles) -> Table:
+    cell = ParagraphStyle("ScenarioCell", parent=styles["Normal"], fontSize=7.5, leading=9)
+    header = [Paragraph(escape(str(h)), cell) for h in rows[0]]
+    body = [[Paragraph(escape(str(v)), cell) for v in row.values()] for row in rows]
+    table = Table([header] + body, repeatRows=1)
+    table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), "#e8e8e8"),
+        ("GRID", (0, 0), (-1, -1), 0.25, "#999999"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ]))
+    return table
+
+
+# --- Consolidated (multi-employee) report ----------------------------------
+
+CONSOLIDATED_CHUNK_EMPLOYEES = 100
+
+
+class _IncrementalDocTemplate(BaseDocTemplate):
+    """
+    A doc template that is fed flowables section by section instead of being
+    handed one big list. This drives the same internals as
+    BaseDocTemplate.build (_startBuild / handle_flowable / _endBuild), so each
+    section's flowables can be dropped as soon as they are laid out.
+
+    Page footers read "Page N" counting from `first_page` (or roman numerals
+    for front matter), so chunks of one document number continuously.
+    """
+
+    def __init__(self, output, first_page: int = 1, roman: bool = False, **kwargs):
+        super().__init__(output, pagesize=A4,
+                         leftMargin=18*mm, rightMargin=18*mm,
+                         topMargin=18*mm, bottomMargin=18*mm,
+                         pageCompression=1, **kwargs)
+        frame = Frame(self.leftMargin, self.bottomMargin, self.width, self.height, id="body")
+        self.addPageTemplates([PageTemplate(id="page", frames=[frame], onPage=self._draw_page_number)])
+        self.page_offset = first_page - 1
+        self.roman = roman
+        self.toc_entries = []  # (title, page number); small, one tuple per section
+
+    def _draw_page_number(self, canv, doc):
+        number = doc.page + self.page_offset
+        canv.saveState()
+        canv.setFont("Helvetica", 8)
+        canv.drawRightString(A4[0] - 18*mm, 10*mm, f"Page {_roman(number) if self.roman else number}")
+        canv.restoreState()
+
+    def afterFlowable(self, flowable):
+        # Section headings carry a title; record where they landed for the contents.
+        title = getattr(flowable, "_toc_title", None)
+        if title:
+            self.toc_entries.append((title, self.page + self.page_offset))
+
+    def begin(self):
+        self._startBuild()
+        self.canv._doctemplate = self
+
+    def feed(self, flowables: list):
+        while flowables:
+            self.clean_hanging()
+            self.handle_flowable(flowables)
+
+    def finish(self) -> int:
+        """Save the file; returns its page count."""
+        del self.canv._doctemplate
+        self._endBuild()
+        return self.page
+
+
+def _roman(number: int) -> str:
+    numerals = [(1000, "m"), (900, "cm"), (500, "d"), (400, "cd"), (100, "c"), (90, "xc"),
+                (50, "l"), (40, "xl"), (10, "x"), (9, "ix"), (5, "v"), (4, "iv"), (1, "i")]
+    out = ""
+    for value, numeral in numerals:
+        while number >= value:
+            out += numeral
+            number -= value
+    return out
+
+
+def _employee_section(index: int, name: str, confirmed_data: dict, report: str, ctx: PdfRenderContext) -> list:
+    styles = ctx.styles
+    heading = Paragraph(escape(f"{index}. {name}"), styles["Heading1Custom"])
+    heading._toc_title = f"{index}. {name}"
+
+    flowables = [heading, Spacer(1, 6), ctx.data_title()]
+    pretty_json = json.dumps(confirmed_data or {}, indent=2, ensure_ascii=False)
+    flowables.append(Preformatted(_wrap_text(pretty_json, width=95), styles["Monospace"]))
+    flowables.append(Spacer(1, 8))
+    flowables.append(ctx.report_title())
+    flowables.extend(_markdown_to_flowables(_sanitize_text(report or ""), styles))
+    flowables.append(PageBreak())
+    return flowables
+
+
+def write_consolidated_report(records: Iterable, output, country: str, tax_year: str,
+                              title: str = "Consolidated Salary & Tax Opportunity Report",
+                              context: PdfRenderContext | None = None,
+                              chunk_employees: int = CONSOLIDATED_CHUNK_EMPLOYEES) -> int:
+    """
+    Write one multi-section PDF for many employees to `output` (a file path or
+    a binary file-like object), consuming `records` lazily.
+
+    Each record is (confirmed_data, report) or (confirmed_data, report, name).
+    Employees are rendered `chunk_employees` at a time into temporary PDFs
+    that are saved as soon as each chunk is complete, so ReportLab never holds
+    more than one chunk's pages. The front matter (title page and a table of
+    contents with page numbers, numbered i, ii, ...) is rendered last, and
+    everything is concatenated with pypdf, with a bookmark per employee.
+
+    Returns the number of employee sections written.
+    """
+    with span("pdf.consolidated") as s:
+        count = _write_consolidated(records, output, country, tax_year, title, context or get_render_context(),
+                                    max(1, chunk_employees))
+        s.set(employees=count)
+    return count
+
+
+def _consolidated_front_matter(path: str, entries: list, country: str, tax_year: str, title: str,
+                               ctx: PdfRenderContext) -> int:
+    styles = ctx.styles
+    try:
+        tz = ZoneInfo("Asia/Kolkata")
+        timestamp = datetime.now(tz).strftime("%Y-%m-%d %H:%M:%S %Z")
+    except Exception:
+        timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
+
+    if ctx.font_family_registered:
+        header_text = f"<b>{escape(title)}</b><br/>{escape(country)} \u2014 {escape(tax_year)} <br/>Generated: {timestamp}"
+    else:
+        header_text = escape(f"{title}\n{country} — {tax_year}\nGenerated: {timestamp}")
+    doc = _IncrementalDocTemplate(path, roman=True, title=title)
+    doc.begin()
+    doc.feed([
+        Paragraph(header_text, styles["Heading1Custom"]),
+        Spacer(1, 6),
+        Paragraph("Use the PDF bookmarks panel, or the contents below, to jump to an employee.", styles["Normal"]),
+        Spacer(1, 12),
+        Paragraph("Contents", styles["Heading2Custom"]),
+    ])
+    for start in range(0, len(entries), 200):
+        doc.feed([Paragraph(f"{escape(entry_title)} .......... page {page}", styles["Normal"])
+                  for entry_title, page in entries[start:start + 200]])
+    return doc.finish()
+
+
+class _StreamingPdfMerger:
+    """
+    Concatenate PDFs into one output stream, one source file at a time.
+
+    pypdf.PdfWriter keeps every appended page in memory until write(); here
+    each source's page objects are renumbered and written out as soon as they
+    are read, so only the xref offsets and page ids are kept and memory does
+    not grow with the page count. Fonts and other shared resources are
+    written once per source file, which is why sources should be chunks of
+    many pages rather than single pages.
+    """
+
+    _CATALOG, _PAGES, _OUTLINES = 1, 2, 3
+
+    def __init__(self, output):
+        self._out = output
+        self._pos = 0
+        self._offsets = [0, 0, 0]  # catalog, page tree and outlines are written last
+        self._page_ids = []
+        self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    @property
+    def page_count(self) -> int:
+        return len(self._page_ids)
+
+    def _emit(self, data: bytes):
+        self._out.write(data)
+        self._pos += len(data)
+
+    def _new_id(self) -> int:
+        self._offsets.append(0)
+        return len(self._offsets)
+
+    def _write_object(self, idnum: int, obj):
+        buffer = BytesIO()
+        obj.write_to_stream(buffer)
+        self._offsets[idnum - 1] = self._pos
+        self._emit(f"{idnum} 0 obj\n".encode() + buffer.getvalue() + b"\nendobj\n")
+
+    def append(self, path: str):
+        from pypdf import PdfReader
+        from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject
+
+        reader = PdfReader(path)
+        ids = {}       # source object number -> output object number
+        pending = []   # referenced objects not yet written
+
+        def remap(obj):
+            # The reader is discarded afterwards, so its objects are rewritten in place.
+            if isinstance(obj, IndirectObject):
+                if obj.idnum not in ids:
+                    ids[obj.idnum] = self._new_id()
+                    pending.append(obj)
+                return IndirectObject(ids[obj.idnum], 0, None)
+            if isinstance(obj, DictionaryObject):
+                for key, value in list(obj.items()):
+                    obj[key] = remap(value)
+            elif isinstance(obj, ArrayObject):
+                for i, value in enumerate(obj):
+                    obj[i] = remap(value)
+            return obj
+
+        for page in reader.pages:
+            # reader.pages already carries inherited attributes (resources, media box).
+            page_id = ids.setdefault(page.indirect_reference.idnum, self._new_id())
+            page.pop(NameObject("/Parent"), None)
+            remap(page)
+            page[NameObject("/Parent")] = IndirectObject(self._PAGES, 0, None)
+            self._write_object(page_id, page)
+            self._page_ids.append(page_id)
+            while pending:
+                ref = pending.pop()
+                self._write_object(ids[ref.idnum], remap(ref.get_object()))
+
+    def close(self, outline: list, title: str):
+        """
+        Write the page tree, a flat outline of (title, page index) bookmarks,
+        the catalog and the cross-reference table.
+        """
+        from pypdf.generic import (ArrayObject, DictionaryObject, IndirectObject, NameObject,
+                                   NumberObject, TextStringObject)
+
+        def ref(idnum):
+            return IndirectObject(idnum, 0, None)
+
+        self._write_object(self._PAGES, DictionaryObject({
+            NameObject("/Type"): NameObject("/Pages"),
+            NameObject("/Kids"): ArrayObject(ref(i) for i in self._page_ids),
+            NameObject("/Count"): NumberObject(len(self._page_ids)),
+        }))
+
+        item_ids = [self._new_id() for _ in outline]
+        for n, (entry_title, page_index) in enumerate(outline):
+            item = DictionaryObject({
+                NameObject("/Title"): TextStringObject(entry_title),
+                NameObject("/Parent"): ref(self._OUTLINES),
+                NameObject("/Dest"): ArrayObject([ref(self._page_ids[page_index]), NameObject("/Fit")]),
+            })
+            if n:
+                item[NameObject("/Prev")] = ref(item_ids[n - 1])
+            if n + 1 < len(item_ids):
+                item[NameObject("/Next")] = ref(item_ids[n + 1])
+            self._write_object(item_ids[n], item)
+        outlines = DictionaryObject({NameObject("/Type"): NameObject("/Outlines"),
+                                     NameObject("/Count"): NumberObject(len(item_ids))})
+        if item_ids:
+            outlines[NameObject("/First")] = ref(item_ids[0])
+            outlines[NameObject("/Last")] = ref(item_ids[-1])
+        self._write_object(self._OUTLINES, outlines)
+
+        self._write_object(self._CATALOG, DictionaryObject({
+            NameObject("/Type"): NameObject("/Catalog"),
+            NameObject("/Pages"): ref(self._PAGES),
+            NameObject("/Outlines"): ref(self._OUTLINES),
+            NameObject("/PageMode"): NameObject("/UseOutlines"),
+        }))
+        info_id = self._new_id()
+        self._write_object(info_id, DictionaryObject({NameObject("/Title"): TextStringObject(title)}))
+
+        xref_pos = self._pos
+        lines = [f"xref\n0 {len(self._offsets) + 1}\n", "0000000000 65535 f \n"]
+        lines += [f"{offset:010d} 00000 n \n" for offset in self._offsets]
+        lines.append(f"trailer\n<< /Size {len(self._offsets) + 1} /Root {self._CATALOG} 0 R "
+                     f"/Info {info_id} 0 R >>\nstartxref\n{xref_pos}\n%%EOF\n")
+        self._emit("".join(lines).encode("latin-1"))
+
+
+def _write_consolidated(records: Iterable, output, country: str, tax_year: str, title: str,
+                        ctx: PdfRenderContext, chunk_employees: int) -> int:
+    with tempfile.TemporaryDirectory(prefix="consolidated-") as tmp:
+        chunks = []   # paths of finished body chunks, in order
+        entries = []  # (title, body page number) per employee
+        pages = 0
+        doc = None
+        count = 0
+
+        def open_chunk():
+            path = os.path.join(tmp, f"body-{len(chunks):05d}.pdf")
+            chunks.append(path)
+            chunk = _IncrementalDocTemplate(path, first_page=pages + 1, title=title)
+            chunk.begin()
+            return chunk
+
+        for record in records:
+            if doc is None:
+                doc = open_chunk()
+            count += 1
+            confirmed_data, report = record[0], record[1]
+            name = record[2] if len(record) > 2 and record[2] else f"Employee {count}"
+            doc.feed(_employee_section(count, name, confirmed_data, report, ctx))
+            if count % chunk_employees == 0:
+                pages += doc.finish()
+                entries.extend(doc.toc_entries)
+                doc = None
+
+        if doc is None:
+            doc = open_chunk()
+        doc.feed(ctx.disclaimer())
+        pages += doc.finish()
+        entries.extend(doc.toc_entries)
+
+        front_path = os.path.join(tmp, "front.pdf")
+        front_pages = _consolidated_front_matter(front_path, entries, country, tax_year, title, ctx)
+
+        outline = [(entry_title, front_pages + page - 1) for entry_title, page in entries]
+        if isinstance(output, (str, os.PathLike)):
+            with open(output, "wb") as f:
+                _merge_pdfs([front_path] + chunks, f, outline, title)
+        else:
+            _merge_pdfs([front_path] + chunks, output, outline, title)
+    return count
+
+
+def _merge_pdfs(paths: list, output, outline: list, title: str):
+    merger = _StreamingPdfMerger(output)
+    for path in paths:
+        merger.append(path)
+    merger.close(outline, title)
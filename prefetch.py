@@ -0,0 +1,132 @@
+"""
+Speculative analysis prefetch.
+
+As soon as a payslip is parsed, the analysis call is started on a background
+thread while the user reads the confirmation step. The result is keyed by the
+exact parsed data, country, tax year and tax rules:
+
+- on confirm with unchanged inputs, the report is streamed from the prefetch
+  (already complete, or attached to while it is still arriving);
+- if the inputs change or the user starts over, the prefetch is cancelled:
+  the stream is closed so no more tokens are generated, and nothing is kept.
+"""
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import canonical_json
+from errors import AnalysisError
+
+DEFAULT_PREFETCH_WORKERS = 4
+
+
+def prefetch_key(confirmed_data: dict, country: str, tax_year: str, tax_rules_string: str,
+                 annualize_factor: int = 12) -> str:
+    """Identity of an analysis request; any change to the inputs changes the key."""
+    material = canonical_json([confirmed_data, str(country).lower(), str(tax_year).strip(), tax_rules_string,
+                               annualize_factor])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class PrefetchHandle:
+    """One in-flight (or finished) speculative analysis."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.error = None
+        self.future = None
+        self._chunks = []
+        self._done = False
+        self._cancelled = threading.Event()
+        self._cond = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        with self._cond:
+            return self._done
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def matches(self, key: str) -> bool:
+        return self.key == key and not self.cancelled and self.error is None
+
+    def cancel(self):
+        """Stop the prefetch; its output is discarded."""
+        self._cancelled.set()
+        if self.future is not None and self.future.cancel():
+            # Never started: mark finished so no reader waits on it.
+            self._finish()
+
+    def _finish(self):
+        with self._cond:
+            self._done = True
+            self._cond.notify_all()
+
+    def _run(self, agent, confirmed_data, country, tax_year, tax_rules_string, annualize_factor):
+        try:
+            chunks = agent.stream_analysis_report(confirmed_data, country, tax_year, tax_rules_string,
+                                                  annualize_factor=annualize_factor)
+            try:
+                for chunk in chunks:
+                    if self._cancelled.is_set():
+                        break
+                    with self._cond:
+                        self._chunks.append(chunk)
+                        self._cond.notify_all()
+            finally:
+                # Closing the generator closes the HTTP stream on cancel.
+                chunks.close()
+        except Exception as e:
+            self.error = e
+        finally:
+            self._finish()
+
+    def stream(self):
+        """
+        Yield the report chunks: those already received, then the rest as they
+        arrive. Raises the prefetch's error, or AnalysisError if it was cancelled.
+        """
+        position = 0
+        while True:
+            with self._cond:
+                while position >= len(self._chunks) and not self._done:
+                    self._cond.wait()
+                new_chunks = self._chunks[position:]
+                position = len(self._chunks)
+                finished = self._done
+            yield from new_chunks
+            if finished and position >= len(self._chunks):
+                break
+        if self.error is not None:
+            raise self.error
+        if self.cancelled:
+            raise AnalysisError("The prefetched analysis was cancelled.")
+
+    def result(self) -> str:
+        """Block until finished and return the full report."""
+        return "".join(self.stream())
+
+
+class AnalysisPrefetcher:
+    """Runs speculative analysis calls on a small shared thread pool."""
+
+    def __init__(self, max_workers: int | None = None):
+        if max_workers is None:
+            max_workers = int(os.getenv("PREFETCH_WORKERS", DEFAULT_PREFETCH_WORKERS))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="prefetch")
+
+    def start(self, agent, confirmed_data: dict, country: str, tax_year: str,
+              tax_rules_string: str, annualize_factor: int = 12) -> PrefetchHandle:
+        """Start the analysis in the background and return its handle."""
+        handle = PrefetchHandle(prefetch_key(confirmed_data, country, tax_year, tax_rules_string, annualize_factor))
+        # Snapshot the data so later edits by the caller cannot leak into the request.
+        handle.future = self._executor.submit(
+            handle._run, agent, dict(confirmed_data), country, tax_year, tax_rules_string, annualize_factor
+        )
+        return handle
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,9 +1,19 @@
+from functools import lru_cache
+
+# Bump whenever PARSER_SYSTEM_PROMPT or ANALYSIS_SYSTEM_PROMPT_TEMPLATE changes,
+# so cached LLM responses produced by an older prompt are not reused.
+PROMPT_VERSION = "5"
+
 # --- Initial Disclaimers (for Streamlit sidebar) ---
 
 DATA_HANDLING_WARNING = """
 **IMPORTANT: For your privacy, please delete or black out your Name, Entry Date, 
 PAN, Company Name, Employee ID, and Bank Account Numbers before pasting.**
 
+As a safeguard, identifiers we recognise (names, IDs, PAN, bank and contact 
+details) are masked automatically, and lines unrelated to your salary are 
+dropped, before any text is sent to the AI model.
+
 This data is used only for this analysis and is not stored or 
 used for any other purpose.
 """
@@ -25,7 +35,7 @@ any decisions.
 """
 
 # --- System Prompt for Call 1: The Parser ---
-# (This is unchanged from the original design)
+# Extends the original design with line items and the pay period (see tools.py).
 PARSER_SYSTEM_PROMPT = """
 You are a 'Payslip Parser Engine'. Your sole function is to read the user's
 pasted text and extract salary components into the 'PayslipComponents' tool.
@@ -37,17 +47,24 @@ Identify the following components:
 - Professional Tax
 - Leave Travel Allowance (LTA)
 - Special Allowance
-- Any other recurring monthly component.
-
-If a value is not present, do not guess. Simply omit it from the tool call.
-All values should be for a *single month* if possible (e.g., if the text
-says "Basic Pay: 600,000 per year", you should calculate and use 50,000).
-If the text is unclear and only provides annual, use the annual figure.
+- Health Insurance Premium (mediclaim) deducted from pay
+- Any other recurring component goes in `line_items`, with its label as
+  printed, its amount and whether it is an earning or a deduction. Leave out
+  totals (gross, net, total deductions) and employer-side contributions.
+
+If a value is not present, do not guess. Set it to null.
+Copy amounts exactly as written, as plain numbers, and do not convert them:
+set `period` to "annual" if the figures are yearly (e.g. "Basic Pay: 600,000
+per year") and to "monthly" otherwise; annual figures are converted for you.
+Identifiers may appear masked as [NAME], [PAN], [ACCOUNT] etc.; ignore them.
 Your tool call will be used to ask the user for confirmation, so precision is key.
 """
 
 # --- System Prompt for Call 2: The Analyst ---
 # (This is the MODIFIED prompt for a static Streamlit report)
+# Everything that does not depend on (country, tax_year) comes first, so the
+# start of the prompt is byte-identical across calls and can be reused by
+# provider-side prompt caching. The TAX RULES block is last.
 ANALYSIS_SYSTEM_PROMPT_TEMPLATE = """
 # AGENT PERSONA: Confidential Tax Analyst
 You are a precise, mathematical, secure, and structured data-processing tool.
@@ -62,11 +79,11 @@ Your task is to analyze the user's *confirmed* monthly salary JSON data
 and the provided country-specific tax rules. You will generate a
 "Personalized Tax Opportunity Report".
 
-# TAX RULES (for {country} - {tax_year})
-Below is the tax rules JSON you should use to look up numeric limits and
-deduction names. Use these values directly in calculations and statements.
-
-{tax_rules}
+# PRECOMPUTED FIGURES
+The user message may include a "Precomputed Figures" block produced by an
+exact calculation engine from the same tax rules. When it is present, use
+those numbers verbatim for every amount in Sections 1 and 2 and do not redo
+or alter the arithmetic; quote the formula shown instead of re-deriving it.
 
 # WORKFLOW & REPORT STRUCTURE
 You MUST follow this step-by-step reporting structure. Use Markdown.
@@ -74,7 +91,7 @@ You MUST follow this step-by-step reporting structure. Use Markdown.
 ## Section 1: Your Existing Tax Savings (Already Active)
 - Acknowledge the deductions already being used.
 - Calculate and present the *annualized* value of these deductions.
-- Example: "**Standard Deduction:** Use the 'Standard_Deduction' value from the TAX_RULES block above."
+- Example: "**Standard Deduction:** Use the 'Standard_Deduction' value from the TAX RULES block below."
 - Example: "**Employee's PF Contribution:** Annualize the parsed monthly PF contribution from the confirmed JSON (multiply by 12) and explain how it counts toward the Section 80C limit if applicable."
 - Example: "**Professional Tax:** Annualize the parsed monthly PT and declare whether it is deductible as per TAX_RULES."
 
@@ -86,7 +103,7 @@ You MUST follow this step-by-step reporting structure. Use Markdown.
   - State the user's HRA component (annualized) and tell the user to compute HRA exemption using actual rent, basic salary, and city — reference the TAX_RULES values only for limits (if any).
 - For **Section 80C Gap Analysis**:
   - Compute `total_80c_used` as the annualized PF contribution (monthly PF * 12) plus any other confirmed 80C items (if the confirmed JSON contains them).
-  - Use the `80C_Limit` value from TAX_RULES above to compute `gap = 80C_Limit - total_80c_used`.
+  - Use the `80C_Limit` value from TAX_RULES below to compute `gap = 80C_Limit - total_80c_used`.
   - If `gap` > 0, present the numeric gap and show concrete arithmetic.
   - If `gap` <= 0, state that the 80C limit is already fully utilized.
 
@@ -101,4 +118,24 @@ You MUST follow this step-by-step reporting structure. Use Markdown.
 # FINAL OUTPUT
 Begin your response immediately with the report. Do not add any conversational preamble. Start with:
 "### Analysis complete. Here is your Personalized Tax Opportunity Report:"
+
+# TAX RULES (for {country} - {tax_year})
+Below is the tax rules JSON you should use to look up numeric limits and
+deduction names. Use these values directly in calculations and statements.
+
+{tax_rules}
 """
+
+
+@lru_cache(maxsize=128)
+def build_analysis_system_prompt(country: str, tax_year: str, tax_rules_string: str) -> str:
+    """
+    The analysis system prompt for one (country, tax_year, rules) combination.
+    Only the exact placeholders are substituted (no str.format(), the rules
+    JSON contains braces), and the result is cached; it only changes when the
+    rules do.
+    """
+    return (ANALYSIS_SYSTEM_PROMPT_TEMPLATE
+            .replace("{country}", str(country))
+            .replace("{tax_year}", str(tax_year))
+            .replace("{tax_rules}", str(tax_rules_string)))
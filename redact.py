@@ -0,0 +1,201 @@
+"""
+Local relevance pruning and PII redaction for payslip text.
+
+Runs before the parsing LLM call so the model only sees what it needs:
+
+1. Identity fields are masked by label (name, employee ID, PAN, UAN,
+   PF/ESI numbers, bank account, IFSC, address, dates of birth/joining),
+   e.g. "Employee Name: A. Kumar" -> "Employee Name: [NAME]".
+2. Identifier patterns are masked wherever they appear (PAN, IFSC, SSN,
+   e-mail). Digit-only identifiers (Aadhaar, phone, long account-like runs)
+   need a label or a +country code, and are never masked on a line with an
+   earning or deduction, whose digit groups are amount columns.
+3. Lines with no salary relevance are dropped: identity/bank/address lines,
+   leave and attendance balances, HR details, and boilerplate without
+   amounts or salary keywords. Headers that carry the pay period are kept,
+   since monthly vs. annual detection depends on them.
+
+The result reports what was removed, including the estimated number of
+prompt tokens saved.
+"""
+import re
+from dataclasses import dataclass, field
+
+from local_parser import FIELD_SYNONYMS
+from tokens import count_tokens
+
+# (kind, pattern) masked anywhere in a kept line. Order matters: specific first.
+# These cannot be mistaken for amounts (letters, @, or a fixed dashed layout).
+_PATTERNS = [
+    ("EMAIL", re.compile(r"\b[\w.+-]+@[\w-]+\.[\w.-]+\b")),
+    ("PAN", re.compile(r"\b[A-Z]{5}\d{4}[A-Z]\b")),
+    ("IFSC", re.compile(r"\b[A-Z]{4}0[A-Z0-9]{6}\b")),
+    ("SSN", re.compile(r"\b\d{3}-\d{2}-\d{4}\b")),
+]
+
+# Digit runs look like amount columns ("HRA 2000 2000 2000"), so they are only
+# masked with context (a label or a +country code; only the value group is
+# replaced), and never on a line that carries an earning or deduction.
+_DIGIT_PATTERNS = [
+    ("AADHAAR", re.compile(r"\baadhaa?r(?:\s*(?:no\.?|number|card))?\s*[:#-]?\s*(?P<value>\d{4}[ -]?\d{4}[ -]?\d{4})\b", re.I)),
+    ("PHONE", re.compile(r"(?:\b(?:mobile|phone|tel|contact)(?:\s*no\.?)?\s*[:#-]?\s*)?"
+                         r"(?P<value>\+\d{1,3}[ -]?(?:\d[ -]?){8,11}\d)\b", re.I)),
+    ("PHONE", re.compile(r"\b(?:mobile|phone|tel)(?:\s*no\.?)?\s*[:#-]?\s*(?P<value>(?:\d[ -]?){9,11}\d)\b", re.I)),
+    # 9+ contiguous digits is an account/ID number, never a grouped amount.
+    ("ACCOUNT", re.compile(r"(?<![\d,.])(?P<value>\d{9,18})(?![\d,.])")),
+]
+
+# Identity labels: the value after the label is masked and the line dropped.
+_IDENTITY_LABEL = re.compile(
+    r"(?P<label>\b(?:employee|emp|staff|father'?s?|spouse|mother'?s?)?\s*(?:full\s+)?name"
+    r"|\b(?:employee|emp|staff|personnel)\s*(?:code|id|no\.?|number)"
+    r"|\bpan(?:\s*(?:no\.?|number|card))?"
+    r"|\buan(?:\s*(?:no\.?|number))?"
+    r"|\b(?:pf|epf|esi|esic)\s*(?:a/?c\s*)?(?:no\.?|number|account(?:\s*no\.?)?)"
+    r"|\baadhaa?r(?:\s*(?:no\.?|number))?"
+    r"|\bbank(?:\s*name)?|\b(?:bank\s*)?a/?c(?:count)?\s*(?:no\.?|number)|\baccount\s*(?:no\.?|number)"
+    r"|\bifsc(?:\s*code)?|\baddress|\bdate\s+of\s+(?:birth|joining)|\bdob|\bdoj"
+    r"|\be-?mail(?:\s*id)?|\bmobile(?:\s*no\.?)?|\bphone(?:\s*no\.?)?|\bssn"
+    r")\s*[:\-]\s*(?P<value>[^:|\t]+?)(?=\s{2,}|\t|\||$)",
+    re.I,
+)
+
+# Earning/deduction items without a dedicated field (see LineItem); with the
+# component labels they mark lines whose digits are amounts.
+_LINE_ITEM_RE = re.compile(
+    r"\b(conveyance|medical|transport|food|meal|canteen|uniform|washing|shift|overtime|bonus|incentive"
+    r"|reimbursement|arrears?|loan|advance|recovery|esi|esic|lwf|labour\s+welfare|gratuity|nps|vpf"
+    r"|insurance|premium|tds|income\s+tax|allowance|deduction|earning)s?\b",
+    re.I,
+)
+
+# Lines about these are never salary components.
+_IRRELEVANT = re.compile(
+    r"\b(leave|balance|lop|loss\s+of\s+pay\s+days|days?\s+(?:paid|worked|present|absent)|attendance"
+    r"|designation|department|location|grade|cost\s+cent(?:er|re)|branch|signature|computer\s+generated"
+    r"|discrepanc|confidential|page\s+\d+)\b",
+    re.I,
+)
+
+_SALARY_WORDS = sorted({word for synonyms in FIELD_SYNONYMS.values() for word in synonyms} | {
+    "salary", "earning", "earnings", "deduction", "deductions", "gross", "net pay", "net salary", "total",
+    "allowance", "bonus", "incentive", "reimbursement", "tax", "tds", "insurance", "premium", "401k",
+    "ctc", "arrears", "overtime", "amount", "payslip", "pay slip", "per annum", "per month", "monthly",
+    "annual", "month of", "pay period", "ytd", "current",
+}, key=len, reverse=True)
+_SALARY_RE = re.compile(r"\b(" + "|".join(re.escape(w) for w in _SALARY_WORDS) + r")\b", re.I)
+
+_COMPONENT_RE = re.compile(
+    r"\b(" + "|".join(re.escape(w) for w in sorted(
+        {w for synonyms in FIELD_SYNONYMS.values() for w in synonyms if len(w) > 4}, key=len, reverse=True
+    )) + r")\b", re.I,
+)
+# A grouped or plain amount of at least three digits (not a masked placeholder or a day count).
+_AMOUNT_RE = re.compile(r"(?<![\w.])\d{1,3}(?:,\d{2,3})+(?:\.\d+)?\b|(?<![\w.,])\d{3,8}(?:\.\d+)?\b")
+
+_LABEL_TAG = {
+    "name": "NAME", "pan": "PAN", "uan": "ID", "aadhaar": "AADHAAR", "aadhar": "AADHAAR", "ifsc": "IFSC",
+    "address": "ADDRESS", "mail": "EMAIL", "mobile": "PHONE", "phone": "PHONE", "birth": "DATE",
+    "joining": "DATE", "dob": "DATE", "doj": "DATE", "bank": "BANK", "account": "ACCOUNT", "a/c": "ACCOUNT",
+    "ssn": "SSN",
+}
+
+
+@dataclass
+class RedactionResult:
+    """Redacted text plus what was removed."""
+    text: str
+    original_tokens: int
+    redacted_tokens: int
+    dropped_lines: int = 0
+    masked: dict = field(default_factory=dict)
+
+    @property
+    def tokens_removed(self) -> int:
+        return self.original_tokens - self.redacted_tokens
+
+    def summary(self) -> dict:
+        return {"tokens_removed": self.tokens_removed, "original_tokens": self.original_tokens,
+                "dropped_lines": self.dropped_lines, "masked": dict(self.masked)}
+
+
+def _tag_for(label: str) -> str:
+    label = label.lower()
+    for word, tag in _LABEL_TAG.items():
+        if word in label:
+            return tag
+    return "ID"
+
+
+def _has_pay_items(line: str) -> bool:
+    return bool(_COMPONENT_RE.search(line) or _LINE_ITEM_RE.search(line))
+
+
+def _mask_value(pattern, kind: str, line: str, count):
+    """Replace the pattern's `value` group (the whole match if it has none) with [KIND]."""
+    def replace(match):
+        count(kind)
+        if "value" not in pattern.groupindex:
+            return f"[{kind}]"
+        start, end = match.span("value")
+        offset = match.start()
+        text = match.group(0)
+        return text[:start - offset] + f"[{kind}]" + text[end - offset:]
+    return pattern.sub(replace, line)
+
+
+def _is_relevant(line: str) -> bool:
+    """
+    Component labels always count; otherwise attendance/HR lines are dropped,
+    and any other line is kept if it has an amount or a salary keyword.
+    """
+    if _COMPONENT_RE.search(line):
+        return True
+    if _IRRELEVANT.search(line):
+        return False
+    return bool(_SALARY_RE.search(line) or _AMOUNT_RE.search(line))
+
+
+def redact_payslip(text: str) -> RedactionResult:
+    """Mask identifiers and drop lines with no salary relevance."""
+    masked = {}
+    kept = []
+    dropped = 0
+
+    def count(kind):
+        masked[kind] = masked.get(kind, 0) + 1
+
+    for raw in (text or "").splitlines():
+        line = raw.rstrip()
+        if not line.strip():
+            continue
+
+        identity_only = False
+        if _IDENTITY_LABEL.search(line):
+            def mask_label(match):
+                tag = _tag_for(match.group("label"))
+                count(tag)
+                return f"{match.group('label')}: [{tag}]"
+            line = _IDENTITY_LABEL.sub(mask_label, line)
+            # A line that is only identity fields carries nothing for the parser.
+            identity_only = not _SALARY_RE.search(_IDENTITY_LABEL.sub("", raw))
+
+        for kind, pattern in _PATTERNS:
+            line = _mask_value(pattern, kind, line, count)
+        if not _has_pay_items(line):
+            for kind, pattern in _DIGIT_PATTERNS:
+                line = _mask_value(pattern, kind, line, count)
+
+        if identity_only or not _is_relevant(line):
+            dropped += 1
+            continue
+        kept.append(line)
+
+    redacted = "\n".join(kept)
+    return RedactionResult(
+        text=redacted,
+        original_tokens=count_tokens(text or ""),
+        redacted_tokens=count_tokens(redacted),
+        dropped_lines=dropped,
+        masked=masked,
+    )
@@ -0,0 +1,358 @@
+"""
+Resilient HTTP layer for the OpenAI client.
+
+- One pooled, keep-alive HTTP client per process (sync and async), shared by
+  every agent instance, with explicit connect/read timeouts.
+- Retries of transient failures (429, 5xx, timeouts, connection errors) with
+  exponential backoff and full jitter. A server's Retry-After is waited out
+  in full when it fits in the per-call retry deadline; otherwise the error
+  (e.g. RateLimitedError with retry_after) is raised at once.
+- A circuit breaker that fails fast while the provider is degraded.
+- Failures surface as typed errors (see errors.py: RateLimitedError,
+  ProviderTimeoutError, ProviderUnavailableError, CircuitOpenError).
+
+The OpenAI SDK's own retries are disabled (max_retries=0) so that the retry
+budget, backoff and breaker are all decided here. The SDK itself (the bulk of
+the app's import time) is imported on first use: LazyOpenAIClient is a
+placeholder that builds the pooled client on the first request, so a
+process that only takes the local fast path never imports openai.
+
+Environment variables (all optional):
+    OPENAI_CONNECT_TIMEOUT      seconds, default 5
+    OPENAI_READ_TIMEOUT         seconds, default 60
+    OPENAI_MAX_CONNECTIONS      pool size, default 20
+    OPENAI_MAX_RETRIES          retries after the first attempt, default 3
+    OPENAI_RETRY_BASE_DELAY     seconds, default 0.5
+    OPENAI_RETRY_MAX_DELAY      backoff cap in seconds (not applied to Retry-After), default 20
+    OPENAI_RETRY_DEADLINE       total seconds a call may spend retrying, default 60
+    OPENAI_BREAKER_THRESHOLD    consecutive failures to open, default 5
+    OPENAI_BREAKER_RESET        seconds before a trial call, default 30
+"""
+import asyncio
+import email.utils
+import logging
+import os
+import random
+import threading
+import sys
+import time
+
+from errors import (
+    AgentError,
+    CircuitOpenError,
+    ProviderError,
+    ProviderTimeoutError,
+    ProviderUnavailableError,
+    RateLimitedError,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+# --- Shared pooled clients ----------------------------------------------------
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _http_options() -> dict:
+    import httpx  # installed with openai
+    import openai
+
+    return dict(
+        timeout=openai.Timeout(_env_float("OPENAI_READ_TIMEOUT", 60.0),
+                               connect=_env_float("OPENAI_CONNECT_TIMEOUT", 5.0)),
+        limits=httpx.Limits(max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", 20)),
+                            max_keepalive_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", 20)),
+                            keepalive_expiry=60.0),
+    )
+
+
+def get_openai_client(api_key: str | None = None, async_client: bool = False):
+    """
+    The process-wide OpenAI (or AsyncOpenAI) client on a shared connection
+    pool. SDK retries are off; wrap calls in ResilientTransport instead.
+    """
+    key = (api_key, async_client)
+    if key not in _clients:
+        import openai
+
+        with _clients_lock:
+            if key not in _clients:
+                options = _http_options()
+                if async_client:
+                    _clients[key] = openai.AsyncOpenAI(
+                        api_key=api_key, max_retries=0, timeout=options["timeout"],
+                        http_client=openai.DefaultAsyncHttpxClient(**options),
+                    )
+                else:
+                    _clients[key] = openai.OpenAI(
+                        api_key=api_key, max_retries=0, timeout=options["timeout"],
+                        http_client=openai.DefaultHttpxClient(**options),
+                    )
+    return _clients[key]
+
+
+class LazyOpenAIClient:
+    """
+    Stands in for get_openai_client(api_key, async_client) until an attribute
+    is first used (client.chat.completions.create), then forwards to the
+    shared client. Importing openai and building the HTTP pool is deferred
+    to the first LLM call instead of agent construction.
+    """
+
+    def __init__(self, api_key: str | None = None, async_client: bool = False):
+        self._api_key = api_key
+        self._async_client = async_client
+
+    def __getattr__(self, name):
+        return getattr(get_openai_client(self._api_key, self._async_client), name)
+
+
+# --- Retry policy ---------------------------------------------------------------
+
+def _retry_after(error) -> float | None:
+    """Seconds requested by a Retry-After / retry-after-ms header, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+def classify_error(error: Exception) -> ProviderError:
+    """Map an OpenAI SDK exception onto the typed ProviderError hierarchy."""
+    if isinstance(error, ProviderError):
+        return error
+    # An SDK exception implies the SDK is loaded; don't import it just to check.
+    openai = sys.modules.get("openai")
+    if openai is None:
+        return ProviderError(f"Provider call failed: {error}")
+    if isinstance(error, openai.RateLimitError):
+        return RateLimitedError(f"Rate limited by the provider: {error}", retry_after=_retry_after(error))
+    if isinstance(error, openai.APITimeoutError):
+        return ProviderTimeoutError(f"Request to the provider timed out: {error}")
+    if isinstance(error, openai.APIConnectionError):
+        return ProviderUnavailableError(f"Could not connect to the provider: {error}")
+    if isinstance(error, openai.APIStatusError):
+        status = error.status_code
+        if status >= 500 or status in (408, 409):
+            return ProviderUnavailableError(f"Provider error {status}: {error}", status_code=status)
+        return ProviderError(f"Provider rejected the request ({status}): {error}", status_code=status)
+    return ProviderError(f"Provider call failed: {error}")
+
+
+def _is_retryable(error: ProviderError) -> bool:
+    return isinstance(error, (RateLimitedError, ProviderTimeoutError, ProviderUnavailableError))
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, capped at `max_delay`. A server's
+    Retry-After wins when it is longer and is not capped; no retry is
+    scheduled past `deadline` seconds after the call started.
+    """
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 20.0,
+                 deadline: float = 60.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        return cls(
+            max_retries=int(os.getenv("OPENAI_MAX_RETRIES", 3)),
+            base_delay=_env_float("OPENAI_RETRY_BASE_DELAY", 0.5),
+            max_delay=_env_float("OPENAI_RETRY_MAX_DELAY", 20.0),
+            deadline=_env_float("OPENAI_RETRY_DEADLINE", 60.0),
+        )
+
+    def delay(self, attempt: int, error: ProviderError, elapsed: float = 0.0) -> float | None:
+        """
+        Seconds to wait before retry number `attempt + 1`, or None when the
+        wait would end past the deadline (the caller should raise `error`).
+        """
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        retry_after = getattr(error, "retry_after", None)
+        wait = max(backoff, retry_after) if retry_after is not None else backoff
+        if elapsed + wait > self.deadline:
+            return None
+        return wait
+
+
+# --- Circuit breaker ------------------------------------------------------------
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive transient failures.
+    While open, calls fail immediately with CircuitOpenError. After
+    `reset_timeout` seconds one trial call is let through (half-open); its
+    success closes the breaker, its failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreaker":
+        return cls(
+            failure_threshold=int(os.getenv("OPENAI_BREAKER_THRESHOLD", 5)),
+            reset_timeout=_env_float("OPENAI_BREAKER_RESET", 30.0),
+        )
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._trial_in_flight:
+                raise CircuitOpenError(
+                    f"Provider circuit is open after {self._failures} consecutive failures; "
+                    f"retry in {max(remaining, 0):.0f}s.",
+                    retry_after=max(remaining, 0.0),
+                )
+            self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def release(self):
+        """End a half-open trial without judging provider health."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial_in_flight:
+                    logger.warning(f"Opening provider circuit after {self._failures} consecutive failures.")
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+_breaker = None
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """The process-wide breaker: provider health is shared by every agent."""
+    global _breaker
+    if _breaker is None:
+        with _clients_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker.from_env()
+    return _breaker
+
+
+# --- Transport ------------------------------------------------------------------
+
+class ResilientTransport:
+    """
+    Wraps a transport (see transport.py) with retries and the circuit breaker.
+    For streaming calls only opening the stream is retried; an error part-way
+    through a stream is raised as-is so no duplicate output is yielded.
+    """
+
+    def __init__(self, inner, policy: RetryPolicy | None = None, breaker: CircuitBreaker | None = None,
+                 sleep=time.sleep):
+        self.inner = inner
+        self.policy = policy or RetryPolicy.from_env()
+        self.breaker = breaker or get_circuit_breaker()
+        self._sleep = sleep
+
+    def create(self, **request):
+        attempt = 0
+        started = time.monotonic()
+        while True:
+            self.breaker.before_call()
+            try:
+                response = self.inner.create(**request)
+            except AgentError:
+                # Raised by an inner transport (e.g. a replay miss), not the provider.
+                self.breaker.release()
+                raise
+            except Exception as e:
+                error = self._failed(e)
+                if not _is_retryable(error) or attempt >= self.policy.max_retries:
+                    raise error from e
+                delay = self.policy.delay(attempt, error, time.monotonic() - started)
+                if delay is None:
+                    # The server asks for a longer wait than the deadline allows: fail fast.
+                    raise error from e
+                logger.info(f"Retrying provider call in {delay:.2f}s after: {error}")
+                self._sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return response
+
+    async def acreate(self, **request):
+        attempt = 0
+        started = time.monotonic()
+        while True:
+            self.breaker.before_call()
+            try:
+                response = await self.inner.acreate(**request)
+            except AgentError:
+                # Raised by an inner transport (e.g. a replay miss), not the provider.
+                self.breaker.release()
+                raise
+            except Exception as e:
+                error = self._failed(e)
+                if not _is_retryable(error) or attempt >= self.policy.max_retries:
+                    raise error from e
+                delay = self.policy.delay(attempt, error, time.monotonic() - started)
+                if delay is None:
+                    # The server asks for a longer wait than the deadline allows: fail fast.
+                    raise error from e
+                logger.info(f"Retrying provider call in {delay:.2f}s after: {error}")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return response
+
+    def _failed(self, e: Exception) -> ProviderError:
+        error = classify_error(e)
+        if _is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            # A rejected request (400/401/...) says nothing about provider health.
+            self.breaker.record_success()
+        return error
@@ -0,0 +1,92 @@
+"""
+Section-level report updates after the user corrects parsed figures.
+
+An analysis report is split on its "## " headings. Sections 1 and 2 hold
+only numbers derived from the confirmed data by tax_engine, so when a field
+is corrected we recompute the figures for the old and new data, and only the
+sections whose figures actually changed are re-rendered locally. Every other
+section (including the LLM's Section 3 narrative) is reused unchanged. A
+one-number correction therefore costs a few milliseconds and no LLM call.
+"""
+import re
+
+from tax_engine import compute_tax_figures, render_section
+
+_SECTION_RE = re.compile(r"^##\s+Section\s+(\d+)\b", re.I)
+
+# Sections whose content is fully determined by tax_engine figures.
+COMPUTED_SECTIONS = (1, 2)
+
+
+def diff_fields(old_data: dict, new_data: dict) -> dict:
+    """{field: (old, new)} for every field that was added, removed or changed."""
+    old_data, new_data = old_data or {}, new_data or {}
+    return {
+        field: (old_data.get(field), new_data.get(field))
+        for field in sorted(set(old_data) | set(new_data))
+        if old_data.get(field) != new_data.get(field)
+    }
+
+
+def split_report(report: str) -> list:
+    """
+    Split Markdown into blocks at each "## " heading. Returns a list of
+    (section_number or None, text); joining the texts gives back the report.
+    """
+    blocks, current, number = [], [], None
+    for line in (report or "").splitlines(keepends=True):
+        if line.startswith("## "):
+            if current:
+                blocks.append((number, "".join(current)))
+            match = _SECTION_RE.match(line)
+            number = int(match.group(1)) if match else None
+            current = [line]
+        else:
+            current.append(line)
+    if current:
+        blocks.append((number, "".join(current)))
+    return blocks
+
+
+def _section_figures(computation, section: int) -> list:
+    if not computation:
+        return []
+    return [fig for fig in computation["figures"] if fig["section"] == section]
+
+
+def affected_sections(old_data: dict, new_data: dict, country: str, tax_year: str,
+                      annualize_factor: int = 12) -> list:
+    """Computed sections whose figures differ between the old and new data."""
+    if not diff_fields(old_data, new_data):
+        return []
+    old = compute_tax_figures(old_data, country, tax_year, annualize_factor=annualize_factor)
+    new = compute_tax_figures(new_data, country, tax_year, annualize_factor=annualize_factor)
+    return [n for n in COMPUTED_SECTIONS if _section_figures(old, n) != _section_figures(new, n)]
+
+
+def update_report(report: str, old_data: dict, new_data: dict, country: str, tax_year: str,
+                  annualize_factor: int = 12):
+    """
+    Bring `report` (written for `old_data`) up to date with `new_data`.
+    Returns (new_report, [re-rendered section numbers]). Sections are
+    re-rendered from the engine figures in the numbers-only layout; a
+    computed section missing from the report is inserted before the first
+    later section.
+    """
+    changed = affected_sections(old_data, new_data, country, tax_year, annualize_factor)
+    if not changed:
+        return report, []
+
+    computation = compute_tax_figures(new_data, country, tax_year, annualize_factor=annualize_factor)
+    blocks = split_report(report)
+    for section in changed:
+        text = render_section(computation, section) + "\n\n"
+        index = next((i for i, (number, _) in enumerate(blocks) if number == section), None)
+        if index is not None:
+            blocks[index] = (section, text)
+            continue
+        later = next((i for i, (number, _) in enumerate(blocks) if number and number > section), len(blocks))
+        if later == len(blocks) and blocks and not blocks[-1][1].endswith("\n\n"):
+            blocks[-1] = (blocks[-1][0], blocks[-1][1].rstrip("\n") + "\n\n")
+        blocks.insert(later, (section, text))
+    return "".join(text for _, text in blocks).rstrip("\n") + "\n", changed
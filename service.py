@@ -0,0 +1,407 @@
+"""
+Async HTTP service exposing parse, analyze and render (FastAPI / ASGI).
+
+The Streamlit app re-runs app.py on every interaction and holds one user per
+session; this service wraps the same pieces (AsyncSalaryAgent, the tax rules
+and generate_pdf_report) behind stateless JSON endpoints for other systems:
+
+    POST /parse      {"text"}                                   -> {"confirmed_data"}
+    POST /analyze    {"confirmed_data", "country", "tax_year",
+                      "annualize_factor"?, "numbers_only"?}      -> {"report", "rules_version"}
+    POST /render     {"confirmed_data", "report", "country",
+                      "tax_year", "payslip_text"?, "scenarios"?} -> application/pdf
+    POST /pipeline   parse + analyze (+ render with "pdf": true, base64 in the response)
+    GET  /health     load, circuit breaker state and artifact store stats
+
+LLM calls are awaited on the event loop (the pooled async client bounds
+connections to the provider, see resilience.py). Blocking local work stays
+off the loop: the agent runs its cache (SQLite) and parsing steps in worker
+threads, artifact store lookups (which may read spilled files) run in
+threads, and PDF rendering is CPU-bound and runs in a process pool; rendered
+PDFs are memoized in the artifact store.
+
+Admission control runs before any work is done:
+- at most SERVICE_MAX_IN_FLIGHT requests in flight; more get 503 with
+  Retry-After (backpressure, so latency stays bounded instead of queueing);
+- at most SERVICE_PER_CLIENT_LIMIT concurrent requests per client, keyed
+  by the peer address; more get 429. The X-Client-ID header is used instead
+  only when the peer is a trusted proxy (SERVICE_TRUSTED_PROXIES), since any
+  other caller could pick a fresh ID per request.
+Limits are per process: run one worker per node (uvicorn --workers 1), or
+divide the limits by the number of workers.
+
+Agent errors map onto HTTP statuses: a parse failure is 422, provider rate
+limits, outages and an open circuit are 503 (504 on timeout) with
+Retry-After when known, and an exhausted token budget is 429. A report that
+cannot be laid out as a PDF is 422.
+
+Environment variables (all optional):
+    SERVICE_MAX_IN_FLIGHT       default 256
+    SERVICE_PER_CLIENT_LIMIT    default 8
+    SERVICE_PDF_WORKERS         PDF processes, default: all cores
+    SERVICE_RETRY_AFTER         seconds suggested on 503/429, default 1
+    SERVICE_MAX_TEXT_CHARS      largest accepted payslip text, default 100000
+    SERVICE_TRUSTED_PROXIES     comma-separated proxy addresses or networks
+                                (e.g. 10.0.0.0/8) allowed to set X-Client-ID
+
+Usage:
+    python service.py --host 0.0.0.0 --port 8000
+    uvicorn service:app --host 0.0.0.0 --port 8000
+"""
+import argparse
+import asyncio
+import base64
+import ipaddress
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field, field_validator
+
+from agent import AsyncSalaryAgent
+from artifacts import artifact_key, get_artifact_store
+from errors import (
+    AgentError,
+    CircuitOpenError,
+    ParseError,
+    ProviderError,
+    ProviderTimeoutError,
+    RateLimitedError,
+    TokenBudgetExceededError,
+)
+from resilience import get_circuit_breaker
+from startup import start_warmup
+from tax_rules import get_rules_version, get_tax_rules, get_tax_rules_as_string
+from tools import PayslipComponents
+from tracing import span
+
+REPORT_TITLE = "Salary Analyzer & Tax Opportunity Report"
+MAX_TEXT_CHARS = int(os.getenv("SERVICE_MAX_TEXT_CHARS", 100_000))
+MAX_SCENARIO_ROWS = 100
+
+
+# --- Admission control ----------------------------------------------------------
+
+class ServiceError(Exception):
+    """A request turned away with an HTTP status (admission limits, unknown tax rules)."""
+
+    def __init__(self, status_code: int, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionControl:
+    """
+    Global in-flight limit plus a per-client concurrency limit. Admission is
+    decided immediately (no waiting), so an overloaded node answers 503/429
+    in microseconds instead of building a queue. All calls happen on the
+    event loop thread, so plain counters are enough.
+    """
+
+    def __init__(self, max_in_flight: int, per_client: int, retry_after: float = 1.0):
+        self.max_in_flight = max(1, max_in_flight)
+        self.per_client = max(1, per_client)
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.rejected = {"busy": 0, "client_limit": 0}
+        self._clients = {}
+
+    @classmethod
+    def from_env(cls) -> "AdmissionControl":
+        return cls(int(os.getenv("SERVICE_MAX_IN_FLIGHT", 256)), int(os.getenv("SERVICE_PER_CLIENT_LIMIT", 8)),
+                   float(os.getenv("SERVICE_RETRY_AFTER", 1.0)))
+
+    def acquire(self, client: str):
+        """Admit one request for `client` or raise ServiceError."""
+        if self.in_flight >= self.max_in_flight:
+            self.rejected["busy"] += 1
+            raise ServiceError(503, "Server is at capacity, retry shortly.", self.retry_after)
+        if self._clients.get(client, 0) >= self.per_client:
+            self.rejected["client_limit"] += 1
+            raise ServiceError(429, f"Too many concurrent requests for this client (limit {self.per_client}).",
+                               self.retry_after)
+        self.in_flight += 1
+        self._clients[client] = self._clients.get(client, 0) + 1
+
+    def release(self, client: str):
+        self.in_flight -= 1
+        remaining = self._clients.get(client, 1) - 1
+        if remaining:
+            self._clients[client] = remaining
+        else:
+            self._clients.pop(client, None)  # idle clients cost no memory
+
+    def stats(self) -> dict:
+        return {"in_flight": self.in_flight, "max_in_flight": self.max_in_flight,
+                "active_clients": len(self._clients), "per_client_limit": self.per_client,
+                "rejected": dict(self.rejected)}
+
+
+def _trusted_proxies() -> list:
+    networks = []
+    for item in os.getenv("SERVICE_TRUSTED_PROXIES", "").split(","):
+        if item.strip():
+            networks.append(ipaddress.ip_network(item.strip(), strict=False))
+    return networks
+
+
+TRUSTED_PROXIES = _trusted_proxies()
+
+
+def _is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+
+def client_id(request: Request) -> str:
+    """The peer address, or X-Client-ID when the peer is a trusted proxy."""
+    peer = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get("x-client-id")
+    if forwarded and _is_trusted_proxy(peer):
+        return forwarded
+    return peer
+
+
+async def admitted(request: Request):
+    """Dependency holding an admission slot for the duration of the request."""
+    admission = request.app.state.admission
+    client = client_id(request)
+    admission.acquire(client)
+    try:
+        yield client
+    finally:
+        admission.release(client)
+
+
+# --- PDF rendering (runs in worker processes) -------------------------------------
+
+def render_pdf(job: dict) -> bytes:
+    """Build one PDF. Module-level so it can be pickled to workers."""
+    from pdf_report import generate_pdf_report
+
+    scenarios = job.get("scenarios")
+    if scenarios is None:
+        from optimizer import optimize
+
+        result = optimize(job["confirmed_data"], job["country"], job["tax_year"], job["annualize_factor"])
+        scenarios = result.table(limit=12) if result and len(result.front) > 1 else None
+    return generate_pdf_report(
+        confirmed_data=job["confirmed_data"],
+        final_report=job["final_report"],
+        payslip_text=job.get("payslip_text"),
+        country=job["country"],
+        tax_year=job["tax_year"],
+        title=REPORT_TITLE,
+        scenarios=scenarios or None,
+    )
+
+
+async def _render(app: FastAPI, job: dict) -> bytes:
+    """Render through the process pool, reusing an identical earlier PDF."""
+    key = artifact_key(job["confirmed_data"], job["final_report"], job.get("payslip_text"),
+                       job["country"], job["tax_year"], annualize_factor=job["annualize_factor"],
+                       scenarios=job.get("scenarios"))
+    store = get_artifact_store()
+    cached = await asyncio.to_thread(store.get, key)
+    if cached is not None:
+        return cached
+    try:
+        pdf_bytes = await asyncio.get_running_loop().run_in_executor(app.state.pdf_pool, render_pdf, job)
+    except ValueError:
+        # ReportLab rejects content it cannot lay out (e.g. malformed scenario rows).
+        raise ServiceError(422, "The report could not be rendered as a PDF.")
+    await asyncio.to_thread(store.put, key, pdf_bytes, filename="salary_report.pdf",
+                            label=f"{job['country']} {job['tax_year']}")
+    return pdf_bytes
+
+
+# --- Request models -----------------------------------------------------------
+
+class ParseRequest(BaseModel):
+    text: str = Field(..., min_length=1, max_length=MAX_TEXT_CHARS, description="Payslip text.")
+
+
+class AnalyzeRequest(BaseModel):
+    confirmed_data: PayslipComponents
+    country: str = "India"
+    tax_year: str = "2024-25"
+    annualize_factor: int = Field(12, ge=1, le=12, description="12 for monthly figures, 1 for annual.")
+    numbers_only: bool = Field(False, description="Skip the LLM; return the locally computed Sections 1-2.")
+
+
+class RenderRequest(BaseModel):
+    confirmed_data: PayslipComponents
+    report: str = Field(..., min_length=1)
+    country: str = "India"
+    tax_year: str = "2024-25"
+    annualize_factor: int = Field(12, ge=1, le=12)
+    payslip_text: Optional[str] = Field(None, max_length=MAX_TEXT_CHARS)
+    scenarios: Optional[list[dict[str, str | float]]] = Field(
+        None, max_length=MAX_SCENARIO_ROWS,
+        description="What-if rows for the PDF, all with the same columns; computed with optimizer.py when "
+                    "omitted. [] leaves them out."
+    )
+
+    @field_validator("scenarios")
+    @classmethod
+    def _same_columns(cls, rows):
+        """The rows form one table: every row has the first row's columns, in order."""
+        if rows:
+            columns = list(rows[0])
+            if not columns:
+                raise ValueError("scenario rows must have at least one column")
+            for i, row in enumerate(rows[1:], start=2):
+                if list(row) != columns:
+                    raise ValueError(f"scenario row {i} does not have the same columns as row 1")
+        return rows
+
+
+class PipelineRequest(BaseModel):
+    text: str = Field(..., min_length=1, max_length=MAX_TEXT_CHARS)
+    country: str = "India"
+    tax_year: str = "2024-25"
+    numbers_only: bool = False
+    pdf: bool = Field(False, description="Also render the PDF (base64 in the response).")
+    include_payslip_text: bool = Field(False, description="Include the payslip text in the PDF.")
+
+
+# --- Application --------------------------------------------------------------------
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.agent = AsyncSalaryAgent()
+    app.state.admission = AdmissionControl.from_env()
+    workers = int(os.getenv("SERVICE_PDF_WORKERS", 0)) or os.cpu_count() or 1
+    # Spawned, not forked: workers start on first use, when the loop's worker
+    # threads (agent steps, artifact I/O) already exist.
+    app.state.pdf_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    app.state.pdf_workers = workers
+    start_warmup()
+    try:
+        yield
+    finally:
+        app.state.pdf_pool.shutdown(cancel_futures=True)
+
+
+app = FastAPI(title="Salary Analyzer & Tax Opportunity Service", lifespan=lifespan)
+
+
+def _error(status_code: int, message: str, retry_after: float | None = None) -> JSONResponse:
+    headers = {"Retry-After": str(max(1, round(retry_after)))} if retry_after is not None else None
+    return JSONResponse({"error": message}, status_code=status_code, headers=headers)
+
+
+@app.exception_handler(ServiceError)
+async def _service_error(request: Request, e: ServiceError):
+    return _error(e.status_code, str(e), e.retry_after)
+
+
+@app.exception_handler(AgentError)
+async def _agent_error(request: Request, e: AgentError):
+    if isinstance(e, ParseError):
+        return _error(422, str(e))
+    if isinstance(e, TokenBudgetExceededError):
+        return _error(429, str(e))
+    if isinstance(e, ProviderTimeoutError):
+        return _error(504, str(e))
+    if isinstance(e, (RateLimitedError, CircuitOpenError)) or (isinstance(e, ProviderError) and e.status_code
+                                                               and e.status_code >= 500):
+        return _error(503, str(e), e.retry_after or request.app.state.admission.retry_after)
+    if isinstance(e, ProviderError):
+        return _error(502, str(e))
+    return _error(500, str(e))
+
+
+def _require_rules(country: str, tax_year: str):
+    if not get_tax_rules(country, tax_year):
+        raise ServiceError(404, f"No tax rules found for {country} {tax_year}.")
+
+
+async def _analyze(agent: AsyncSalaryAgent, data: dict, country: str, tax_year: str, annualize_factor: int,
+                   numbers_only: bool) -> str:
+    if numbers_only:
+        return agent.generate_numbers_only_report(data, country, tax_year, annualize_factor=annualize_factor)
+    return await agent.generate_analysis_report(data, country, tax_year, get_tax_rules_as_string(country, tax_year),
+                                                annualize_factor=annualize_factor)
+
+
+@app.get("/health")
+async def health(request: Request):
+    state = request.app.state
+    return {"status": "ok", "circuit": get_circuit_breaker().state, "pdf_workers": state.pdf_workers,
+            **state.admission.stats(), "artifacts": get_artifact_store().stats()}
+
+
+@app.post("/parse")
+async def parse(body: ParseRequest, request: Request, client: str = Depends(admitted)):
+    with span("service.parse", client=client, chars=len(body.text)):
+        return {"confirmed_data": await request.app.state.agent.parse_payslip_text(body.text)}
+
+
+@app.post("/analyze")
+async def analyze(body: AnalyzeRequest, request: Request, client: str = Depends(admitted)):
+    _require_rules(body.country, body.tax_year)
+    with span("service.analyze", client=client, numbers_only=body.numbers_only):
+        report = await _analyze(request.app.state.agent, body.confirmed_data.to_dict(), body.country,
+                                body.tax_year, body.annualize_factor, body.numbers_only)
+    return {"report": report, "rules_version": get_rules_version(body.country, body.tax_year)}
+
+
+@app.post("/render")
+async def render(body: RenderRequest, request: Request, client: str = Depends(admitted)):
+    _require_rules(body.country, body.tax_year)
+    with span("service.render", client=client) as s:
+        pdf_bytes = await _render(request.app, {
+            "confirmed_data": body.confirmed_data.to_dict(), "final_report": body.report,
+            "payslip_text": body.payslip_text, "country": body.country, "tax_year": body.tax_year,
+            "annualize_factor": body.annualize_factor, "scenarios": body.scenarios,
+        })
+        s.set(pdf_bytes=len(pdf_bytes))
+    return Response(pdf_bytes, media_type="application/pdf",
+                    headers={"Content-Disposition": 'attachment; filename="salary_report.pdf"'})
+
+
+@app.post("/pipeline")
+async def pipeline(body: PipelineRequest, request: Request, client: str = Depends(admitted)):
+    _require_rules(body.country, body.tax_year)
+    agent = request.app.state.agent
+    with span("service.pipeline", client=client, pdf=body.pdf) as s:
+        data = await agent.parse_payslip_text(body.text)
+        report = await _analyze(agent, data, body.country, body.tax_year, 12, body.numbers_only)
+        result = {"confirmed_data": data, "report": report,
+                  "rules_version": get_rules_version(body.country, body.tax_year)}
+        if body.pdf:
+            pdf_bytes = await _render(request.app, {
+                "confirmed_data": data, "final_report": report,
+                "payslip_text": body.text if body.include_payslip_text else None,
+                "country": body.country, "tax_year": body.tax_year, "annualize_factor": 12,
+            })
+            s.set(pdf_bytes=len(pdf_bytes))
+            result["pdf_base64"] = base64.b64encode(pdf_bytes).decode("ascii")
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the salary analyzer HTTP service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    # One process per node: the admission limits and the PDF pool are per process.
+    uvicorn.run(app, host=args.host, port=args.port, workers=1, log_level="info")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Cold-start helpers: a background warm-up and an import-time/startup profile.
+
+The app's heavy dependencies are imported on first use: openai on the first
+LLM call (resilience.LazyOpenAIClient), reportlab and the PDF fonts on the
+first report (pdf_report), pypdf on the first PDF upload (ingest) and numpy
+on the first what-if or full-year table. That keeps them off the first
+page paint, and start_warmup() then loads them in a background thread once
+the page is up, so that later steps usually find them already loaded.
+
+Environment variables (optional):
+    STARTUP_WARMUP      1|0, default 1; 0 skips the background warm-up
+
+Usage:
+    python startup.py                  # import-time and startup breakdown
+    python startup.py --top 25 --module agent --module pdf_report
+"""
+import argparse
+import ast
+import importlib.util
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+
+def _import(*names):
+    def step():
+        for name in names:
+            __import__(name)
+    return step
+
+
+def _render_context():
+    from pdf_report import get_render_context
+
+    get_render_context()
+
+
+# (label, callable) in the order the app needs them; later steps reuse earlier imports.
+WARMUP_STEPS = [
+    ("openai", _import("openai")),
+    ("pdf_report + fonts", _render_context),
+    ("numpy (optimizer, ytd)", _import("optimizer", "ytd")),
+    ("pypdf", _import("pypdf")),
+]
+
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+warmup_timings = {}
+
+
+def warmup_enabled() -> bool:
+    return os.getenv("STARTUP_WARMUP", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def _run_warmup(steps):
+    for label, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:  # a missing optional dependency only costs the warm-up
+            logger.warning(f"Warm-up step {label!r} failed: {e}")
+            continue
+        warmup_timings[label] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(f"Warm-up finished: {warmup_timings}")
+
+
+def start_warmup(steps=None) -> threading.Thread | None:
+    """
+    Run the warm-up steps in a daemon thread, once per process. Returns the
+    thread (or None when disabled with STARTUP_WARMUP=0).
+    """
+    global _warmup_thread
+    if not warmup_enabled():
+        return None
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=_run_warmup, args=(steps or WARMUP_STEPS,),
+                                              name="startup-warmup", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+
+# --- Import-time profile --------------------------------------------------------
+
+def app_imports(path: str = APP_PATH) -> list:
+    """Top-level modules imported by app.py at module level, in order."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.append(node.module)
+    return list(dict.fromkeys(names))
+
+
+def profile_imports(modules) -> list:
+    """
+    Import `modules` in a fresh interpreter with -X importtime. Returns
+    (module, self_us, cumulative_us, depth) for every module loaded, in
+    load order.
+    """
+    code = "; ".join(f"import {name}" for name in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, cwd=os.path.dirname(APP_PATH))
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            depth = (len(name) - len(name.lstrip())) // 2
+            rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+        except ValueError:
+            continue
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+    return rows
+
+
+def by_package(rows) -> list:
+    """(top-level package, self ms) sorted heaviest first."""
+    totals = {}
+    for name, self_us, _, _ in rows:
+        root = name.split(".")[0]
+        totals[root] = totals.get(root, 0) + self_us
+    return sorted(((root, us / 1000) for root, us in totals.items()), key=lambda r: -r[1])
+
+
+def startup_steps() -> list:
+    """(label, ms) for the in-process start-up work done after imports."""
+    timings = []
+
+    def timed(label, fn):
+        started = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            timings.append((f"{label} (failed: {e})", (time.perf_counter() - started) * 1000))
+            return
+        timings.append((label, (time.perf_counter() - started) * 1000))
+
+    def build_agent():
+        from agent import SalaryAgent
+
+        # The client is lazy, so a placeholder key never reaches the network.
+        os.environ.setdefault("OPENAI_API_KEY", "sk-profile-placeholder")
+        SalaryAgent()
+
+    timed("import agent", _import("agent"))
+    timed("SalaryAgent()", build_agent)
+    timed("tax rules load", lambda: __import__("tax_rules").get_tax_rules("India", "2024-25"))
+    for label, step in WARMUP_STEPS:
+        timed(f"warm-up: {label}", step)
+    return timings
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import-time and start-up breakdown of the app.")
+    parser.add_argument("--module", action="append",
+                        help="Profile these modules instead of app.py's top-level imports (repeatable).")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list (default 15).")
+    args = parser.parse_args(argv)
+
+    modules = args.module or app_imports()
+    missing = [name for name in modules if importlib.util.find_spec(name.split(".")[0]) is None]
+    modules = [name for name in modules if name not in missing]
+    rows = profile_imports(modules)
+    total_ms = sum(r[1] for r in rows) / 1000
+    cumulative = {name: us for name, _, us, depth in rows if depth == 0}
+
+    print(f"Import time for: {', '.join(modules)}")
+    print(f"  {len(rows)} modules, {total_ms:.0f} ms total")
+    if missing:
+        print(f"  not installed, skipped: {', '.join(missing)}")
+    print()
+    print("Per app import (cumulative, first import pays for shared dependencies):")
+    for name in modules:
+        root = name.split(".")[0]
+        ms = cumulative.get(name, cumulative.get(root, 0)) / 1000
+        print(f"  {name:<24} {ms:8.1f} ms")
+    print(f"\nHeaviest packages (self time, top {args.top}):")
+    for root, ms in by_package(rows)[:args.top]:
+        print(f"  {root:<24} {ms:8.1f} ms")
+    print("\nStart-up steps (this process):")
+    for label, ms in startup_steps():
+        print(f"  {label:<40} {ms:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
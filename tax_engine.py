@@ -0,0 +1,372 @@
+"""
+Deterministic tax computation engine.
+
+Each tax rules entry (see tax_rules.py) is compiled once into a
+CompiledRuleSet: an ordered list of small rule steps, one per rule key that
+is present (80C_Limit, Standard_Deduction, Professional_Tax_Deductible, ...). Running the rule set
+over confirmed PayslipComponents produces every number used in Sections 1-2
+of the analysis report. Those figures are injected into the analysis call so
+the model only writes the narrative, and can also be rendered on their own
+(numbers-only mode, no LLM call at all). compute_columns() evaluates the
+same rules over whole arrays of employees for bulk payroll runs (bulk.py);
+numpy is only imported there and in income_tax(), so the per-slip path
+does not pay for it at start-up.
+"""
+import json
+
+from tax_rules import get_rules_version, get_tax_rules
+
+SECTION_1_HEADING = "## Section 1: Your Existing Tax Savings (Already Active)"
+SECTION_2_HEADING = "## Section 2: Potential Optimization Areas (To Explore)"
+REPORT_HEADING = "### Analysis complete. Here is your Personalized Tax Opportunity Report:"
+
+_CURRENCY = {"india": "₹", "usa": "$"}
+
+
+def format_amount(value: float, country: str) -> str:
+    """Format a rupee/dollar amount; India uses lakh grouping (1,50,000)."""
+    symbol = _CURRENCY.get(str(country).lower(), "")
+    negative = value < 0
+    value = abs(round(value, 2))
+    whole = int(value)
+    fraction = f"{value - whole:.2f}"[1:] if value != whole else ""
+    digits = str(whole)
+    if str(country).lower() == "india" and len(digits) > 3:
+        head, tail = digits[:-3], digits[-3:]
+        groups = []
+        while len(head) > 2:
+            groups.insert(0, head[-2:])
+            head = head[:-2]
+        if head:
+            groups.insert(0, head)
+        digits = ",".join(groups + [tail])
+    else:
+        digits = f"{whole:,}"
+    return f"{'-' if negative else ''}{symbol}{digits}{fraction}"
+
+
+class Figure(dict):
+    """
+    One computed number: {"key", "label", "value", "formula", "section", "note"}.
+    A dict subclass so computations serialize straight to JSON.
+    """
+
+    def __init__(self, key, label, value, formula="", section=1, note=""):
+        super().__init__(key=key, label=label, value=value, formula=formula, section=section, note=note)
+
+
+# --- Rule steps ---------------------------------------------------------------
+# Each compiler takes the rules dict and returns a step function, or None if
+# the rule does not apply. A step receives (monthly components, annualize
+# factor, figures-so-far) and returns a list of Figures.
+
+_RULE_COMPILERS = []
+
+
+def _compiler(func):
+    _RULE_COMPILERS.append(func)
+    return func
+
+
+def _monthly(data: dict, field: str) -> float:
+    return float(data.get(field) or 0)
+
+
+@_compiler
+def _standard_deduction(rules):
+    if "Standard_Deduction" not in rules:
+        return None
+    limit = rules["Standard_Deduction"]
+
+    def step(data, factor, figures):
+        return [Figure("standard_deduction", "Standard Deduction", limit,
+                       "Flat deduction from TAX_RULES (Standard_Deduction)")]
+    return step
+
+
+@_compiler
+def _us_standard_deduction(rules):
+    keys = [k for k in ("Standard_Deduction_Single", "Standard_Deduction_Married") if k in rules]
+    if not keys:
+        return None
+
+    def step(data, factor, figures):
+        return [Figure(key.lower(), key.replace("_", " "), rules[key], f"Flat deduction from TAX_RULES ({key})")
+                for key in keys]
+    return step
+
+
+@_compiler
+def _professional_tax(rules):
+    if "Professional_Tax_Deductible" not in rules:
+        return None
+    deductible = bool(rules["Professional_Tax_Deductible"])
+
+    def step(data, factor, figures):
+        if "professional_tax" not in data:
+            return []
+        annual = _monthly(data, "professional_tax") * factor
+        return [
+            Figure("annual_professional_tax", "Professional Tax (annualized)", annual,
+                   f"{_monthly(data, 'professional_tax'):g} x {factor}" if factor != 1 else "As provided"),
+            Figure("professional_tax_deduction", "Professional Tax deductible amount",
+                   annual if deductible else 0.0,
+                   "Deductible per TAX_RULES" if deductible else "Not deductible per TAX_RULES"),
+        ]
+    return step
+
+
+@_compiler
+def _section_80c(rules):
+    if "80C_Limit" not in rules:
+        return None
+    limit = rules["80C_Limit"]
+
+    def step(data, factor, figures):
+        monthly_pf = _monthly(data, "employee_pf_contribution")
+        annual_pf = monthly_pf * factor
+        used = annual_pf
+        gap = limit - used
+        result = []
+        if "employee_pf_contribution" in data:
+            result.append(Figure("annual_pf", "Employee's PF Contribution (annualized)", annual_pf,
+                                 f"{monthly_pf:g} x {factor}" if factor != 1 else "As provided"))
+        result += [
+            Figure("total_80c_used", "Total 80C used", used, "Annualized PF contribution", section=2),
+            Figure("80c_limit", "80C Limit", limit, "From TAX_RULES (80C_Limit)", section=2),
+            Figure("80c_gap", "80C gap", max(gap, 0.0), f"{limit:g} - {used:g}", section=2,
+                   note="" if gap > 0 else "80C limit already fully utilized"),
+        ]
+        return result
+    return step
+
+
+@_compiler
+def _section_80d(rules):
+    keys = [k for k in ("80D_Self_Limit", "80D_Parents_Limit", "80D_Senior_Citizen_Limit") if k in rules]
+    if not keys:
+        return None
+
+    def step(data, factor, figures):
+        premium = _monthly(data, "health_insurance_premium") * factor
+        result = [Figure("80d_detected", "Health insurance premium detected (80D)", premium,
+                         "No 80D deduction detected" if not premium else "Annualized premium", section=2)]
+        result += [Figure(key.lower(), key.replace("_", " "), rules[key], f"From TAX_RULES ({key})", section=2)
+                   for key in keys]
+        return result
+    return step
+
+
+@_compiler
+def _hra(rules):
+    def step(data, factor, figures):
+        if "house_rent_allowance" not in data:
+            return []
+        monthly_hra = _monthly(data, "house_rent_allowance")
+        return [Figure("annual_hra", "HRA component (annualized)", monthly_hra * factor,
+                       f"{monthly_hra:g} x {factor}" if factor != 1 else "As provided", section=2,
+                       note="Exemption depends on actual rent paid, basic salary and city")]
+    return step
+
+
+@_compiler
+def _us_401k(rules):
+    if "401k_Limit" not in rules:
+        return None
+    limit = rules["401k_Limit"]
+
+    def step(data, factor, figures):
+        return [Figure("401k_limit", "401k Limit", limit, "From TAX_RULES (401k_Limit)", section=2,
+                       note="No 401k contribution detected in the confirmed data")]
+    return step
+
+
+class CompiledRuleSet:
+    """Executable form of one (country, tax_year) tax rules entry."""
+
+    def __init__(self, country: str, tax_year: str, rules: dict):
+        self.country = country
+        self.tax_year = tax_year
+        self.rules = dict(rules)
+        self.steps = [step for step in (compiler(self.rules) for compiler in _RULE_COMPILERS) if step]
+
+    def compute(self, confirmed_data: dict, annualize_factor: int = 12) -> dict:
+        """
+        Run every rule step over the confirmed components. Monthly values are
+        multiplied by `annualize_factor` (pass 1 if the data is already annual).
+        Returns {"country", "tax_year", "figures": [Figure, ...]}.
+        """
+        data = {k: v for k, v in (confirmed_data or {}).items() if v is not None}
+        figures = []
+        for step in self.steps:
+            figures.extend(step(data, annualize_factor, figures))
+        return {"country": self.country, "tax_year": self.tax_year, "figures": figures}
+
+    def compute_columns(self, columns: dict, annualize_factor: int = 12) -> dict:
+        """
+        Vectorized form of compute() for many employees at once (see bulk.py).
+        `columns` maps PayslipComponents fields to equal-length arrays (NaN =
+        missing). Returns {figure key: array}, using the same keys and values
+        as compute() for the per-employee figures, plus annual gross, total
+        deductions claimed and the taxable amount before exemptions.
+        """
+        import numpy as np
+
+        rows = len(next(iter(columns.values()))) if columns else 0
+        zeros = np.zeros(rows)
+
+        def annual(field):
+            values = columns.get(field)
+            return zeros if values is None else np.nan_to_num(np.asarray(values, dtype=np.float64)) * annualize_factor
+
+        rules = self.rules
+        out = {_ANNUAL_KEYS.get(field, f"annual_{field}"): annual(field) for field in columns}
+        deductions = zeros.copy()
+        # USA rules give one amount per filing status; the slabs are a single
+        # filer's, and a payslip does not say, so single is assumed.
+        standard = rules.get("Standard_Deduction", rules.get("Standard_Deduction_Single"))
+        if standard is not None:
+            deductions += standard
+        if "Professional_Tax_Deductible" in rules:
+            pt = annual("professional_tax") if rules["Professional_Tax_Deductible"] else zeros
+            out["professional_tax_deduction"] = pt
+            deductions += pt
+        if "80C_Limit" in rules:
+            used = annual("employee_pf_contribution")
+            out["total_80c_used"] = used
+            out["80c_gap"] = np.maximum(rules["80C_Limit"] - used, 0.0)
+            deductions += np.minimum(used, rules["80C_Limit"])
+        if "80D_Self_Limit" in rules:
+            premium = annual("health_insurance_premium")
+            out["80d_detected"] = premium
+            deductions += np.minimum(premium, rules["80D_Self_Limit"])
+        if "401k_Limit" in rules:
+            out["401k_gap"] = np.full(rows, float(rules["401k_Limit"]))
+
+        gross = sum((annual(field) for field in _EARNING_FIELDS), zeros)
+        out["annual_gross"] = gross
+        out["deductions_claimed"] = deductions
+        out["taxable_before_exemptions"] = np.maximum(gross - deductions, 0.0)
+        if "Tax_Slabs" in rules:
+            out["tax_before_exemptions"] = income_tax(out["taxable_before_exemptions"], rules)
+        return out
+
+
+def income_tax(taxable, rules):
+    """
+    Tax on an array of taxable incomes from the rules' Tax_Slabs ([lower bound,
+    rate] pairs), less the Rebate_87A_* rebate, plus Cess_Rate. Zeros if the
+    rules have no slabs.
+    """
+    import numpy as np
+
+    taxable = np.maximum(np.asarray(taxable, dtype=np.float64), 0.0)
+    slabs = rules.get("Tax_Slabs")
+    if not slabs:
+        return np.zeros_like(taxable)
+    lower = np.array([s[0] for s in slabs], dtype=np.float64)
+    rates = np.array([s[1] for s in slabs], dtype=np.float64)
+    width = np.append(np.diff(lower), np.inf)
+    # Income falling in each slab, shape (..., slabs).
+    in_slab = np.clip(taxable[..., None] - lower, 0.0, width)
+    tax = in_slab @ rates
+    if "Rebate_87A_Income_Limit" in rules:
+        rebate = np.minimum(tax, rules.get("Rebate_87A_Max", 0.0))
+        tax = np.where(taxable <= rules["Rebate_87A_Income_Limit"], tax - rebate, tax)
+    return tax * (1.0 + rules.get("Cess_Rate", 0.0))
+
+
+# Figure keys compute() uses for annualized components; others are "annual_<field>".
+_ANNUAL_KEYS = {
+    "professional_tax": "annual_professional_tax",
+    "employee_pf_contribution": "annual_pf",
+    "house_rent_allowance": "annual_hra",
+}
+_EARNING_FIELDS = ("basic_salary", "house_rent_allowance", "leave_travel_allowance", "special_allowance")
+
+
+_compiled = {}
+
+
+def compile_rules(country: str, tax_year: str) -> CompiledRuleSet | None:
+    """Compile (and memoize) the rule set for a country/year; None if unknown."""
+    key = (str(country).lower(), str(tax_year), get_rules_version(country, tax_year))
+    if key not in _compiled:
+        rules = get_tax_rules(country, tax_year)
+        if not rules:
+            return None
+        _compiled[key] = CompiledRuleSet(country, tax_year, rules)
+    return _compiled[key]
+
+
+def compute_tax_figures(confirmed_data: dict, country: str, tax_year: str, annualize_factor: int = 12):
+    """Convenience wrapper: compile + compute. Returns None for unknown rules."""
+    rule_set = compile_rules(country, tax_year)
+    if rule_set is None:
+        return None
+    return rule_set.compute(confirmed_data, annualize_factor=annualize_factor)
+
+
+def compute_tax_columns(columns: dict, country: str, tax_year: str, annualize_factor: int = 12):
+    """Vectorized compute_tax_figures over arrays of components; None for unknown rules."""
+    rule_set = compile_rules(country, tax_year)
+    if rule_set is None:
+        return None
+    return rule_set.compute_columns(columns, annualize_factor=annualize_factor)
+
+
+# --- Rendering ------------------------------------------------------------------
+
+def figures_for_prompt(computation: dict) -> str:
+    """Compact one-line-per-figure block injected into the analysis call."""
+    lines = []
+    for fig in computation["figures"]:
+        line = f"- [S{fig['section']}] {fig['label']}: {fig['value']:g}"
+        if fig["formula"]:
+            line += f" ({fig['formula']})"
+        if fig["note"]:
+            line += f" — {fig['note']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def render_section(computation: dict, section: int) -> str:
+    """Markdown for one report section (1 or 2) built only from the figures."""
+    country = computation["country"]
+    heading = SECTION_1_HEADING if section == 1 else SECTION_2_HEADING
+    lines = [heading]
+    for fig in computation["figures"]:
+        if fig["section"] != section:
+            continue
+        line = f"- **{fig['label']}:** {format_amount(fig['value'], country)}"
+        if fig["formula"]:
+            line += f" ({fig['formula']})"
+        if fig["note"]:
+            line += f". {fig['note']}."
+        lines.append(line)
+    if len(lines) == 1:
+        lines.append("- No applicable items were found in the confirmed data.")
+    return "\n".join(lines)
+
+
+def render_numbers_report(computation: dict) -> str:
+    """Numbers-only report (Sections 1-2) in the same Markdown layout as the LLM report."""
+    return "\n\n".join([
+        REPORT_HEADING,
+        render_section(computation, 1),
+        render_section(computation, 2),
+    ])
+
+
+if __name__ == "__main__":
+    # Numbers-only mode from the command line:
+    #   python tax_engine.py '{"basic_salary": 50000, "employee_pf_contribution": 6000}' India 2024-25
+    import sys
+
+    data = json.loads(sys.argv[1])
+    country = sys.argv[2] if len(sys.argv) > 2 else "India"
+    year = sys.argv[3] if len(sys.argv) > 3 else "2024-25"
+    result = compute_tax_figures(data, country, year)
+    if result is None:
+        sys.exit(f"No tax rules found for {country} {year}.")
+    print(render_numbers_report(result))
@@ -1,53 +1,176 @@
+import hashlib
 import json
+import logging
+import os
+import threading
+import time
+import tomllib
+from types import MappingProxyType
+from typing import NamedTuple
+
+# Tax rules live in versioned files under rules/ (one file per country), e.g.
+#
+#   rules/india.json   {"country": "india", "version": "2024.1", "years": {"2024-25": {...}}}
+#   rules/usa.toml     country = "usa" / version = "2024.1" / [years."2024"] ...
+#
+# Files are loaded into an immutable index keyed by (country, year) with the
+# prompt string precomputed. Edited files are picked up automatically when
+# their mtime changes; no restart is needed. Bump "version" when limits change.
+
+logger = logging.getLogger(__name__)
+
+RULES_DIR = os.getenv("TAX_RULES_DIR", os.path.join(os.path.dirname(__file__), "rules"))
+RELOAD_CHECK_INTERVAL = float(os.getenv("TAX_RULES_RELOAD_INTERVAL", "2.0"))
+
+
+class RuleEntry(NamedTuple):
+    """One (country, year) rule set plus everything derived from it."""
+    country: str
+    year: str
+    rules: MappingProxyType
+    prompt_string: str
+    version: str
+    source: str
+
+
+def _load_file(path: str) -> dict:
+    with open(path, "rb") as f:
+        if path.endswith(".toml"):
+            return tomllib.load(f)
+        return json.load(f)
+
+
+class TaxRulesStore:
+    """
+    Indexed, immutable view of a rules directory with cheap mtime-based reload.
+
+    Lookups are a single dict access on the current index. Reloads build a new
+    index off to the side and swap it in atomically; a thread that finds a
+    reload already in progress keeps serving the previous index instead of
+    waiting, so requests never stall on a reload.
+    """
+
+    def __init__(self, directory: str = RULES_DIR, check_interval: float = RELOAD_CHECK_INTERVAL):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._index = MappingProxyType({})
+        self._signature = None
+        self._last_check = 0.0
+        self._reload_lock = threading.Lock()
+        self.reload()
+
+    def _scan(self) -> tuple:
+        try:
+            names = sorted(n for n in os.listdir(self.directory) if n.endswith((".json", ".toml")))
+        except FileNotFoundError:
+            return ()
+        return tuple((name, os.stat(os.path.join(self.directory, name)).st_mtime_ns) for name in names)
+
+    def _build_index(self, signature: tuple) -> dict:
+        index = {}
+        for name, _ in signature:
+            path = os.path.join(self.directory, name)
+            data = _load_file(path)
+            country = str(data.get("country") or os.path.splitext(name)[0]).lower()
+            file_version = str(data.get("version", "0"))
+            for year, rules in data.get("years", {}).items():
+                prompt_string = json.dumps(rules, indent=2)
+                # The content hash makes caches notice edits even if "version" was not bumped.
+                digest = hashlib.sha256(prompt_string.encode("utf-8")).hexdigest()[:10]
+                index[(country, str(year))] = RuleEntry(
+                    country=country,
+                    year=str(year),
+                    rules=MappingProxyType(dict(rules)),
+                    prompt_string=prompt_string,
+                    version=f"{file_version}+{digest}",
+                    source=path,
+                )
+        return index
+
+    def reload(self, force: bool = True) -> bool:
+        """Rebuild the index if any file changed (or always, if force). Returns True if swapped."""
+        if not self._reload_lock.acquire(blocking=force):
+            return False
+        try:
+            signature = self._scan()
+            if not force and signature == self._signature:
+                return False
+            try:
+                index = self._build_index(signature)
+            except (OSError, ValueError, tomllib.TOMLDecodeError) as e:
+                # Keep serving the last good rules if an edit left a file broken.
+                logger.warning(f"Could not reload tax rules from {self.directory}: {e}")
+                self._signature = signature
+                return False
+            self._index = MappingProxyType(index)
+            self._signature = signature
+            logger.info(f"Loaded {len(index)} tax rule sets from {self.directory}.")
+            return True
+        finally:
+            self._last_check = time.monotonic()
+            self._reload_lock.release()
+
+    def maybe_reload(self):
+        """Check file mtimes at most once per check_interval."""
+        if time.monotonic() - self._last_check >= self.check_interval:
+            self.reload(force=False)
+
+    def get(self, country: str, year: str) -> RuleEntry | None:
+        self.maybe_reload()
+        return self._index.get((str(country).lower(), str(year).strip()))
+
+    def entries(self) -> list:
+        self.maybe_reload()
+        return list(self._index.values())
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> TaxRulesStore:
+    """Process-wide rules store, created on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TaxRulesStore()
+    return _store
+
+
+def all_tax_rules() -> dict:
+    """Snapshot of every loaded rule set as {country: {year: rules}}."""
+    db = {}
+    for entry in get_store().entries():
+        db.setdefault(entry.country, {})[entry.year] = dict(entry.rules)
+    return db
 
-# This database can be expanded with more countries or updated yearly.
-TAX_RULES_DB = {
-    "india": {
-        "2024-25": {
-            "80C_Limit": 150000,
-            "80D_Self_Limit": 25000,
-            "80D_Parents_Limit": 25000,
-            "80D_Senior_Citizen_Limit": 50000,
-            "Standard_Deduction": 50000,
-            "Professional_Tax_Deductible": True
-        },
-        "2023-24": {
-            "80C_Limit": 150000,
-            "80D_Self_Limit": 25000,
-            "80D_Parents_Limit": 25000,
-            "80D_Senior_Citizen_Limit": 50000,
-            "Standard_Deduction": 50000,
-            "Professional_Tax_Deductible": True
-        }
-    },
-    "usa": {
-        "2024": {
-            # Example data for a different country
-            "401k_Limit": 23000,
-            "Standard_Deduction_Single": 14600,
-            "Standard_Deduction_Married": 29200
-        }
-    }
-}
 
 def get_tax_rules(country: str, year: str) -> dict:
     """
     Fetches the tax rules for a given country and year.
-    Returns a dictionary of rules or None if not found.
+    Returns a read-only mapping of rules or None if not found.
     """
-    country_rules = TAX_RULES_DB.get(country.lower())
-    if not country_rules:
-        return None
-    
-    year_rules = country_rules.get(year)
-    return year_rules
+    entry = get_store().get(country, year)
+    return entry.rules if entry else None
+
+
+def get_rules_version(country: str, year: str) -> str:
+    """
+    Version of the rules for a country/year, used in cache keys.
+    Returns an empty string if not found.
+    """
+    entry = get_store().get(country, year)
+    return entry.version if entry else ""
+
 
 def get_tax_rules_as_string(country: str, year: str) -> str:
     """
     Returns the tax rules as a formatted JSON string for the prompt.
+    The string is precomputed when the rules are loaded.
     """
-    rules = get_tax_rules(country, year)
-    if not rules:
+    entry = get_store().get(country, year)
+    if not entry:
         return "No rules found for the specified country and year."
-    
-    return json.dumps(rules, indent=2)
\ No newline at end of file
+
+    return entry.prompt_string
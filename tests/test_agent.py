@@ -0,0 +1,169 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from agent import AsyncSalaryAgent, SalaryAgent
+from benchmarks.fake_openai import FakeAsyncOpenAI, FakeOpenAI
+from cache import LLMCache
+from errors import ParseError
+from tax_rules import get_tax_rules_as_string
+from tools import PARSER_TOOL_NAME
+from tracing import Tracer, set_tracer
+
+SLIP = "Basic Salary: 50,000\nHouse Rent Allowance: 20,000\nProvident Fund: 6,000\nProfessional Tax: 200"
+RULES = get_tax_rules_as_string("India", "2024-25")
+
+
+@pytest.fixture
+def tracer():
+    tracer = Tracer()
+    set_tracer(tracer)
+    yield tracer
+    set_tracer(None)
+
+
+def spans(tracer, name):
+    return [r for r in tracer.recent if r["name"] == name]
+
+
+def tool_response(arguments: dict):
+    call = SimpleNamespace(id="call_1", type="function",
+                           function=SimpleNamespace(name=PARSER_TOOL_NAME, arguments=json.dumps(arguments)))
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=None, tool_calls=[call]))],
+                           usage=usage)
+
+
+class ScriptedTransport:
+    """Returns the given responses in order and keeps the requests it was sent."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def create(self, **request):
+        self.requests.append(request)
+        return self.responses.pop(0)
+
+
+class ClosableStream:
+    def __init__(self, texts):
+        self.texts = texts
+        self.closed = False
+
+    def __iter__(self):
+        for text in self.texts:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+
+    def close(self):
+        self.closed = True
+
+
+def sync_agent(**kwargs):
+    return SalaryAgent(cache=LLMCache(db_path=None), redact=False, **kwargs)
+
+
+def test_confident_local_parse_skips_the_llm(tracer):
+    client = FakeOpenAI()
+    parsed = sync_agent(client=client).parse_payslip_text(SLIP)
+    assert parsed["basic_salary"] == 50000 and parsed["house_rent_allowance"] == 20000
+    assert client.calls == 0
+    assert spans(tracer, "agent.parse")[-1]["source"] == "local"
+
+
+def test_llm_parse_is_cached(tracer):
+    client = FakeOpenAI()
+    agent = sync_agent(client=client, fast_path_threshold=2.0)
+    first = agent.parse_payslip_text(SLIP)
+    # Trivially different whitespace normalizes to the same cache entry.
+    second = agent.parse_payslip_text(SLIP.replace("\n", "\r\n") + "\n\n")
+    assert first == second and first["basic_salary"] == 50000
+    assert client.calls == 1
+    assert [r["source"] for r in spans(tracer, "agent.parse")] == ["llm", "cache"]
+
+
+def test_invalid_fields_are_reasked_and_merged(tracer, monkeypatch):
+    monkeypatch.setenv("PARSE_MAX_REASKS", "1")
+    transport = ScriptedTransport(tool_response({"basic_salary": -5, "house_rent_allowance": 20000}),
+                                  tool_response({"basic_salary": 50000}))
+    parsed = sync_agent(transport=transport, fast_path_threshold=2.0).parse_payslip_text(SLIP)
+    assert parsed == {"basic_salary": 50000, "house_rent_allowance": 20000}
+    reask = transport.requests[1]
+    assert list(reask["tools"][0]["function"]["parameters"]["properties"]) == ["basic_salary"]
+    assert reask["messages"][-1]["role"] == "tool"
+    record = spans(tracer, "agent.parse")[-1]
+    assert record["reasks"] == 1 and record["reask_fields"] == ["basic_salary"]
+
+
+def test_fields_still_invalid_after_reasking_are_dropped(monkeypatch):
+    monkeypatch.setenv("PARSE_MAX_REASKS", "1")
+    transport = ScriptedTransport(tool_response({"basic_salary": -5, "house_rent_allowance": 20000}),
+                                  tool_response({"basic_salary": -6}))
+    parsed = sync_agent(transport=transport, fast_path_threshold=2.0).parse_payslip_text(SLIP)
+    assert parsed == {"house_rent_allowance": 20000}
+
+
+def test_a_parse_with_no_valid_amount_raises(monkeypatch):
+    monkeypatch.setenv("PARSE_MAX_REASKS", "0")
+    transport = ScriptedTransport(tool_response({"basic_salary": -5}))
+    with pytest.raises(ParseError, match="basic_salary") as info:
+        sync_agent(transport=transport, fast_path_threshold=2.0).parse_payslip_text(SLIP)
+    assert "-5" not in str(info.value)
+
+
+def test_analysis_is_cached(tracer):
+    client = FakeOpenAI()
+    agent = sync_agent(client=client)
+    data = agent.parse_payslip_text(SLIP)
+    first = agent.generate_analysis_report(data, "India", "2024-25", RULES)
+    assert first == agent.generate_analysis_report(data, "India", "2024-25", RULES)
+    assert client.calls == 1
+    assert [r["cache"] for r in spans(tracer, "agent.analysis")] == ["miss", "hit"]
+    # A streamed report is served from the same entry.
+    assert "".join(agent.stream_analysis_report(data, "India", "2024-25", RULES)) == first
+    assert client.calls == 1
+
+
+def test_sync_and_async_agents_give_the_same_results():
+    sync = sync_agent(client=FakeOpenAI(), fast_path_threshold=2.0)
+    parsed = sync.parse_payslip_text(SLIP)
+    report = sync.generate_analysis_report(parsed, "India", "2024-25", RULES)
+
+    async def run():
+        agent = AsyncSalaryAgent(client=FakeAsyncOpenAI(), cache=LLMCache(db_path=None), redact=False,
+                                 fast_path_threshold=2.0)
+        async_parsed = await agent.parse_payslip_text(SLIP)
+        async_report = await agent.generate_analysis_report(async_parsed, "India", "2024-25", RULES)
+        streamed = [chunk async for chunk in AsyncSalaryAgent(
+            client=FakeAsyncOpenAI(), cache=LLMCache(db_path=None), redact=False,
+        ).stream_analysis_report(async_parsed, "India", "2024-25", RULES)]
+        return async_parsed, async_report, "".join(streamed)
+
+    assert asyncio.run(run()) == (parsed, report, report)
+
+
+def test_a_stream_stopped_early_is_closed_and_not_cached():
+    stream = ClosableStream(["## Section 1", "\n- item"])
+    cache = LLMCache(db_path=None)
+    agent = SalaryAgent(cache=cache, transport=ScriptedTransport(stream), redact=False)
+    chunks = agent.stream_analysis_report({"basic_salary": 50000}, "India", "2024-25", RULES)
+    assert next(chunks) == "## Section 1"
+    chunks.close()
+    assert stream.closed
+    assert cache.stats()["sets"] == 0
+
+
+def test_parse_many_keeps_input_order():
+    texts = [f"Basic Salary: {50000 + i * 1000}\nHouse Rent Allowance: 20,000" for i in range(6)]
+
+    async def run():
+        agent = AsyncSalaryAgent(client=FakeAsyncOpenAI(latency_s=0.01), cache=LLMCache(db_path=None),
+                                 redact=False, max_concurrency=3, fast_path_threshold=2.0)
+        return await agent.parse_many(texts)
+
+    results = asyncio.run(run())
+    assert [r.index for r in results] == list(range(6))
+    assert all(r.ok for r in results)
+    assert [r.value["basic_salary"] for r in results] == [50000 + i * 1000 for i in range(6)]
@@ -0,0 +1,111 @@
+import os
+import threading
+
+import pytest
+
+from artifacts import ArtifactStore, artifact_key
+
+KEY_ARGS = dict(confirmed_data={"basic_salary": 50000}, final_report="## Section 1", payslip_text="Basic: 50,000",
+                country="India", tax_year="2024-25")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ArtifactStore(max_bytes=25, spill_dir=str(tmp_path), max_disk_bytes=25)
+    yield store
+    store.close()
+
+
+@pytest.mark.parametrize("change", [
+    {"confirmed_data": {"basic_salary": 50001}},
+    {"final_report": "## Section 2"},
+    {"payslip_text": "Basic: 50,001"},
+    {"country": "USA"},
+    {"tax_year": "2025-26"},
+    {"kind": "csv"},
+    {"annualize_factor": 1},
+    {"scenarios": [{"name": "Max 80C", "employee_pf_contribution": 12500}]},
+])
+def test_every_input_changes_the_key(change):
+    assert artifact_key(**dict(KEY_ARGS, **change)) != artifact_key(**KEY_ARGS)
+
+
+def test_key_ignores_dict_order_and_empty_optionals():
+    reordered = dict(KEY_ARGS, confirmed_data={"hra": 1, "basic_salary": 50000})
+    assert artifact_key(**reordered) == artifact_key(**dict(KEY_ARGS, confirmed_data={"basic_salary": 50000, "hra": 1}))
+    assert artifact_key(**dict(KEY_ARGS, payslip_text=None, scenarios=None)) == \
+        artifact_key(**dict(KEY_ARGS, payslip_text="", scenarios=[]))
+
+
+def test_memory_is_bounded_and_evicted_artifacts_spill_to_disk(store):
+    store.put("a", b"a" * 10)
+    store.put("b", b"b" * 10)
+    store.put("c", b"c" * 10)
+    stats = store.stats()
+    assert stats["memory_bytes"] <= 25 and stats["disk_bytes"] == 10
+    assert store.describe("a")["in_memory"] is False
+    assert os.listdir(store.spill_dir) == ["a.bin"]
+    # Loaded back on access; the least recently used artifact spills in its place.
+    assert store.get("a") == b"a" * 10
+    assert store.describe("a")["in_memory"] and not store.describe("b")["in_memory"]
+
+
+def test_the_disk_tier_is_bounded_too(store):
+    for name in "abcde":
+        store.put(name, name.encode() * 10)
+    assert store.stats()["disk_bytes"] <= 25
+    assert store.get("a") is None
+    assert store.get("e") == b"e" * 10
+
+
+def test_an_artifact_larger_than_the_budgets_is_kept_only_while_in_use(store):
+    store.put("big", b"x" * 40)
+    assert store.get("big") == b"x" * 40
+    # Too large to spill as well, so it is dropped once something else is used.
+    store.put("small", b"s")
+    assert store.get("big") is None
+    assert store.stats()["memory_bytes"] == 1 and store.stats()["disk_bytes"] == 0
+
+
+def test_without_a_spill_dir_evicted_artifacts_are_dropped():
+    store = ArtifactStore(max_bytes=15, spill_dir=None)
+    store.put("a", b"a" * 10)
+    store.put("b", b"b" * 10)
+    assert store.get("a") is None and store.get("b") == b"b" * 10
+
+
+def test_each_store_spills_into_its_own_directory_and_removes_only_that(tmp_path):
+    first = ArtifactStore(max_bytes=15, spill_dir=str(tmp_path))
+    second = ArtifactStore(max_bytes=15, spill_dir=str(tmp_path))
+    for store in (first, second):
+        store.put("a", b"a" * 10)
+        store.put("b", b"b" * 10)
+    assert first.spill_dir != second.spill_dir
+    assert os.path.basename(first.spill_dir).startswith(f"{os.getpid()}-")
+    first.close()
+    assert not os.path.exists(first.spill_dir)
+    assert second.get("a") == b"a" * 10
+    second.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_concurrent_requests_build_once(store):
+    calls = []
+    started = threading.Barrier(4)
+
+    def build():
+        calls.append(1)
+        return b"pdf"
+
+    def request():
+        started.wait()
+        results.append(store.get_or_create("k", build, title="Report"))
+
+    results = []
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [b"pdf"] * 4 and len(calls) == 1
+    assert store.describe("k")["title"] == "Report"
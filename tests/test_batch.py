@@ -0,0 +1,58 @@
+import asyncio
+import json
+from argparse import Namespace
+
+import pytest
+
+from batch import MANIFEST_NAME, iter_payslips, load_completed, run_batch
+
+SLIP = "Basic Salary: {basic}\nHouse Rent Allowance: 20,000\nProvident Fund: 6,000"
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+
+
+def test_colliding_file_names_get_distinct_ids(tmp_path):
+    for name in ("a b.txt", "a_b.txt", "a.txt"):
+        (tmp_path / name).write_text(name, encoding="utf-8")
+    # Listed in sorted order: "a b.txt", "a.txt", "a_b.txt".
+    assert list(iter_payslips(str(tmp_path))) == [("a_b", "a b.txt"), ("a", "a.txt"), ("a_b-2", "a_b.txt")]
+
+
+def test_repeated_jsonl_ids_get_distinct_ids(tmp_path):
+    source = tmp_path / "slips.jsonl"
+    write_jsonl(source, [{"id": "E1", "text": "one"}, {"id": "E1", "text": "two"}, {"text": "three"}])
+    assert list(iter_payslips(str(source))) == [("E1", "one"), ("E1-2", "two"), ("3", "three")]
+
+
+def test_manifest_keeps_the_latest_status_and_skips_torn_lines(tmp_path):
+    manifest = tmp_path / MANIFEST_NAME
+    manifest.write_text('{"id": "a", "status": "ok"}\n{"id": "b", "status": "ok"}\n'
+                        '{"id": "b", "status": "error"}\n{"id": "c", "sta', encoding="utf-8")
+    assert load_completed(str(manifest)) == {"a"}
+
+
+@pytest.fixture
+def batch_args(tmp_path, monkeypatch):
+    # Strict replay of an empty cassette: no network. Every slip takes the local fast path.
+    monkeypatch.setenv("SALARY_AGENT_TRANSPORT", "replay")
+    monkeypatch.setenv("SALARY_AGENT_CASSETTE", str(tmp_path / "empty.jsonl.gz"))
+    source = tmp_path / "slips.jsonl"
+    out = tmp_path / "out"
+    return source, Namespace(input=str(source), output_dir=str(out), country="India", tax_year="2024-25",
+                             concurrency=2, workers=1, no_pdf=True, numbers_only=True)
+
+
+def test_run_resumes_and_keeps_duplicate_ids_apart(batch_args):
+    source, args = batch_args
+    records = [{"id": "E1", "text": SLIP.format(basic="50,000")}, {"id": "E1", "text": SLIP.format(basic="60,000")}]
+    write_jsonl(source, records)
+    assert asyncio.run(run_batch(args)) == {"ok": 2, "error": 0, "skipped": 0}
+    first = json.loads(open(f"{args.output_dir}/E1.json").read())
+    second = json.loads(open(f"{args.output_dir}/E1-2.json").read())
+    assert (first["confirmed_data"]["basic_salary"], second["confirmed_data"]["basic_salary"]) == (50000, 60000)
+
+    write_jsonl(source, records + [{"id": "E2", "text": SLIP.format(basic="70,000")}])
+    assert asyncio.run(run_batch(args)) == {"ok": 1, "error": 0, "skipped": 2}
+    assert load_completed(f"{args.output_dir}/{MANIFEST_NAME}") == {"E1", "E1-2", "E2"}
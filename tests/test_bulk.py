@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from bulk import map_columns, run_bulk
+
+
+def test_columns_map_by_field_name_or_exact_synonym():
+    mapping = map_columns(["Emp ID", "Basic Pay", "HRA", "professional_tax", "Employer PF", "Notes"])
+    assert mapping == {"basic_salary": "Basic Pay", "house_rent_allowance": "HRA",
+                       "professional_tax": "professional_tax"}
+
+
+def test_mapping_overrides_are_checked():
+    assert map_columns(["Wage"], {"basic_salary": "Wage"}) == {"basic_salary": "Wage"}
+    with pytest.raises(ValueError):
+        map_columns(["Wage"], {"salary": "Wage"})
+    with pytest.raises(ValueError):
+        map_columns(["Wage"], {"basic_salary": "Pay"})
+
+
+@pytest.mark.parametrize("suffix", ["csv", "parquet"])
+def test_run_bulk_writes_one_row_per_employee_in_order(tmp_path, suffix):
+    source = tmp_path / "payroll.csv"
+    pd.DataFrame({
+        "Employee ID": ["E1", "E2", "E3"],
+        "Basic Pay": [50000, 80000, 30000],
+        "PF": [6000, None, 15000],
+    }).to_csv(source, index=False)
+    output = tmp_path / f"results.{suffix}"
+
+    summary = run_bulk(str(source), str(output), "India", "2024-25", chunk_rows=2, workers=1)
+
+    assert summary["rows"] == 3 and summary["chunks"] == 2
+    result = pd.read_csv(output) if suffix == "csv" else pd.read_parquet(output)
+    assert list(result["employee_id"]) == ["E1", "E2", "E3"]
+    assert list(result["total_80c_used"]) == [72000, 0, 180000]
+    assert list(result["80c_gap"]) == [78000, 150000, 0]
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from cache import LLMCache, make_cache_key, normalize_text
+
+
+def test_keys_ignore_whitespace_and_dict_order_but_not_versions():
+    assert normalize_text("Basic:\t50,000  \r\n\r\nHRA: 1") == "Basic: 50,000\nHRA: 1"
+    key = make_cache_key("analysis", {"a": 1, "b": 2}, "gpt-4o", "5", "r1")
+    assert key == make_cache_key("analysis", {"b": 2, "a": 1}, "gpt-4o", "5", "r1")
+    assert key != make_cache_key("analysis", {"a": 1, "b": 2}, "gpt-4o", "6", "r1")
+    assert key != make_cache_key("analysis", {"a": 1, "b": 2}, "gpt-4o", "5", "r2")
+
+
+def test_memory_tier_is_an_lru_and_returns_copies():
+    cache = LLMCache(max_entries=2, db_path=None)
+    cache.set("a", {"x": 1})
+    cache.set("b", 2)
+    cache.get("a")["x"] = 99
+    cache.set("c", 3)
+    assert cache.get("a") == {"x": 1}
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_the_ttl(tmp_path):
+    cache = LLMCache(ttl_seconds=0.05, db_path=str(tmp_path / "cache.sqlite3"))
+    cache.set("a", 1)
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+
+def test_disk_tier_is_shared_with_a_new_instance(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    LLMCache(db_path=path).set("a", "report")
+    other = LLMCache(db_path=path)
+    assert other.get("a") == "report"
+    assert other.stats()["disk_hits"] == 1
+
+
+def test_purge_removes_expired_rows_and_caps_the_row_count(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    LLMCache(db_path=path, ttl_seconds=0.05).set("stale", 1)
+    time.sleep(0.1)
+    cache = LLMCache(db_path=path, ttl_seconds=0.05, max_disk_entries=20, purge_interval=3600)
+    for i in range(100):
+        cache.set(f"k{i}", i)
+    stats = cache.stats()
+    # Purged on the first write and after every max_disk_entries / 10 writes after that.
+    assert stats["disk_entries"] <= 22
+    assert stats["disk_evictions"] >= 79
+    assert LLMCache(db_path=path).get("k99") == 99
+    assert LLMCache(db_path=path).get("k0") is None
+
+
+def test_concurrent_use_from_threads(tmp_path):
+    cache = LLMCache(max_entries=8, db_path=str(tmp_path / "cache.sqlite3"))
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(50):
+                cache.set(f"{n}-{i}", i)
+                assert cache.get(f"{n}-{i}") == i
+        except Exception as e:  # noqa: BLE001 - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert cache.stats()["disk_entries"] == 400
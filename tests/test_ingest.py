@@ -0,0 +1,115 @@
+import io
+
+import pytest
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+import ingest
+from ingest import extract_upload, iter_payslips_from_pdf, normalize_layout, register_ocr_hook
+
+
+def write_pdf(path, pages):
+    """One page per entry: a list of text lines, or None for a page holding only an image."""
+    from PIL import Image
+    from reportlab.lib.utils import ImageReader
+
+    pdf = canvas.Canvas(str(path), pagesize=A4)
+    for lines in pages:
+        if lines is None:
+            buffer = io.BytesIO()
+            Image.new("RGB", (40, 20), "white").save(buffer, format="PNG")
+            pdf.drawImage(ImageReader(io.BytesIO(buffer.getvalue())), 72, 600, 200, 100)
+        else:
+            y = 780
+            for line in lines:
+                pdf.drawString(72, y, line)
+                y -= 16
+        pdf.showPage()
+    pdf.save()
+
+
+@pytest.fixture(autouse=True)
+def no_ocr_hook():
+    register_ocr_hook(None)
+    yield
+    register_ocr_hook(None)
+
+
+def test_aligned_columns_become_label_value_lines():
+    text = ("Earnings          Amount      Deductions        Amount\n"
+            "Basic Salary      50,000      Provident Fund    6,000\n"
+            "HRA               20,000      Professional Tax   200\n"
+            "                  70,000\n")
+    assert normalize_layout(text).splitlines() == [
+        "Earnings Amount Deductions Amount",
+        "Basic Salary: 50,000", "Provident Fund: 6,000",
+        "HRA: 20,000", "Professional Tax: 200",
+        "70,000",
+    ]
+
+
+def test_pipe_tables_and_currency_cells():
+    assert normalize_layout("Basic | Rs. 50,000 | Net Pay | ₹ 45,000/-") == "Basic: Rs. 50,000\nNet Pay: ₹ 45,000/-"
+
+
+def test_scanned_page_goes_to_the_ocr_hook(tmp_path):
+    path = tmp_path / "scan.pdf"
+    write_pdf(path, [["Payslip for March 2025", "Basic Salary      50,000"], None])
+    calls = []
+
+    def hook(image_bytes, page_index):
+        calls.append(page_index)
+        return "HRA      20,000"
+
+    register_ocr_hook(hook)
+    pages = list(ingest.iter_pdf_pages(str(path), workers=1))
+    assert [p.method for p in pages] == ["text", "ocr"]
+    assert pages[1].text == "HRA: 20,000" and calls == [1]
+
+
+def test_scanned_page_without_a_hook_is_empty(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "get_ocr_hook", lambda: None)
+    path = tmp_path / "scan.pdf"
+    write_pdf(path, [None])
+    assert [p.method for p in ingest.iter_pdf_pages(str(path), workers=1)] == ["empty"]
+
+
+def test_image_upload_uses_the_hook_or_explains_what_is_missing(monkeypatch):
+    register_ocr_hook(lambda image_bytes, page_index: "Basic Salary     50,000\n")
+    assert extract_upload(b"image", "slip.png") == ["Basic Salary: 50,000"]
+    register_ocr_hook(None)
+    monkeypatch.setattr(ingest, "get_ocr_hook", lambda: None)
+    with pytest.raises(RuntimeError):
+        extract_upload(b"image", "slip.png")
+
+
+def test_multi_slip_export_is_split_on_headers_in_worker_threads(tmp_path):
+    pages = []
+    for n in range(ingest.PARALLEL_MIN_PAGES):
+        if n % 2 == 0:
+            pages.append([f"Payslip for employee E{n}", f"Basic Salary      {50000 + n}"])
+        else:
+            pages.append(["Continued from the previous page", "Special Allowance      1,000"])
+    path = tmp_path / "export.pdf"
+    write_pdf(path, pages)
+    slips = list(iter_payslips_from_pdf(str(path), workers=2))
+    assert [first for first, _ in slips] == list(range(0, ingest.PARALLEL_MIN_PAGES, 2))
+    assert all("Special Allowance: 1,000" in text for _, text in slips)
+    assert f"Basic Salary: {50000 + 2}" in slips[1][1]
+
+
+def test_scanned_pages_are_recognized_in_parallel(tmp_path):
+    import time
+
+    path = tmp_path / "scans.pdf"
+    write_pdf(path, [None] * ingest.PARALLEL_MIN_PAGES)
+
+    def slow_hook(image_bytes, page_index):
+        time.sleep(0.2)  # stands in for a tesseract process or remote OCR call
+        return f"Basic Salary      {page_index}00"
+
+    register_ocr_hook(slow_hook)
+    started = time.perf_counter()
+    pages = list(ingest.iter_pdf_pages(str(path), workers=ingest.PARALLEL_MIN_PAGES))
+    assert time.perf_counter() - started < 0.2 * ingest.PARALLEL_MIN_PAGES / 2
+    assert [p.text for p in pages] == [f"Basic Salary: {i}00" for i in range(ingest.PARALLEL_MIN_PAGES)]
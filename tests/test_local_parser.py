@@ -0,0 +1,71 @@
+import pytest
+
+from local_parser import DEFAULT_CONFIDENCE_THRESHOLD, parse_payslip_locally
+
+MONTHLY_SLIP = """ACME TECHNOLOGIES PVT LTD
+Payslip for the month of March 2025
+Employee Name: A. Kumar          Employee ID: E1042
+Basic Salary: 50,000             Provident Fund: 6,000
+House Rent Allowance: 20,000     Professional Tax: 200
+Special Allowance: 12,500        Income Tax (TDS): 8,000
+Gross Earnings: 82,500           Net Pay: 68,300
+"""
+
+
+def test_monthly_two_column_slip_takes_the_fast_path():
+    result = parse_payslip_locally(MONTHLY_SLIP)
+    assert result.to_dict() == {
+        "basic_salary": 50000.0, "house_rent_allowance": 20000.0, "employee_pf_contribution": 6000.0,
+        "professional_tax": 200.0, "special_allowance": 12500.0,
+    }
+    assert result.overall_confidence >= DEFAULT_CONFIDENCE_THRESHOLD
+
+
+@pytest.mark.parametrize("line", ["Annual CTC: 12,00,000", "Annual Leave: 12", "Annual Bonus: 1,00,000"])
+def test_annual_on_ctc_leave_or_bonus_does_not_make_the_slip_annual(line):
+    result = parse_payslip_locally(f"{line}\nBasic Salary: 50,000\nHRA: 20,000")
+    assert result.components["basic_salary"] == 50000.0
+    assert result.components["house_rent_allowance"] == 20000.0
+
+
+def test_line_level_annual_hint_converts_to_monthly():
+    result = parse_payslip_locally("Basic Salary (per annum): 6,00,000\nHRA (per annum): 2,40,000")
+    assert result.components == {"basic_salary": 50000.0, "house_rent_allowance": 20000.0}
+    assert result.overall_confidence >= DEFAULT_CONFIDENCE_THRESHOLD
+
+
+def test_document_level_annual_hint_alone_falls_back_to_the_llm():
+    result = parse_payslip_locally("Annual Salary Statement (per annum)\nBasic Salary: 6,00,000\nHRA: 2,40,000")
+    assert result.overall_confidence < DEFAULT_CONFIDENCE_THRESHOLD
+
+
+def test_monthly_annual_table_is_read_as_monthly():
+    text = "Component        Monthly     Annual\nBasic Salary     50,000    6,00,000\nHRA              20,000    2,40,000"
+    result = parse_payslip_locally(text)
+    assert result.components == {"basic_salary": 50000.0, "house_rent_allowance": 20000.0}
+    assert result.overall_confidence >= DEFAULT_CONFIDENCE_THRESHOLD
+
+
+def test_year_next_to_label_is_not_the_amount():
+    result = parse_payslip_locally("Basic 2024: 50,000\nHRA: 20,000")
+    assert result.components["basic_salary"] == 50000.0
+
+
+def test_lone_year_like_amount_is_left_to_the_llm():
+    result = parse_payslip_locally("Basic 2024\nHRA: 20,000")
+    assert result.overall_confidence < DEFAULT_CONFIDENCE_THRESHOLD
+
+
+def test_conflicting_values_lower_confidence():
+    result = parse_payslip_locally("Basic Salary: 50,000\nBasic Pay: 55,000")
+    assert result.overall_confidence < DEFAULT_CONFIDENCE_THRESHOLD
+
+
+def test_employer_contribution_is_not_the_employee_pf():
+    result = parse_payslip_locally("Employee PF Contribution: 6,000\nEmployer PF Contribution: 6,000")
+    assert result.components == {"employee_pf_contribution": 6000.0}
+
+
+def test_health_insurance_premium_is_read():
+    result = parse_payslip_locally("Basic Salary: 50,000\nMediclaim Premium: 1,500")
+    assert result.components == {"basic_salary": 50000.0, "health_insurance_premium": 1500.0}
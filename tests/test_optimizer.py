@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from optimizer import Lever, deduction_points, optimize, pareto_front, split_deduction
+from tax_engine import compute_tax_columns, income_tax
+from tax_rules import get_tax_rules
+
+INDIA = get_tax_rules("India", "2024-25")
+
+
+def test_baseline_matches_the_engine():
+    data = {"basic_salary": 80000, "employee_pf_contribution": 9600, "professional_tax": 200}
+    result = optimize(data, "India", "2024-25")
+    columns = compute_tax_columns({f: np.array([float(v)]) for f, v in data.items()}, "India", "2024-25")
+    assert result.taxable_income == pytest.approx(columns["taxable_before_exemptions"][0])
+    assert result.baseline_tax == pytest.approx(columns["tax_before_exemptions"][0], abs=0.01)
+
+
+def test_usa_baseline_uses_the_single_filer_standard_deduction():
+    result = optimize({"basic_salary": 80000}, "USA", "2024")
+    assert result.taxable_income == pytest.approx(960000 - 14600)
+    assert [lever.key for lever in result.levers] == ["401k"]
+
+
+def test_lever_room_is_what_the_payslip_leaves():
+    result = optimize({"basic_salary": 80000, "employee_pf_contribution": 6000, "health_insurance_premium": 1000},
+                      "India", "2024-25")
+    room = {lever.key: lever.maximum for lever in result.levers}
+    assert room["80c_investment"] == 78000
+    assert room["80d_self"] == 13000
+    assert room["80d_parents"] == 25000
+
+
+def test_front_is_increasing_and_reaches_the_rebate_cliff():
+    # 7,50,000 gross - 50,000 standard = 7,00,000 taxable; 2,00,000 of deductions brings it to the 87A limit.
+    result = optimize({"basic_salary": 62500}, "India", "2024-25")
+    invested = [row["invested"] for row in result.front]
+    saved = [row["tax_saved"] for row in result.front]
+    assert invested == sorted(invested) and saved == sorted(saved)
+    assert 200000 in invested
+    best = result.best_within(200000)
+    assert best["tax"] == 0 and best["tax_saved"] == pytest.approx(result.baseline_tax)
+    assert best["80c_investment"] == 150000 and best["80d_self"] == 25000 and best["80d_parents"] == 25000
+
+
+def test_deduction_points_include_slab_and_rebate_kinks():
+    points = deduction_points(700000, 300000, INDIA, steps=3)
+    assert {0, 150000, 300000, 200000} <= set(points)
+
+
+def test_split_fills_levers_in_order():
+    levers = [Lever("a", "A", 100), Lever("b", "B", 50)]
+    assert split_deduction(120, levers) == {"a": 100, "b": 20}
+
+
+def test_pareto_front_drops_dominated_scenarios():
+    invested = np.array([0.0, 10.0, 20.0, 20.0, 30.0])
+    saved = np.array([0.0, 5.0, 4.0, 6.0, 6.0])
+    assert list(pareto_front(invested, saved)) == [0, 1, 3]
+
+
+def test_unknown_rules_return_none():
+    assert optimize({"basic_salary": 1}, "Mars", "2024") is None
+    assert income_tax(np.array([1.0]), {})[0] == 0
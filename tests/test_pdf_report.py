@@ -0,0 +1,72 @@
+import io
+import re
+
+import pytest
+from pypdf import PdfReader
+
+from pdf_report import generate_pdf_report, write_consolidated_report
+
+REPORT = "\n".join(["### Analysis complete.", "## Section 1: Existing Savings",
+                    "- **Standard Deduction:** 50,000"] + [f"- Point {i}: <b>unclosed & x" for i in range(12)])
+LONG_REPORT = REPORT + "\n" + "\n".join(f"- Extra line {i} " + "words " * 30 for i in range(80))
+
+
+def employees(n):
+    for i in range(1, n + 1):
+        # Every fifth employee runs over several pages, so sections do not start on a fixed stride.
+        yield {"basic_salary": 50000 + i}, LONG_REPORT if i % 5 == 0 else REPORT, f"Name <{i}> & Co"
+
+
+def page_texts(reader):
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+@pytest.fixture(scope="module")
+def consolidated(tmp_path_factory):
+    path = tmp_path_factory.mktemp("pdf") / "all.pdf"
+    count = write_consolidated_report(employees(23), str(path), "India", "2024-25", chunk_employees=7)
+    reader = PdfReader(str(path), strict=True)
+    return count, reader, page_texts(reader)
+
+
+def test_every_employee_is_written(consolidated):
+    count, reader, texts = consolidated
+    assert count == 23
+    assert len(reader.pages) > 23
+    assert "Name <23> & Co" in "".join(texts)
+
+
+def test_body_pages_number_continuously_across_chunks(consolidated):
+    _, reader, texts = consolidated
+    # The footer is drawn first, so it leads each page's extracted text.
+    numbers = [re.findall(r"^Page (\w+)", text.strip()) for text in texts]
+    front = [n[0] for n in numbers if n and not n[0].isdigit()]
+    body = [int(n[0]) for n in numbers if n and n[0].isdigit()]
+    assert front and front[0] == "i" and all(not n.isdigit() for n in front)
+    assert body == list(range(1, len(reader.pages) - len(front) + 1))
+
+
+def test_bookmarks_point_at_each_employee_heading(consolidated):
+    _, reader, texts = consolidated
+    outline = reader.outline
+    assert [item.title for item in outline] == [f"{i}. Name <{i}> & Co" for i in range(1, 24)]
+    for item in outline:
+        page = reader.get_destination_page_number(item)
+        assert item.title in texts[page].splitlines(), item.title
+
+
+def test_contents_list_the_page_each_section_starts_on(consolidated):
+    _, reader, texts = consolidated
+    contents = "\n".join(t for t in texts if "Contents" in t or ".........." in t)
+    for item in reader.outline:
+        page = reader.get_destination_page_number(item)
+        printed = re.search(re.escape(item.title) + r" \.+ page (\d+)", contents)
+        assert printed, item.title
+        assert texts[page].startswith(f"Page {printed.group(1)}\n")
+
+
+def test_single_report_escapes_markup():
+    pdf = generate_pdf_report({"basic_salary": 50000}, REPORT, "Basic <b>", "India", "2024-25",
+                              title="Report & <Title>")
+    text = "".join(page_texts(PdfReader(io.BytesIO(pdf))))
+    assert "<b>unclosed & x" in text
@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+from errors import AnalysisError
+from prefetch import AnalysisPrefetcher, prefetch_key
+
+RULES = "Standard_Deduction: 50000"
+
+
+class GatedAgent:
+    """Streams `chunks`, waiting for `gate` before each one after the first."""
+
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+        self.gate = threading.Event()
+        self.closed = threading.Event()
+        self.seen = []
+
+    def stream_analysis_report(self, confirmed_data, country, tax_year, tax_rules_string, annualize_factor=12):
+        self.seen.append(confirmed_data)
+        try:
+            for i, chunk in enumerate(self.chunks):
+                if i:
+                    self.gate.wait(5)
+                yield chunk
+            if self.error:
+                raise self.error
+        finally:
+            self.closed.set()
+
+
+@pytest.fixture
+def prefetcher():
+    prefetcher = AnalysisPrefetcher(max_workers=1)
+    yield prefetcher
+    prefetcher.shutdown()
+
+
+def test_key_changes_with_any_input():
+    base = prefetch_key({"basic_salary": 50000, "hra": 1}, "India", "2024-25", RULES)
+    assert base == prefetch_key({"hra": 1, "basic_salary": 50000}, "india", " 2024-25", RULES)
+    assert base != prefetch_key({"basic_salary": 50001, "hra": 1}, "India", "2024-25", RULES)
+    assert base != prefetch_key({"basic_salary": 50000, "hra": 1}, "India", "2025-26", RULES)
+    assert base != prefetch_key({"basic_salary": 50000, "hra": 1}, "India", "2024-25", RULES, annualize_factor=1)
+
+
+def test_a_reader_attaches_while_the_report_is_arriving(prefetcher):
+    agent = GatedAgent(["## Section 1", "\n- item"])
+    data = {"basic_salary": 50000}
+    handle = prefetcher.start(agent, data, "India", "2024-25", RULES)
+    data["basic_salary"] = 1  # later edits do not reach the request
+    assert handle.matches(prefetch_key({"basic_salary": 50000}, "India", "2024-25", RULES))
+
+    stream = handle.stream()
+    assert next(stream) == "## Section 1"
+    assert not handle.done
+    agent.gate.set()
+    assert list(stream) == ["\n- item"]
+    assert handle.result() == "## Section 1\n- item"
+    assert agent.seen == [{"basic_salary": 50000}]
+
+
+def test_cancel_closes_the_stream_and_discards_the_report(prefetcher):
+    agent = GatedAgent(["## Section 1", "\n- item"])
+    handle = prefetcher.start(agent, {"basic_salary": 50000}, "India", "2024-25", RULES)
+    assert next(handle.stream()) == "## Section 1"
+    handle.cancel()
+    agent.gate.set()
+    assert agent.closed.wait(5)
+    assert not handle.matches(handle.key)
+    with pytest.raises(AnalysisError, match="cancelled"):
+        handle.result()
+
+
+def test_a_prefetch_cancelled_before_it_starts_never_runs(prefetcher):
+    busy = GatedAgent(["a", "b"])
+    first = prefetcher.start(busy, {}, "India", "2024-25", RULES)
+    queued_agent = GatedAgent(["never"])
+    queued = prefetcher.start(queued_agent, {}, "India", "2024-25", RULES)
+    queued.cancel()
+    assert queued.done
+    with pytest.raises(AnalysisError):
+        queued.result()
+    busy.gate.set()
+    assert first.result() == "ab"
+    assert queued_agent.seen == []
+
+
+def test_errors_reach_the_reader(prefetcher):
+    agent = GatedAgent(["partial"], error=AnalysisError("The model returned an empty report."))
+    handle = prefetcher.start(agent, {}, "India", "2024-25", RULES)
+    stream = handle.stream()
+    assert next(stream) == "partial"
+    with pytest.raises(AnalysisError, match="empty report"):
+        next(stream)
+    assert not handle.matches(handle.key)
@@ -0,0 +1,56 @@
+import pytest
+
+from local_parser import parse_payslip_locally
+from redact import redact_payslip
+
+SLIP = """ACME TECHNOLOGIES PVT LTD
+Payslip for the month of March 2025
+Employee Name: A. Kumar                PAN: ABCDE1234F
+Bank A/c No: 123456789012              IFSC: HDFC0001234
+Mobile: +91 98765 43210                Aadhaar: 1234 5678 9012
+Leave Balance: 12                      Days Worked: 31
+Earnings              Current   Arrears       YTD
+Basic Salary           50,000         0    6,00,000
+House Rent Allowance   20,000         0    2,40,000
+Conveyance               1600      1600        1600
+Deductions
+Provident Fund          6,000         0      72,000
+Professional Tax          200      2400
+Net Pay                63,800
+"""
+
+
+@pytest.mark.parametrize("line", [
+    "Professional Tax 200 2400",
+    "HRA 2000 2000 2000",
+    "Conveyance 1600 1600 1600",
+    "Basic Salary 5000 5000 5000 60000",
+])
+def test_multi_column_amount_rows_are_kept_verbatim(line):
+    assert redact_payslip(line).text == line
+
+
+def test_identifiers_are_masked_and_identity_lines_dropped():
+    result = redact_payslip(SLIP)
+    for secret in ("A. Kumar", "ABCDE1234F", "123456789012", "HDFC0001234", "98765", "1234 5678 9012"):
+        assert secret not in result.text
+    assert "Leave Balance" not in result.text
+    assert {"NAME", "PAN", "IFSC"} <= set(result.masked)
+    assert result.tokens_removed > 0
+
+
+def test_figures_parse_the_same_after_redaction():
+    assert parse_payslip_locally(redact_payslip(SLIP).text).components == parse_payslip_locally(SLIP).components
+
+
+@pytest.mark.parametrize("line, kind", [
+    ("Contact +91 98765 43210 for salary queries", "PHONE"),
+    ("Aadhaar 1234 5678 9012", "AADHAAR"),
+    ("Phone no 9876543210", "PHONE"),
+])
+def test_digit_identifiers_need_a_label_or_country_code(line, kind):
+    assert kind in redact_payslip(line).masked
+
+
+def test_unlabelled_digit_groups_are_not_masked():
+    assert not redact_payslip("Reference 1234 5678 9012 salary").masked
@@ -0,0 +1,116 @@
+import time
+
+import httpx
+import openai
+import pytest
+
+from errors import CircuitOpenError, ProviderError, RateLimitedError
+from resilience import CircuitBreaker, ResilientTransport, RetryPolicy, classify_error
+
+URL = "https://api.openai.com/v1/chat/completions"
+
+
+def status_error(status: int, headers=None):
+    response = httpx.Response(status, headers=headers or {}, request=httpx.Request("POST", URL))
+    cls = openai.RateLimitError if status == 429 else openai.APIStatusError
+    return cls(f"HTTP {status}", response=response, body=None)
+
+
+class FailingTransport:
+    """Raises the given errors in order, then returns "ok"."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def create(self, **request):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def resilient(inner, policy=None, breaker=None):
+    sleeps = []
+    transport = ResilientTransport(inner, policy=policy or RetryPolicy(max_retries=3, base_delay=0.01),
+                                   breaker=breaker or CircuitBreaker(failure_threshold=10), sleep=sleeps.append)
+    return transport, sleeps
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"retry-after": "12"}, 12.0),
+    ({"retry-after-ms": "1500", "retry-after": "12"}, 1.5),
+    ({}, None),
+])
+def test_retry_after_headers_are_read(headers, expected):
+    error = classify_error(status_error(429, headers))
+    assert isinstance(error, RateLimitedError) and error.retry_after == expected
+
+
+def test_retry_after_wins_over_backoff_and_is_not_capped():
+    policy = RetryPolicy(base_delay=0.01, max_delay=1.0, deadline=60.0)
+    assert policy.delay(0, RateLimitedError("429", retry_after=12.0)) == 12.0
+    assert policy.delay(5, ProviderError("500")) <= 0.32
+
+
+def test_no_retry_is_scheduled_past_the_deadline():
+    policy = RetryPolicy(deadline=10.0)
+    assert policy.delay(0, RateLimitedError("429", retry_after=12.0)) is None
+    assert policy.delay(0, RateLimitedError("429", retry_after=4.0), elapsed=7.0) is None
+    assert policy.delay(0, RateLimitedError("429", retry_after=4.0), elapsed=5.0) == 4.0
+
+
+def test_transient_errors_are_retried():
+    inner = FailingTransport(status_error(503), status_error(429, {"retry-after": "2"}))
+    transport, sleeps = resilient(inner)
+    assert transport.create(model="gpt-4o") == "ok"
+    assert inner.calls == 3
+    assert sleeps[1] == 2.0
+
+
+def test_a_retry_after_past_the_deadline_raises_at_once():
+    inner = FailingTransport(status_error(429, {"retry-after": "120"}))
+    transport, sleeps = resilient(inner, policy=RetryPolicy(deadline=60.0))
+    with pytest.raises(RateLimitedError) as info:
+        transport.create(model="gpt-4o")
+    assert info.value.retry_after == 120.0
+    assert (inner.calls, sleeps) == (1, [])
+
+
+def test_rejected_requests_are_not_retried():
+    inner = FailingTransport(status_error(400))
+    transport, sleeps = resilient(inner)
+    with pytest.raises(ProviderError) as info:
+        transport.create(model="gpt-4o")
+    assert info.value.status_code == 400 and inner.calls == 1
+
+
+def test_breaker_opens_then_half_opens_then_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    transport, _ = resilient(FailingTransport(status_error(503), status_error(503)),
+                             policy=RetryPolicy(max_retries=0), breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(ProviderError):
+            transport.create(model="gpt-4o")
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        transport.create(model="gpt-4o")
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    # Only one trial call is let through while half-open.
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert transport.create(model="gpt-4o") == "ok"
+
+
+def test_a_failed_trial_reopens_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
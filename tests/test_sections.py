@@ -0,0 +1,54 @@
+from sections import affected_sections, diff_fields, split_report, update_report
+from tax_engine import compute_tax_figures, render_numbers_report
+
+DATA = {"basic_salary": 50000, "house_rent_allowance": 20000, "employee_pf_contribution": 6000,
+        "professional_tax": 200}
+NARRATIVE = "## Section 3: Recommended Next Steps\n- Written by the model; must survive untouched.\n"
+
+
+def report_for(data):
+    return render_numbers_report(compute_tax_figures(data, "India", "2024-25")).rstrip("\n") + "\n\n" + NARRATIVE
+
+
+def test_diff_fields_reports_added_removed_and_changed_fields():
+    assert diff_fields({"a": 1, "b": 2, "c": 3}, {"a": 1, "b": 5, "d": 4}) == {
+        "b": (2, 5), "c": (3, None), "d": (None, 4),
+    }
+    assert diff_fields(None, {}) == {}
+
+
+def test_split_report_round_trips_and_numbers_sections():
+    report = report_for(DATA)
+    blocks = split_report(report)
+    assert "".join(text for _, text in blocks) == report
+    assert [number for number, _ in blocks] == [None, 1, 2, 3]
+
+
+def test_only_sections_whose_figures_change_are_affected():
+    assert affected_sections(DATA, dict(DATA, professional_tax=250), "India", "2024-25") == [1]
+    assert affected_sections(DATA, dict(DATA, house_rent_allowance=25000), "India", "2024-25") == [2]
+    assert affected_sections(DATA, dict(DATA, employee_pf_contribution=7000), "India", "2024-25") == [1, 2]
+    # Basic salary feeds no Section 1/2 figure.
+    assert affected_sections(DATA, dict(DATA, basic_salary=60000), "India", "2024-25") == []
+
+
+def test_update_report_rerenders_only_the_changed_section():
+    new_data = dict(DATA, house_rent_allowance=25000)
+    updated, changed = update_report(report_for(DATA), DATA, new_data, "India", "2024-25")
+    assert changed == [2]
+    assert updated == report_for(new_data)
+    assert updated.endswith(NARRATIVE)
+
+
+def test_unchanged_figures_keep_the_report_as_is():
+    report = report_for(DATA)
+    assert update_report(report, DATA, dict(DATA, basic_salary=60000), "India", "2024-25") == (report, [])
+
+
+def test_a_missing_computed_section_is_inserted_in_order():
+    report = "### Intro\n\n## Section 1: Existing\n- stale\n\n" + NARRATIVE
+    new_data = dict(DATA, house_rent_allowance=25000)
+    updated, changed = update_report(report, DATA, new_data, "India", "2024-25")
+    assert changed == [2]
+    assert [number for number, _ in split_report(updated)] == [None, 1, 2, 3]
+    assert "- stale" in updated and updated.endswith(NARRATIVE)
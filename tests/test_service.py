@@ -0,0 +1,92 @@
+import base64
+import ipaddress
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+import service
+from agent import AsyncSalaryAgent
+from benchmarks.fake_openai import FakeAsyncOpenAI
+from cache import LLMCache
+
+SLIP = "Basic Salary: 50,000\nHouse Rent Allowance: 20,000\nProvident Fund: 6,000\nProfessional Tax: 200"
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("SERVICE_PDF_WORKERS", "1")
+    monkeypatch.setenv("ARTIFACT_SPILL_DIR", str(tmp_path))
+    monkeypatch.setattr("artifacts._default_store", None)
+    with TestClient(service.app) as client:
+        state = service.app.state
+        state.agent = AsyncSalaryAgent(client=FakeAsyncOpenAI(), cache=LLMCache(db_path=None),
+                                       fast_path_threshold=2.0)
+        state.pdf_pool.shutdown()
+        state.pdf_pool = ThreadPoolExecutor(max_workers=1)
+        yield client
+
+
+def test_parse_and_numbers_only_analysis(client):
+    data = client.post("/parse", json={"text": SLIP}).json()["confirmed_data"]
+    assert data["basic_salary"] == 50000
+    response = client.post("/analyze", json={"confirmed_data": data, "numbers_only": True})
+    assert response.status_code == 200
+    assert "₹78,000" in response.json()["report"]
+
+
+def test_pipeline_renders_a_pdf(client):
+    body = client.post("/pipeline", json={"text": SLIP, "pdf": True}).json()
+    assert body["report"].startswith("### Analysis complete")
+    assert base64.b64decode(body["pdf_base64"]).startswith(b"%PDF")
+
+
+def test_unknown_rules_are_404(client):
+    response = client.post("/render", json={"confirmed_data": {"basic_salary": 1}, "report": "x",
+                                            "country": "Mars", "tax_year": "2024"})
+    assert response.status_code == 404
+
+
+def test_render_escapes_markup_and_accepts_a_table(client):
+    rows = [{"Invested": "₹0", "Tax saved": "₹0"}, {"Invested": "₹10,000", "Tax saved": 520.0}]
+    response = client.post("/render", json={"confirmed_data": {"basic_salary": 50000},
+                                            "report": "<b>unclosed & x", "scenarios": rows})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+
+
+@pytest.mark.parametrize("rows", [
+    [{"Invested": "₹0", "Tax": "₹0"}, {"Invested": "₹1"}],
+    [{"Invested": "₹0"}, {"Tax": "₹0"}],
+    [{}],
+    [{"Invested": {"nested": 1}}],
+])
+def test_ragged_or_nested_scenarios_are_rejected(client, rows):
+    response = client.post("/render", json={"confirmed_data": {"basic_salary": 50000}, "report": "r",
+                                            "scenarios": rows})
+    assert response.status_code == 422
+
+
+def test_admission_limits():
+    admission = service.AdmissionControl(max_in_flight=2, per_client=1)
+    admission.acquire("a")
+    with pytest.raises(service.ServiceError) as info:
+        admission.acquire("a")
+    assert info.value.status_code == 429
+    admission.acquire("b")
+    with pytest.raises(service.ServiceError) as info:
+        admission.acquire("c")
+    assert info.value.status_code == 503
+    admission.release("a")
+    admission.release("b")
+    assert admission.stats()["in_flight"] == 0 and admission.stats()["active_clients"] == 0
+
+
+def test_client_id_header_is_only_trusted_from_proxies(monkeypatch):
+    request = type("R", (), {})()
+    request.client = type("C", (), {"host": "10.1.2.3"})()
+    request.headers = {"x-client-id": "tenant-7"}
+    assert service.client_id(request) == "10.1.2.3"
+    monkeypatch.setattr(service, "TRUSTED_PROXIES", [ipaddress.ip_network("10.0.0.0/8")])
+    assert service.client_id(request) == "tenant-7"
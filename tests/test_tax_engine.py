@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+
+from tax_engine import (
+    REPORT_HEADING,
+    SECTION_1_HEADING,
+    SECTION_2_HEADING,
+    compute_tax_columns,
+    compute_tax_figures,
+    figures_for_prompt,
+    format_amount,
+    income_tax,
+    render_numbers_report,
+)
+from tax_rules import get_tax_rules
+
+INDIA = get_tax_rules("India", "2024-25")
+USA = get_tax_rules("USA", "2024")
+
+
+def figure_values(computation) -> dict:
+    return {fig["key"]: fig["value"] for fig in computation["figures"]}
+
+
+@pytest.mark.parametrize("value, country, expected", [
+    (150000, "India", "₹1,50,000"),
+    (1234567.5, "India", "₹12,34,567.50"),
+    (999, "India", "₹999"),
+    (-2500, "USA", "-$2,500"),
+    (1000, "Other", "1,000"),
+])
+def test_format_amount(value, country, expected):
+    assert format_amount(value, country) == expected
+
+
+@pytest.mark.parametrize("taxable, expected", [
+    (0, 0.0),
+    (490000, 0.0),            # under the 87A limit: fully rebated
+    (500000, 0.0),            # at the limit
+    (500001, 13000.208),      # just over: no rebate, 5% band plus cess
+    (700000, 54600.0),        # (12,500 + 40,000) x 1.04
+    (1200000, 179400.0),      # (12,500 + 1,00,000 + 60,000) x 1.04
+])
+def test_india_income_tax_slabs_rebate_and_cess(taxable, expected):
+    assert income_tax(np.array([taxable]), INDIA)[0] == pytest.approx(expected)
+
+
+def test_usa_income_tax_slabs():
+    # 11,600 x 10% + 35,550 x 12% + 2,850 x 22%
+    assert income_tax(np.array([50000.0]), USA)[0] == pytest.approx(6053.0)
+
+
+def test_income_tax_is_vectorized_and_floors_negative_income():
+    taxable = np.array([[-1000.0, 700000.0], [1200000.0, 0.0]])
+    np.testing.assert_allclose(income_tax(taxable, INDIA), [[0.0, 54600.0], [179400.0, 0.0]])
+
+
+def test_compute_figures_for_a_monthly_slip():
+    data = {"basic_salary": 50000, "house_rent_allowance": 20000, "employee_pf_contribution": 6000,
+            "professional_tax": 200}
+    values = figure_values(compute_tax_figures(data, "India", "2024-25"))
+    assert values["standard_deduction"] == 50000
+    assert values["professional_tax_deduction"] == 2400
+    assert values["total_80c_used"] == 72000
+    assert values["80c_gap"] == 78000
+    assert values["annual_hra"] == 240000
+
+
+def test_annual_data_is_not_multiplied_again():
+    values = figure_values(compute_tax_figures({"employee_pf_contribution": 72000}, "India", "2024-25",
+                                               annualize_factor=1))
+    assert values["total_80c_used"] == 72000
+    assert values["80c_gap"] == 78000
+
+
+def test_80c_gap_never_goes_negative():
+    values = figure_values(compute_tax_figures({"employee_pf_contribution": 20000}, "India", "2024-25"))
+    assert values["80c_gap"] == 0
+
+
+def test_unknown_rules_return_none():
+    assert compute_tax_figures({"basic_salary": 1}, "Mars", "2024") is None
+    assert compute_tax_columns({"basic_salary": np.array([1.0])}, "Mars", "2024") is None
+
+
+def test_columns_match_the_per_employee_figures():
+    employees = [
+        {"basic_salary": 50000, "employee_pf_contribution": 6000, "professional_tax": 200},
+        {"basic_salary": 80000, "professional_tax": 200},
+        {"basic_salary": 30000, "employee_pf_contribution": 15000},
+    ]
+    fields = ("basic_salary", "employee_pf_contribution", "professional_tax")
+    columns = {f: np.array([e.get(f, np.nan) for e in employees], dtype=float) for f in fields}
+    out = compute_tax_columns(columns, "India", "2024-25")
+    for i, employee in enumerate(employees):
+        values = figure_values(compute_tax_figures(employee, "India", "2024-25"))
+        for key in ("total_80c_used", "80c_gap", "professional_tax_deduction"):
+            assert out[key][i] == pytest.approx(values.get(key, 0.0)), (i, key)
+    # 9,60,000 gross - 50,000 standard - 2,400 professional tax
+    assert out["taxable_before_exemptions"][1] == pytest.approx(907600)
+    assert out["tax_before_exemptions"][1] == pytest.approx(income_tax(np.array([907600.0]), INDIA)[0])
+
+
+def test_numbers_report_and_prompt_block():
+    computation = compute_tax_figures({"basic_salary": 50000, "employee_pf_contribution": 6000}, "India", "2024-25")
+    report = render_numbers_report(computation)
+    assert report.startswith(REPORT_HEADING)
+    assert SECTION_1_HEADING in report and SECTION_2_HEADING in report
+    assert "₹78,000" in report
+    block = figures_for_prompt(computation)
+    assert "- [S2] 80C gap: 78000 (150000 - 72000)" in block.splitlines()
+
+
+def test_health_insurance_premium_is_detected_for_80d():
+    values = figure_values(compute_tax_figures({"basic_salary": 50000, "health_insurance_premium": 1500},
+                                               "India", "2024-25"))
+    assert values["80d_detected"] == 18000
+    assert values["80d_self_limit"] == 25000
+    assert figure_values(compute_tax_figures({"basic_salary": 50000}, "India", "2024-25"))["80d_detected"] == 0
+
+
+def test_usa_columns_apply_the_single_filer_standard_deduction():
+    out = compute_tax_columns({"basic_salary": np.array([80000.0])}, "USA", "2024")
+    assert out["deductions_claimed"][0] == 14600
+    assert out["taxable_before_exemptions"][0] == pytest.approx(945400)
+    assert out["tax_before_exemptions"][0] == pytest.approx(income_tax(np.array([945400.0]), USA)[0])
+
+
+def test_columns_detect_the_health_insurance_premium():
+    columns = {"basic_salary": np.array([50000.0, 50000.0]), "health_insurance_premium": np.array([1500.0, np.nan])}
+    out = compute_tax_columns(columns, "India", "2024-25")
+    np.testing.assert_allclose(out["80d_detected"], [18000.0, 0.0])
+    np.testing.assert_allclose(out["deductions_claimed"], [68000.0, 50000.0])
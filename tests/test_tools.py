@@ -0,0 +1,87 @@
+import pytest
+from pydantic import ValidationError
+
+from tools import AMOUNT_FIELDS, PARSER_TOOL_NAME, PayslipComponents, get_parser_tool
+
+
+def walk(node):
+    """Every subschema of a JSON schema, depth first ("properties"/"$defs" maps are not schemas)."""
+    if isinstance(node, dict):
+        yield node
+        for key, value in node.items():
+            if key in ("properties", "$defs"):
+                for subschema in value.values():
+                    yield from walk(subschema)
+            else:
+                yield from walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from walk(value)
+
+
+def test_tool_schema_is_strict_mode_compatible():
+    tool = get_parser_tool()
+    assert tool["function"]["name"] == PARSER_TOOL_NAME
+    assert tool["function"]["strict"] is True
+    schema = tool["function"]["parameters"]
+    assert set(AMOUNT_FIELDS) <= set(schema["properties"])
+    objects = [node for node in walk(schema) if node.get("type") == "object" and "properties" in node]
+    assert len(objects) >= 2  # PayslipComponents and the LineItem definition
+    for node in objects:
+        assert node["additionalProperties"] is False
+        assert node["required"] == list(node["properties"])
+
+
+def test_tool_schema_drops_keywords_strict_mode_rejects():
+    schema = get_parser_tool()["function"]["parameters"]
+    for node in walk(schema):
+        assert not set(node) & {"default", "title", "minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum"}
+
+
+def test_reask_tool_lists_only_the_requested_fields():
+    tool = get_parser_tool(("basic_salary", "professional_tax"))
+    schema = tool["function"]["parameters"]
+    assert list(schema["properties"]) == ["basic_salary", "professional_tax"]
+    assert schema["required"] == ["basic_salary", "professional_tax"]
+    # The cached full tool is not affected by the subset.
+    assert set(AMOUNT_FIELDS) <= set(get_parser_tool()["function"]["parameters"]["properties"])
+
+
+def test_tools_are_built_once():
+    assert get_parser_tool() is get_parser_tool()
+    assert get_parser_tool(("basic_salary",)) is get_parser_tool(("basic_salary",))
+
+
+def test_annual_figures_are_converted_to_monthly():
+    data = PayslipComponents(
+        basic_salary=600000, professional_tax=2400, period="annual",
+        line_items=[{"label": "Conveyance Allowance", "amount": 19200, "kind": "earning"}],
+    ).to_dict()
+    assert data["basic_salary"] == 50000
+    assert data["professional_tax"] == 200
+    assert data["line_items"][0]["amount"] == 1600
+    assert data["period"] == "monthly"
+
+
+def test_to_dict_drops_unset_and_empty_values():
+    assert PayslipComponents(basic_salary=50000, house_rent_allowance=None, line_items=[]).to_dict() == {
+        "basic_salary": 50000,
+    }
+
+
+@pytest.mark.parametrize("payload", [
+    {"basic_salary": -1},
+    {"period": "weekly"},
+    {"line_items": [{"label": "Bonus", "amount": 100, "kind": "perk"}]},
+])
+def test_invalid_values_are_rejected(payload):
+    with pytest.raises(ValidationError):
+        PayslipComponents(**payload)
+
+
+def test_parser_prompt_names_every_schema_field():
+    import prompts
+
+    for label in ("Basic Salary", "House Rent Allowance", "Provident Fund", "Professional Tax",
+                  "Leave Travel Allowance", "Special Allowance", "Health Insurance Premium", "line_items", "period"):
+        assert label in prompts.PARSER_SYSTEM_PROMPT
@@ -0,0 +1,63 @@
+import logging
+
+import pytest
+from pydantic import ValidationError
+
+from agent import SalaryAgent, _salvage_components
+from benchmarks.fake_openai import FakeOpenAI
+from cache import LLMCache
+from tools import PayslipComponents
+from tracing import PrometheusTextSink, Tracer, error_summary, set_tracer, span, stage_summary
+
+
+@pytest.fixture
+def tracer():
+    tracer = Tracer()
+    set_tracer(tracer)
+    yield tracer
+    set_tracer(None)
+
+
+def test_spans_record_the_error_type_only(tracer):
+    with pytest.raises(ValueError):
+        with span("stage") as s:
+            s.set(model="gpt-4o")
+            raise ValueError("basic_salary: 123456 is invalid")
+    record = tracer.recent[-1]
+    assert record["error"] == "ValueError" and record["model"] == "gpt-4o"
+    assert error_summary(tracer.recent) == [
+        {"stage": "stage", "error_type": "ValueError", "count": 1, "last_seen": record["start"]},
+    ]
+    assert stage_summary(tracer.recent)[0]["errors"] == 1
+
+
+def test_prometheus_sink_flushes_on_close_and_keeps_the_file(tmp_path):
+    sink = PrometheusTextSink(str(tmp_path / "metrics.prom"), flush_interval=3600)
+    sink.export({"name": "agent.parse", "duration_ms": 12.0, "error": None})
+    sink.export({"name": "agent.parse", "duration_ms": 30.0, "error": "ParseError"})
+    # The first export flushed; the second is only written by close().
+    assert 'salary_agent_stage_duration_ms_count{stage="agent.parse"' in open(sink.path).read()
+    assert "} 2\n" not in open(sink.path).read()
+    sink.close()
+    text = open(sink.path).read()
+    assert f'salary_agent_stage_duration_ms_count{{stage="agent.parse",pid="{sink.pid}"}} 2' in text
+    assert f'salary_agent_stage_errors_total{{stage="agent.parse",pid="{sink.pid}"}} 1' in text
+
+
+def test_parse_source_is_set_on_the_span_not_the_agent(tracer):
+    agent = SalaryAgent(client=FakeOpenAI(), cache=LLMCache(db_path=None), fast_path_threshold=2.0)
+    text = "Basic Salary: 50,000\nHRA: 20,000"
+    agent.parse_payslip_text(text)
+    agent.parse_payslip_text(text)
+    assert [r["source"] for r in tracer.recent if r["name"] == "agent.parse"] == ["llm", "cache"]
+    assert not hasattr(agent, "last_parse_source") and not hasattr(agent, "last_redaction")
+
+
+def test_dropped_fields_are_logged_without_their_values(caplog):
+    arguments = {"basic_salary": 50000, "house_rent_allowance": -123456}
+    with pytest.raises(ValidationError) as info:
+        PayslipComponents(**arguments)
+    with caplog.at_level(logging.WARNING, logger="agent"):
+        assert _salvage_components(arguments, info.value) == {"basic_salary": 50000}
+    assert "house_rent_allowance" in caplog.text
+    assert "123456" not in caplog.text
@@ -0,0 +1,117 @@
+import asyncio
+import gzip
+
+import pytest
+
+from benchmarks.fake_openai import FakeAsyncOpenAI, FakeOpenAI
+from errors import CassetteMissError
+from transport import (
+    Cassette,
+    LiveTransport,
+    RecordingTransport,
+    ReplayTransport,
+    request_key,
+    transport_from_env,
+)
+
+ANALYSIS = {"model": "gpt-4o", "messages": [{"role": "user", "content": "Analyze this."}], "temperature": 0.1}
+
+
+def test_request_key_ignores_delivery_options():
+    assert request_key(ANALYSIS) == request_key(dict(ANALYSIS, stream=True, stream_options={"include_usage": True}))
+    assert request_key(ANALYSIS) != request_key(dict(ANALYSIS, temperature=0.2))
+
+
+def test_recorded_responses_replay_without_the_client(tmp_path):
+    cassette = Cassette(str(tmp_path / "llm.jsonl.gz"))
+    client = FakeOpenAI()
+    recorded = RecordingTransport(LiveTransport(client), cassette).create(**ANALYSIS)
+
+    replay = ReplayTransport(Cassette(cassette.path))
+    replayed = replay.create(**ANALYSIS)
+    assert replayed.choices[0].message.content == recorded.choices[0].message.content
+    assert replayed.usage.completion_tokens == recorded.usage.completion_tokens
+    assert replayed.choices[0].message.tool_calls is None
+    assert (replay.hits, client.calls) == (1, 1)
+
+
+def test_a_strict_replay_miss_raises(tmp_path):
+    replay = ReplayTransport(Cassette(str(tmp_path / "missing.jsonl.gz")), fallback=LiveTransport(FakeOpenAI()))
+    with pytest.raises(CassetteMissError, match=request_key(ANALYSIS)[:12]):
+        replay.create(**ANALYSIS)
+    assert replay.misses == 1
+
+
+def test_a_lenient_replay_miss_goes_live(tmp_path):
+    client = FakeOpenAI()
+    replay = ReplayTransport(Cassette(str(tmp_path / "missing.jsonl.gz")), strict=False,
+                             fallback=LiveTransport(client))
+    assert replay.create(**ANALYSIS).choices[0].message.content
+    assert client.calls == 1
+
+
+def test_a_recorded_stream_replays_as_a_completion_and_vice_versa(tmp_path):
+    cassette = Cassette(str(tmp_path / "llm.jsonl.gz"))
+    streamed = RecordingTransport(LiveTransport(FakeOpenAI(chunk_chars=7)), cassette).create(
+        **ANALYSIS, stream=True)
+    text = "".join(c.choices[0].delta.content for c in streamed if c.choices)
+
+    replay = ReplayTransport(Cassette(cassette.path))
+    assert replay.create(**ANALYSIS).choices[0].message.content == text
+    chunks = list(replay.create(**ANALYSIS, stream=True))
+    assert "".join(c.choices[0].delta.content for c in chunks if c.choices) == text
+    assert chunks[-1].usage.completion_tokens > 0
+
+
+def test_a_stream_stopped_early_is_not_recorded(tmp_path):
+    cassette = Cassette(str(tmp_path / "llm.jsonl.gz"))
+    stream = RecordingTransport(LiveTransport(FakeOpenAI(chunk_chars=7)), cassette).create(**ANALYSIS, stream=True)
+    next(stream)
+    stream.close()
+    assert len(Cassette(cassette.path)) == 0
+
+
+def test_async_record_and_replay(tmp_path):
+    cassette = Cassette(str(tmp_path / "llm.jsonl.gz"))
+
+    async def run():
+        recorded = await RecordingTransport(LiveTransport(FakeAsyncOpenAI()), cassette).acreate(**ANALYSIS)
+        stream = await ReplayTransport(Cassette(cassette.path)).acreate(**ANALYSIS, stream=True)
+        chunks = [chunk async for chunk in stream]
+        return recorded.choices[0].message.content, "".join(c.choices[0].delta.content for c in chunks if c.choices)
+
+    recorded, replayed = asyncio.run(run())
+    assert recorded == replayed
+
+
+def test_a_truncated_write_keeps_earlier_entries(tmp_path):
+    cassette = Cassette(str(tmp_path / "llm.jsonl.gz"))
+    cassette.put("a", "gpt-4o", {"choices": []})
+    first_member = len(open(cassette.path, "rb").read())
+    cassette.put("b", "gpt-4o", {"choices": []})
+    data = open(cassette.path, "rb").read()
+    # A crash part-way through writing the second member.
+    with open(cassette.path, "wb") as f:
+        f.write(data[:first_member + 10])
+    reloaded = Cassette(cassette.path)
+    assert reloaded.get("a") == {"choices": []} and reloaded.get("b") is None
+
+
+def test_compact_keeps_the_latest_entry_per_key(tmp_path):
+    cassette = Cassette(str(tmp_path / "llm.jsonl.gz"))
+    cassette.put("a", "gpt-4o", {"choices": [], "n": 1})
+    cassette.put("a", "gpt-4o", {"choices": [], "n": 2})
+    cassette.compact()
+    with gzip.open(cassette.path, "rt", encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
+    assert Cassette(cassette.path).get("a")["n"] == 2
+
+
+def test_strict_replay_from_env_needs_no_client(tmp_path, monkeypatch):
+    monkeypatch.setenv("SALARY_AGENT_TRANSPORT", "replay")
+    monkeypatch.setenv("SALARY_AGENT_CASSETTE", str(tmp_path / "llm.jsonl.gz"))
+    transport = transport_from_env(None)
+    assert isinstance(transport, ReplayTransport) and transport.strict and transport.fallback is None
+    monkeypatch.setenv("SALARY_AGENT_TRANSPORT", "tape")
+    with pytest.raises(ValueError):
+        transport_from_env(None)
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from ytd import PayrollTable, detect_period, fiscal_year_months
+
+
+def slip(month: str, basic: float = 50000, hra: float = 20000):
+    return {"basic_salary": basic, "house_rent_allowance": hra}, f"Payslip for the month of {month}\nBasic Salary: {basic}"
+
+
+def table_for(months, **kwargs):
+    items, texts = zip(*(slip(*m) if isinstance(m, tuple) else slip(m) for m in months))
+    return PayrollTable.from_months(items, texts, **kwargs)
+
+
+def test_detect_period():
+    assert detect_period("Pay slip for the month of March 2025") == (2025, 3)
+    assert detect_period("Salary for Sept, 2024") == (2024, 9)
+    assert detect_period("no date here") is None
+
+
+def test_fiscal_year_months():
+    india = fiscal_year_months("2024-25")
+    assert india[0] == (2024, 4) and india[-1] == (2025, 3) and len(india) == 12
+    usa = fiscal_year_months("2024")
+    assert usa[0] == (2024, 1) and usa[-1] == (2024, 12)
+    assert fiscal_year_months("FY next") is None
+
+
+def test_rows_are_sorted_and_ytd_accumulates():
+    table = table_for([("May 2024", 50000), ("April 2024", 40000)])
+    assert table.labels == ["Apr 2024", "May 2024"]
+    np.testing.assert_array_equal(table.column("basic_salary"), [40000, 50000])
+    assert table.ytd()[-1, 0] == 90000
+
+
+def test_projection_uses_the_latest_month_for_the_remaining_months():
+    table = table_for([("April 2024", 40000), ("May 2024", 50000)])
+    assert table.annual_data()["basic_salary"] == 40000 + 50000 * 11
+    assert table.changes() == [("May 2024", "basic_salary", 40000.0, 50000.0)]
+
+
+def test_duplicate_periods_are_counted_once():
+    table = table_for(["March 2025", "March 2025", "April 2025"])
+    assert len(table) == 2
+    assert table.annual_data()["basic_salary"] == 50000 * 12
+    assert any("more than once" in w for w in table.warnings)
+
+
+def test_slips_outside_the_tax_year_are_dropped():
+    table = table_for(["March 2024", "April 2024", "May 2024"], tax_year="2024-25")
+    assert table.labels == ["Apr 2024", "May 2024"]
+    assert any("outside tax year" in w for w in table.warnings)
+
+
+def test_two_years_of_slips_never_project_more_than_a_year():
+    months = [f"{name} {year}" for year in (2024, 2025) for name in
+              ("January", "February", "March", "April", "May", "June", "July", "August", "September",
+               "October", "November", "December")]
+    table = table_for(months, tax_year="2024")
+    assert len(table) == 12
+    assert table.annual_data()["basic_salary"] == 50000 * 12
+
+
+def test_more_than_twelve_undated_slips_are_rejected():
+    items = [{"basic_salary": 50000}] * 13
+    with pytest.raises(ValueError):
+        PayrollTable.from_months(items, ["Basic Salary: 50000"] * 13)
+
+
+def test_missing_components_stay_missing():
+    table = PayrollTable.from_months([{"basic_salary": 1.0}, {"basic_salary": 1.0, "professional_tax": 200.0}])
+    data = table.annual_data()
+    assert "professional_tax" in data and "special_allowance" not in data
@@ -0,0 +1,147 @@
+"""
+Token counting and per-call usage accounting for LLM requests.
+
+Prompt size is estimated locally before a call (tiktoken when installed,
+otherwise a ~4 characters/token heuristic) so an over-budget request fails
+fast instead of being sent. Actual prompt/completion token counts reported by
+the API are recorded per call in a UsageLog.
+"""
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+
+from errors import TokenBudgetExceededError
+
+try:  # Optional dependency: exact counts when available.
+    import tiktoken
+except ImportError:  # pragma: no cover - depends on the environment
+    tiktoken = None
+
+# Per-message framing overhead used by chat models.
+_MESSAGE_OVERHEAD = 4
+_encodings = {}
+
+
+def _encoding_for(model: str):
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("o200k_base")
+    return _encodings[model]
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Token count of a string (exact with tiktoken, estimated otherwise)."""
+    if not text:
+        return 0
+    encoding = _encoding_for(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / 4)
+
+
+def estimate_request_tokens(request: dict) -> int:
+    """Estimate the prompt tokens of a chat-completions request (messages + tools)."""
+    model = request.get("model", "gpt-4o")
+    total = 3  # priming tokens for the assistant reply
+    for message in request.get("messages", []):
+        total += _MESSAGE_OVERHEAD + count_tokens(str(message.get("content") or ""), model)
+    if request.get("tools"):
+        total += count_tokens(json.dumps(request["tools"], separators=(",", ":")), model)
+    return total
+
+
+@dataclass
+class TokenUsage:
+    """Token usage of one LLM call."""
+    call: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    estimated_prompt_tokens: int
+    timestamp: float
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["total_tokens"] = self.total_tokens
+        return data
+
+
+class TokenBudget:
+    """
+    Per-call token limits. A limit of 0 means unlimited.
+    max_prompt_tokens is enforced locally before the call; max_completion_tokens
+    is passed to the API as max_tokens.
+    """
+
+    def __init__(self, max_prompt_tokens: int = 0, max_completion_tokens: int = 0):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_completion_tokens = max_completion_tokens
+
+    @classmethod
+    def from_env(cls) -> "TokenBudget":
+        """Read MAX_PROMPT_TOKENS / MAX_COMPLETION_TOKENS (0 or unset = unlimited)."""
+        return cls(
+            max_prompt_tokens=int(os.getenv("MAX_PROMPT_TOKENS", "0")),
+            max_completion_tokens=int(os.getenv("MAX_COMPLETION_TOKENS", "0")),
+        )
+
+    def apply(self, call: str, request: dict) -> int:
+        """
+        Check the request against the budget and add max_tokens if configured.
+        Returns the estimated prompt tokens; raises TokenBudgetExceededError.
+        """
+        estimated = estimate_request_tokens(request)
+        if self.max_prompt_tokens and estimated > self.max_prompt_tokens:
+            raise TokenBudgetExceededError(
+                f"{call} prompt is ~{estimated} tokens, over the budget of {self.max_prompt_tokens}."
+            )
+        if self.max_completion_tokens:
+            request["max_tokens"] = self.max_completion_tokens
+        return estimated
+
+
+class UsageLog:
+    """Thread-safe, bounded log of TokenUsage records with running totals."""
+
+    def __init__(self, max_records: int = 1000):
+        self._records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        self.totals = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def record(self, call: str, model: str, usage, estimated_prompt_tokens: int) -> TokenUsage:
+        """Record one call; `usage` is the API's usage object (or None if not reported)."""
+        entry = TokenUsage(
+            call=call,
+            model=model,
+            prompt_tokens=getattr(usage, "prompt_tokens", None) or estimated_prompt_tokens,
+            completion_tokens=getattr(usage, "completion_tokens", None) or 0,
+            estimated_prompt_tokens=estimated_prompt_tokens,
+            timestamp=time.time(),
+        )
+        with self._lock:
+            self._records.append(entry)
+            self.totals["calls"] += 1
+            self.totals["prompt_tokens"] += entry.prompt_tokens
+            self.totals["completion_tokens"] += entry.completion_tokens
+        return entry
+
+    @property
+    def last(self) -> TokenUsage | None:
+        with self._lock:
+            return self._records[-1] if self._records else None
+
+    def records(self) -> list:
+        with self._lock:
+            return list(self._records)
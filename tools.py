@@ -1,5 +1,17 @@
+import copy
+from functools import lru_cache
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Literal, Optional
+
+
+class LineItem(BaseModel):
+    """Any payslip component that has no dedicated field in PayslipComponents."""
+    label: str = Field(..., description="The component's label as printed on the payslip, e.g. 'Conveyance Allowance'.")
+    amount: float = Field(..., ge=0, description="The amount as a plain number, without currency symbols or commas.")
+    kind: Literal["earning", "deduction"] = Field(
+        ..., description="'earning' for pay and allowances, 'deduction' for anything subtracted from pay."
+    )
+
 
 # This Pydantic model defines the *structure* we want OpenAI to extract.
 # This is our "Payslip Parser Engine" tool schema.
@@ -9,24 +21,110 @@ class PayslipComponents(BaseModel):
     All values should be the *monthly* amount.
     """
     basic_salary: Optional[float] = Field(
-        None, description="The monthly Basic Salary or Basic Pay."
+        None, ge=0, description="The monthly Basic Salary or Basic Pay."
     )
     house_rent_allowance: Optional[float] = Field(
-        None, description="The monthly House Rent Allowance (HRA)."
+        None, ge=0, description="The monthly House Rent Allowance (HRA)."
     )
     employee_pf_contribution: Optional[float] = Field(
-        None, description="The monthly Employee's Provident Fund (PF) contribution."
+        None, ge=0, description="The monthly Employee's Provident Fund (PF) contribution."
     )
     professional_tax: Optional[float] = Field(
-        None, description="The monthly Professional Tax (PT) deduction."
+        None, ge=0, description="The monthly Professional Tax (PT) deduction."
     )
     leave_travel_allowance: Optional[float] = Field(
-        None, description="The monthly Leave Travel Allowance (LTA)."
+        None, ge=0, description="The monthly Leave Travel Allowance (LTA)."
     )
     special_allowance: Optional[float] = Field(
-        None, description="The monthly Special Allowance or Other Allowance."
+        None, ge=0, description="The monthly Special Allowance or Other Allowance."
+    )
+    health_insurance_premium: Optional[float] = Field(
+        None, ge=0, description="The monthly health insurance (mediclaim) premium deducted from pay, if any."
+    )
+    line_items: Optional[list[LineItem]] = Field(
+        None, description="Every other recurring component (earnings and deductions) not covered by a field above. "
+                          "Exclude totals, gross/net pay and employer contributions."
     )
-    
+    period: Optional[Literal["monthly", "annual"]] = Field(
+        None, description="Whether the amounts above are monthly or annual figures, as written on the payslip."
+    )
+
     def to_dict(self):
-        """Helper function to convert model to a clean dictionary."""
-        return self.model_dump(exclude_unset=True, exclude_none=True)
\ No newline at end of file
+        """
+        Helper function to convert model to a clean dictionary. Annual
+        figures are converted to monthly, so the result is always monthly.
+        """
+        data = self.model_dump(exclude_unset=True, exclude_none=True)
+        if data.get("period") == "annual":
+            for field in AMOUNT_FIELDS:
+                if field in data:
+                    data[field] = round(data[field] / 12, 2)
+            for item in data.get("line_items", []):
+                item["amount"] = round(item["amount"] / 12, 2)
+            data["period"] = "monthly"
+        if not data.get("line_items"):
+            data.pop("line_items", None)
+        return data
+
+
+# The fixed monetary fields (what the tax engine, editors and tables work with).
+AMOUNT_FIELDS = (
+    "basic_salary", "house_rent_allowance", "employee_pf_contribution",
+    "professional_tax", "leave_travel_allowance", "special_allowance", "health_insurance_premium",
+)
+assert set(AMOUNT_FIELDS) <= set(PayslipComponents.model_fields), "AMOUNT_FIELDS out of sync with PayslipComponents"
+
+PARSER_TOOL_NAME = "PayslipComponents"
+_UNSUPPORTED_KEYWORDS = ("default", "title", "minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum")
+
+
+def _strict_schema(node):
+    """
+    Rewrite a Pydantic JSON schema for OpenAI strict mode: every object closes
+    additionalProperties and lists all its properties as required (optional
+    ones are already nullable), and keywords strict mode rejects are dropped
+    (bounds are still enforced by Pydantic on the way back).
+    """
+    if isinstance(node, dict):
+        node = {k: _strict_schema(v) for k, v in node.items() if k not in _UNSUPPORTED_KEYWORDS}
+        if node.get("type") == "object" and "properties" in node:
+            node["additionalProperties"] = False
+            node["required"] = list(node["properties"])
+        return node
+    if isinstance(node, list):
+        return [_strict_schema(v) for v in node]
+    return node
+
+
+@lru_cache(maxsize=None)
+def _strict_payslip_schema() -> dict:
+    schema = PayslipComponents.model_json_schema()
+    # Properties are {name: subschema}; keep the names, strip only the subschemas.
+    strict = _strict_schema({k: v for k, v in schema.items() if k != "properties"})
+    strict["properties"] = {name: _strict_schema(prop) for name, prop in schema["properties"].items()}
+    strict["additionalProperties"] = False
+    strict["required"] = list(strict["properties"])
+    return strict
+
+
+@lru_cache(maxsize=None)
+def get_parser_tool(fields: tuple | None = None) -> dict:
+    """
+    The parser's tool definition, built once (per field subset) and cached.
+    `fields` restricts it to those properties, for re-asking only the fields
+    that failed validation. Callers must not mutate the result.
+    """
+    schema = _strict_payslip_schema()
+    if fields is not None:
+        schema = copy.deepcopy(schema)
+        schema["properties"] = {name: schema["properties"][name] for name in fields}
+        schema["required"] = list(fields)
+    return {
+        "type": "function",
+        "function": {
+            "name": PARSER_TOOL_NAME,
+            "description": "Extracts salary components from a user's payslip text.",
+            "parameters": schema,
+            "strict": True,
+        },
+    }
@@ -0,0 +1,323 @@
+"""
+Span-based latency and cost instrumentation.
+
+Wrap a stage in `with span("agent.parse") as s:` and attach attributes with
+`s.set(model=..., prompt_tokens=...)`. Finished spans are kept in an
+in-process ring buffer and exported to the configured sink:
+
+    TRACE_SINK=jsonl (default)   one JSON object per span in TRACE_JSONL_PATH
+    TRACE_SINK=prometheus        Prometheus text exposition, one file per process
+                                 (TRACE_PROM_PATH with the pid inserted, e.g.
+                                 metrics.1234.prom, labelled pid="1234")
+    TRACE_SINK=none              in-memory only
+
+The admin page (pages/admin_latency.py) reads these to show p50/p95/p99 per stage.
+Span errors record the exception type only: messages (e.g. pydantic
+validation errors) can quote payslip values and are not written to sinks.
+"""
+import atexit
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+TRACES_DIR = os.path.join(os.path.dirname(__file__), ".traces")
+DEFAULT_JSONL_PATH = os.path.join(TRACES_DIR, "spans.jsonl")
+DEFAULT_PROM_PATH = os.path.join(TRACES_DIR, "metrics.prom")
+MAX_JSONL_BYTES = 50 * 1024 * 1024
+
+# USD per 1M tokens (input, output). Used for estimated cost only.
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD cost of one call; 0.0 for unknown models."""
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return round((prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000, 6)
+
+
+class Span:
+    """One timed stage. Attributes are free-form JSON-serializable values."""
+
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.attrs = dict(attrs)
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.duration_ms = None
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def record_usage(self, model: str, usage):
+        """Attach token counts and estimated cost from a tokens.TokenUsage record."""
+        if usage is None:
+            return
+        self.set(model=model, prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens,
+                 cost_usd=estimate_cost(model, usage.prompt_tokens, usage.completion_tokens))
+
+    @property
+    def elapsed_ms(self) -> float:
+        """Milliseconds since the span started (its duration once ended)."""
+        if self.duration_ms is not None:
+            return self.duration_ms
+        return round((time.perf_counter() - self._t0) * 1000, 3)
+
+    def end(self):
+        if self.duration_ms is None:
+            self.duration_ms = self.elapsed_ms
+            get_tracer().export(self)
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "start": self.start, "duration_ms": self.duration_ms,
+                "error": self.error, **self.attrs}
+
+
+# --- Sinks --------------------------------------------------------------------
+
+class JsonlSink:
+    """Appends one JSON line per span; rotates to <path>.1 past MAX_JSONL_BYTES."""
+
+    def __init__(self, path: str = DEFAULT_JSONL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, record: dict):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            try:
+                if os.path.getsize(self.path) > MAX_JSONL_BYTES:
+                    os.replace(self.path, self.path + ".1")
+            except FileNotFoundError:
+                pass
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+class PrometheusTextSink:
+    """
+    Aggregates spans into per-stage counters and latency histograms and
+    rewrites a Prometheus text-format file (node-exporter textfile style).
+    The file is rewritten at most once per `flush_interval` seconds, and
+    once more on close() (registered with atexit) so no span is lost.
+
+    Each process writes its own file (`path` with the pid inserted before
+    the extension) and labels its series with pid="...", so app workers and
+    the service never overwrite each other's counters; aggregate with
+    sum without (pid). Files are left in place when the process exits, so
+    the final counts stay scrapeable; clean up stale pids when redeploying.
+    """
+
+    BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+    def __init__(self, path: str = DEFAULT_PROM_PATH, flush_interval: float = 5.0):
+        root, ext = os.path.splitext(path)
+        self.pid = os.getpid()
+        self.path = f"{root}.{self.pid}{ext or '.prom'}"
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._last_flush = 0.0
+        self._dirty = False
+        atexit.register(self.close)
+
+    def export(self, record: dict):
+        with self._lock:
+            stage = self._stages.setdefault(record["name"], {
+                "count": 0, "errors": 0, "sum_ms": 0.0, "buckets": [0] * len(self.BUCKETS_MS),
+                "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0,
+            })
+            duration = record["duration_ms"] or 0.0
+            stage["count"] += 1
+            stage["errors"] += 1 if record.get("error") else 0
+            stage["sum_ms"] += duration
+            for i, bound in enumerate(self.BUCKETS_MS):
+                if duration <= bound:
+                    stage["buckets"][i] += 1
+            stage["prompt_tokens"] += record.get("prompt_tokens") or 0
+            stage["completion_tokens"] += record.get("completion_tokens") or 0
+            stage["cost_usd"] += record.get("cost_usd") or 0.0
+            self._dirty = True
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def _flush(self):
+        lines = [
+            "# TYPE salary_agent_stage_duration_ms histogram",
+            "# TYPE salary_agent_stage_errors_total counter",
+            "# TYPE salary_agent_tokens_total counter",
+            "# TYPE salary_agent_cost_usd_total counter",
+        ]
+        for name, stage in sorted(self._stages.items()):
+            label = f'stage="{name}",pid="{self.pid}"'
+            for bound, count in zip(self.BUCKETS_MS, stage["buckets"]):
+                lines.append(f'salary_agent_stage_duration_ms_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'salary_agent_stage_duration_ms_bucket{{{label},le="+Inf"}} {stage["count"]}')
+            lines.append(f"salary_agent_stage_duration_ms_sum{{{label}}} {stage['sum_ms']:.3f}")
+            lines.append(f"salary_agent_stage_duration_ms_count{{{label}}} {stage['count']}")
+            lines.append(f"salary_agent_stage_errors_total{{{label}}} {stage['errors']}")
+            lines.append(f'salary_agent_tokens_total{{{label},kind="prompt"}} {stage["prompt_tokens"]}')
+            lines.append(f'salary_agent_tokens_total{{{label},kind="completion"}} {stage["completion_tokens"]}')
+            lines.append(f"salary_agent_cost_usd_total{{{label}}} {stage['cost_usd']:.6f}")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)
+        self._last_flush = time.monotonic()
+        self._dirty = False
+
+    def close(self):
+        """Write out spans recorded since the last flush."""
+        with self._lock:
+            if self._dirty:
+                self._flush()
+
+
+# --- Tracer ---------------------------------------------------------------------
+
+class Tracer:
+    """Holds the sinks and a bounded in-memory buffer of recent spans."""
+
+    def __init__(self, sinks=None, buffer_size: int = 5000):
+        self.sinks = list(sinks or [])
+        self.recent = deque(maxlen=buffer_size)
+
+    def export(self, span: Span):
+        record = span.to_dict()
+        self.recent.append(record)
+        for sink in self.sinks:
+            try:
+                sink.export(record)
+            except Exception as e:
+                # Instrumentation must never break the request it measures.
+                logger.warning(f"Trace sink {type(sink).__name__} failed: {e}")
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def _tracer_from_env() -> Tracer:
+    kind = os.getenv("TRACE_SINK", "jsonl").lower()
+    if kind == "jsonl":
+        sinks = [JsonlSink(os.getenv("TRACE_JSONL_PATH", DEFAULT_JSONL_PATH))]
+    elif kind == "prometheus":
+        sinks = [PrometheusTextSink(os.getenv("TRACE_PROM_PATH", DEFAULT_PROM_PATH))]
+    else:
+        sinks = []
+    return Tracer(sinks)
+
+
+def get_tracer() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = _tracer_from_env()
+    return _tracer
+
+
+def set_tracer(tracer: Tracer):
+    """Replace the process-wide tracer (e.g. to add sinks programmatically)."""
+    global _tracer
+    _tracer = tracer
+
+
+def start_span(name: str, **attrs) -> Span:
+    """Start a span that the caller ends explicitly with span.end()."""
+    return Span(name, **attrs)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Time the enclosed block. Exceptions are recorded on the span and re-raised;
+    BaseExceptions used for control flow (e.g. Streamlit reruns) are not errors.
+    """
+    s = Span(name, **attrs)
+    try:
+        yield s
+    except Exception as e:
+        s.error = type(e).__name__
+        raise
+    finally:
+        s.end()
+
+
+# --- Reading spans back (admin page) ------------------------------------------
+
+def load_spans(path: str = None, limit: int = 20000) -> list:
+    """The last `limit` spans from the JSONL sink (or this process's buffer if none)."""
+    path = path or os.getenv("TRACE_JSONL_PATH", DEFAULT_JSONL_PATH)
+    if not os.path.exists(path):
+        return list(get_tracer().recent)
+    records = deque(maxlen=limit)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return list(records)
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile.
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def stage_summary(records: list) -> list:
+    """Per-stage count, error count, p50/p95/p99 latency, tokens and cost."""
+    stages = {}
+    for record in records:
+        stages.setdefault(record["name"], []).append(record)
+    summary = []
+    for name, items in sorted(stages.items()):
+        durations = sorted(r["duration_ms"] or 0.0 for r in items)
+        summary.append({
+            "stage": name,
+            "count": len(items),
+            "errors": sum(1 for r in items if r.get("error")),
+            "p50_ms": round(_percentile(durations, 50), 2),
+            "p95_ms": round(_percentile(durations, 95), 2),
+            "p99_ms": round(_percentile(durations, 99), 2),
+            "prompt_tokens": sum(r.get("prompt_tokens") or 0 for r in items),
+            "completion_tokens": sum(r.get("completion_tokens") or 0 for r in items),
+            "cost_usd": round(sum(r.get("cost_usd") or 0.0 for r in items), 4),
+        })
+    return summary
+
+
+def error_summary(records: list) -> list:
+    """
+    Error counts per stage and exception type, most frequent first. Only the
+    type is reported (older spans stored "Type: message"; the message is dropped).
+    """
+    counts = {}
+    for record in records:
+        error = record.get("error")
+        if not error:
+            continue
+        key = (record["name"], str(error).split(":", 1)[0].strip())
+        count, last = counts.get(key, (0, None))
+        starts = [value for value in (last, record.get("start")) if value is not None]
+        counts[key] = (count + 1, max(starts, default=None))
+    rows = [{"stage": stage, "error_type": error_type, "count": count, "last_seen": last}
+            for (stage, error_type), (count, last) in counts.items()]
+    return sorted(rows, key=lambda row: (-row["count"], row["stage"], row["error_type"]))
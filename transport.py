@@ -0,0 +1,299 @@
+"""
+Pluggable transport for chat-completions calls, with record/replay.
+
+Both agents send every LLM request through a transport instead of calling
+the OpenAI client directly:
+
+    LiveTransport       the OpenAI client (default; wrapped in
+                        resilience.ResilientTransport for retries)
+    RecordingTransport  live calls, each request/response appended to a cassette
+    ReplayTransport     responses served from a cassette with no network; in
+                        strict mode an unseen request raises CassetteMissError
+
+A cassette is a gzip-compressed JSONL file keyed by a hash of the request
+(model, messages, tools, parameters). Only the response is stored, not the
+request text, so cassettes stay small and hold no payslip text beyond what
+the model echoed back. Streaming and non-streaming calls share entries, so a
+report recorded once can be replayed either way.
+
+Select the transport with environment variables:
+
+    SALARY_AGENT_TRANSPORT=live|record|replay   (default: live)
+    SALARY_AGENT_CASSETTE=path                   (default: .cassettes/llm.jsonl.gz)
+    SALARY_AGENT_REPLAY_STRICT=1|0               (default: 1; 0 falls back to live)
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from types import SimpleNamespace
+
+from cache import canonical_json
+from errors import CassetteMissError
+
+DEFAULT_CASSETTE_PATH = os.path.join(os.path.dirname(__file__), ".cassettes", "llm.jsonl.gz")
+
+# Request keys that change how a response is delivered, not what it contains.
+_DELIVERY_KEYS = ("stream", "stream_options")
+
+
+def transport_mode() -> str:
+    return os.getenv("SALARY_AGENT_TRANSPORT", "live").strip().lower()
+
+
+def replay_is_strict() -> bool:
+    return os.getenv("SALARY_AGENT_REPLAY_STRICT", "1").strip().lower() not in ("0", "false", "no")
+
+
+def request_key(request: dict) -> str:
+    """Content hash of a chat-completions request, ignoring delivery options."""
+    material = {k: v for k, v in request.items() if k not in _DELIVERY_KEYS}
+    return hashlib.sha256(canonical_json(material).encode("utf-8")).hexdigest()
+
+
+# --- Response (de)serialization -----------------------------------------------
+
+def _to_plain(obj):
+    """OpenAI response objects (pydantic) or namespaces -> plain JSON data."""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(exclude_none=True)
+    if isinstance(obj, SimpleNamespace):
+        obj = vars(obj)
+    if isinstance(obj, dict):
+        return {k: _to_plain(v) for k, v in obj.items() if v is not None}
+    if isinstance(obj, (list, tuple)):
+        return [_to_plain(v) for v in obj]
+    return obj
+
+
+def _to_namespace(data):
+    """Plain data -> attribute-access objects shaped like the OpenAI response."""
+    if isinstance(data, dict):
+        return SimpleNamespace(**{k: _to_namespace(v) for k, v in data.items()})
+    if isinstance(data, list):
+        return [_to_namespace(v) for v in data]
+    return data
+
+
+def _completion_response(data: dict):
+    response = _to_namespace(data)
+    for choice in response.choices:
+        # Attributes the agent reads that model_dump(exclude_none=True) drops.
+        choice.message.content = getattr(choice.message, "content", None)
+        choice.message.tool_calls = getattr(choice.message, "tool_calls", None)
+    response.usage = getattr(response, "usage", None)
+    return response
+
+
+def _stream_chunks(data: dict):
+    """A recorded completion replayed as stream chunks (content, then usage)."""
+    content = data["choices"][0]["message"].get("content") or ""
+    for line in content.splitlines(keepends=True):
+        delta = SimpleNamespace(content=line)
+        yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta)], usage=None)
+    yield SimpleNamespace(choices=[], usage=_to_namespace(data.get("usage")))
+
+
+def _completion_from_stream(model: str, content: list, usage) -> dict:
+    return {
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(content)},
+                     "finish_reason": "stop"}],
+        "usage": _to_plain(usage) if usage is not None else None,
+    }
+
+
+# --- Cassette -----------------------------------------------------------------
+
+class Cassette:
+    """
+    Append-only gzip JSONL store of {"key", "model", "response"} records.
+    Each write is its own gzip member, so a crash never corrupts earlier
+    entries; compact() rewrites the file as a single deduplicated member.
+    """
+
+    def __init__(self, path: str = DEFAULT_CASSETTE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._index = None
+
+    def _load(self) -> dict:
+        if self._index is None:
+            index = {}
+            if os.path.exists(self.path):
+                with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                    try:
+                        for line in f:
+                            try:
+                                record = json.loads(line)
+                            except json.JSONDecodeError:
+                                continue
+                            index[record["key"]] = record["response"]
+                    except EOFError:
+                        # Truncated final member from an interrupted write.
+                        pass
+            self._index = index
+        return self._index
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load())
+
+    def get(self, key: str):
+        with self._lock:
+            return self._load().get(key)
+
+    def put(self, key: str, model: str, response: dict):
+        line = json.dumps({"key": key, "model": model, "response": response},
+                          separators=(",", ":"), ensure_ascii=False) + "\n"
+        with self._lock:
+            self._load()[key] = response
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line)
+
+    def compact(self):
+        """Rewrite the cassette with one record per key (latest wins)."""
+        with self._lock:
+            index = self._load()
+            tmp_path = self.path + ".tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                for key, response in index.items():
+                    f.write(json.dumps({"key": key, "model": response.get("model", ""), "response": response},
+                                       separators=(",", ":"), ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+
+
+# --- Transports ---------------------------------------------------------------
+
+class LiveTransport:
+    """Sends requests to the OpenAI client (sync or async)."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, **request):
+        return self.client.chat.completions.create(**request)
+
+    async def acreate(self, **request):
+        return await self.client.chat.completions.create(**request)
+
+
+class RecordingTransport:
+    """Live calls through `inner`, with every completed response saved to `cassette`."""
+
+    def __init__(self, inner, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def create(self, **request):
+        response = self.inner.create(**request)
+        if request.get("stream"):
+            return self._record_stream(request, response)
+        self.cassette.put(request_key(request), request.get("model", ""), _to_plain(response))
+        return response
+
+    async def acreate(self, **request):
+        response = await self.inner.acreate(**request)
+        if request.get("stream"):
+            return self._arecord_stream(request, response)
+        self.cassette.put(request_key(request), request.get("model", ""), _to_plain(response))
+        return response
+
+    def _record_stream(self, request, stream):
+        # Only a stream read to the end is recorded; either way the inner
+        # stream is closed, so a consumer that stops early releases the connection.
+        content, usage = [], None
+        try:
+            for chunk in stream:
+                usage = getattr(chunk, "usage", None) or usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    content.append(chunk.choices[0].delta.content)
+                yield chunk
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
+        self.cassette.put(request_key(request), request.get("model", ""),
+                          _completion_from_stream(request.get("model", ""), content, usage))
+
+    async def _arecord_stream(self, request, stream):
+        content, usage = [], None
+        try:
+            async for chunk in stream:
+                usage = getattr(chunk, "usage", None) or usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    content.append(chunk.choices[0].delta.content)
+                yield chunk
+        finally:
+            close = getattr(stream, "aclose", None) or getattr(stream, "close", None)
+            if close is not None:
+                await close()
+        self.cassette.put(request_key(request), request.get("model", ""),
+                          _completion_from_stream(request.get("model", ""), content, usage))
+
+
+class ReplayTransport:
+    """
+    Serves responses from `cassette` without touching the network. Unseen
+    requests raise CassetteMissError when `strict`, otherwise go to `fallback`.
+    """
+
+    def __init__(self, cassette: Cassette, strict: bool = True, fallback=None):
+        self.cassette = cassette
+        self.strict = strict
+        self.fallback = fallback
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, request: dict):
+        key = request_key(request)
+        data = self.cassette.get(key)
+        if data is not None:
+            self.hits += 1
+            return data
+        self.misses += 1
+        if self.strict or self.fallback is None:
+            raise CassetteMissError(
+                f"No recorded response for {request.get('model', '?')} request {key[:12]} in {self.cassette.path}."
+            )
+        return None
+
+    def create(self, **request):
+        data = self._lookup(request)
+        if data is None:
+            return self.fallback.create(**request)
+        return _stream_chunks(data) if request.get("stream") else _completion_response(data)
+
+    async def acreate(self, **request):
+        data = self._lookup(request)
+        if data is None:
+            return await self.fallback.acreate(**request)
+        if request.get("stream"):
+            return self._astream(data)
+        return _completion_response(data)
+
+    async def _astream(self, data):
+        for chunk in _stream_chunks(data):
+            yield chunk
+
+
+def needs_client() -> bool:
+    """Whether the configured transport can reach the network (and needs an API key)."""
+    return transport_mode() != "replay" or not replay_is_strict()
+
+
+def transport_from_env(client=None):
+    """Build the transport selected by SALARY_AGENT_TRANSPORT around `client`."""
+    from resilience import ResilientTransport
+
+    mode = transport_mode()
+    live = ResilientTransport(LiveTransport(client)) if client is not None else None
+    if mode == "live":
+        return live
+    cassette = Cassette(os.getenv("SALARY_AGENT_CASSETTE", DEFAULT_CASSETTE_PATH))
+    if mode == "record":
+        return RecordingTransport(live, cassette)
+    if mode == "replay":
+        return ReplayTransport(cassette, strict=replay_is_strict(), fallback=live)
+    raise ValueError(f"Unknown SALARY_AGENT_TRANSPORT '{mode}' (expected live, record or replay).")
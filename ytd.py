@@ -0,0 +1,213 @@
+"""
+Multi-month payroll table with year-to-date aggregation.
+
+Monthly payslips are parsed concurrently and stored column-wise in a numpy
+array: one row per month and one column per PayslipComponents field, with
+NaN where a slip does not carry a component. Year-to-date totals, the
+full-year projection and month-over-month deltas are single vectorized
+operations over that array.
+
+The analysis call then receives the projected *annual* figures (computed
+with annualize_factor=1), instead of one month multiplied by 12, so a
+mid-year raise or a one-off change in a component is accounted for, and a
+full year costs one analysis call rather than one per month.
+
+A table covers at most one tax year: slips repeating a pay period keep only
+the last one given, slips outside the selected tax year's 12 months are
+dropped, and more than 12 slips are rejected.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from errors import AgentError
+from tools import AMOUNT_FIELDS
+
+FIELDS = AMOUNT_FIELDS
+MONTHS_IN_YEAR = 12
+DEFAULT_PARSE_WORKERS = 8
+
+_MONTH_NAMES = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+_PERIOD_RE = re.compile(
+    r"\b(jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?[\s,'/-]*((?:19|20)\d{2})\b", re.I
+)
+
+
+def detect_period(text: str):
+    """(year, month) of the first "March 2025"-style date in the text, else None."""
+    match = _PERIOD_RE.search(text or "")
+    if not match:
+        return None
+    return int(match.group(2)), _MONTH_NAMES.index(match.group(1).lower()[:3]) + 1
+
+
+def fiscal_year_months(tax_year: str):
+    """
+    The 12 (year, month) periods of a tax year: "2024-25" is April 2024 to
+    March 2025, "2024" is the calendar year. None if the format is not recognized.
+    """
+    match = re.fullmatch(r"\s*((?:19|20)\d{2})(?:\s*[-/]\s*(\d{2}|\d{4}))?\s*", str(tax_year or ""))
+    if not match:
+        return None
+    start = int(match.group(1)) * 12 + (3 if match.group(2) else 0)
+    return [((start + k) // 12, (start + k) % 12 + 1) for k in range(MONTHS_IN_YEAR)]
+
+
+def period_label(period, index: int) -> str:
+    if period is None:
+        return f"Slip {index + 1}"
+    year, month = period
+    return f"{_MONTH_NAMES[month - 1].title()} {year}"
+
+
+# --- Concurrent parsing -------------------------------------------------------
+
+@dataclass
+class MonthParse:
+    """Outcome of parsing one monthly slip."""
+    index: int
+    text: str
+    data: dict | None = None
+    error: AgentError | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and bool(self.data)
+
+
+def parse_months(agent, payslip_texts, max_workers: int = DEFAULT_PARSE_WORKERS) -> list:
+    """
+    Parse monthly slips concurrently with a SalaryAgent, returning one
+    MonthParse per input in input order. Most slips take the local fast path;
+    the rest share the agent's pooled client across worker threads.
+    """
+    texts = list(payslip_texts)
+
+    def parse_one(index):
+        try:
+            return MonthParse(index, texts[index], data=agent.parse_payslip_text(texts[index]))
+        except AgentError as e:
+            return MonthParse(index, texts[index], error=e)
+
+    if len(texts) <= 1:
+        return [parse_one(i) for i in range(len(texts))]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(texts)), thread_name_prefix="ytd-parse") as pool:
+        return list(pool.map(parse_one, range(len(texts))))
+
+
+# --- Columnar table -----------------------------------------------------------
+
+class PayrollTable:
+    """Months x PayslipComponents fields, stored column-major with NaN for missing values."""
+
+    def __init__(self, labels: list, values: np.ndarray, periods: list | None = None):
+        self.labels = list(labels)
+        self.values = np.asfortranarray(values, dtype=np.float64)
+        self.periods = list(periods) if periods is not None else [None] * len(self.labels)
+        self.warnings = []
+
+    @classmethod
+    def from_months(cls, items, texts=None, tax_year: str | None = None) -> "PayrollTable":
+        """
+        Build the table from parsed month dicts (and optionally their slip texts,
+        used to detect each slip's pay period). A period given more than once
+        keeps its last slip, and with `tax_year` slips outside that year are
+        dropped; both are noted in .warnings. Rows are sorted by period when
+        every slip has one; otherwise the input order is kept.
+        Raises ValueError if more than 12 slips remain.
+        """
+        items = list(items)
+        texts = list(texts) if texts is not None else [None] * len(items)
+        periods = [detect_period(t) if t else None for t in texts]
+        window = set(fiscal_year_months(tax_year) or ()) if tax_year else set()
+
+        warnings = []
+        kept = {}  # period (or slip index when undetected) -> slip index, in input order
+        for i, period in enumerate(periods):
+            if period is not None and window and period not in window:
+                warnings.append(f"{period_label(period, i)} is outside tax year {tax_year}; that slip was skipped.")
+                continue
+            if period is not None and period in kept:
+                warnings.append(f"{period_label(period, i)} was given more than once; the last slip is used.")
+                del kept[period]
+            kept[period if period is not None else ("slip", i)] = i
+        order = list(kept.values())
+        if len(order) > MONTHS_IN_YEAR:
+            raise ValueError(f"{len(order)} monthly slips for one year; a year has at most {MONTHS_IN_YEAR}. "
+                             "Upload the slips of one tax year only.")
+        if order and all(periods[i] for i in order):
+            order.sort(key=lambda i: periods[i])
+
+        values = np.full((len(order), len(FIELDS)), np.nan, order="F")
+        for row, i in enumerate(order):
+            for col, field in enumerate(FIELDS):
+                value = (items[i] or {}).get(field)
+                if value is not None:
+                    values[row, col] = value
+        labels = [period_label(periods[i], i) for i in order]
+        table = cls(labels, values, [periods[i] for i in order])
+        table.warnings = warnings
+        return table
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def column(self, field: str) -> np.ndarray:
+        return self.values[:, FIELDS.index(field)]
+
+    @property
+    def present(self) -> np.ndarray:
+        """Boolean mask of fields that appear on at least one slip."""
+        return ~np.all(np.isnan(self.values), axis=0)
+
+    def ytd(self) -> np.ndarray:
+        """Cumulative year-to-date totals per month (missing counts as zero)."""
+        return np.cumsum(np.nan_to_num(self.values), axis=0)
+
+    def totals(self) -> np.ndarray:
+        return np.nansum(self.values, axis=0)
+
+    def deltas(self) -> np.ndarray:
+        """Month-over-month change per field; row i is month i+1 minus month i."""
+        return np.diff(np.nan_to_num(self.values), axis=0)
+
+    def projection(self, months_in_year: int = MONTHS_IN_YEAR) -> np.ndarray:
+        """
+        Full-year estimate: the year-to-date total plus the latest month's
+        amounts for every month not yet covered (the current run rate).
+        """
+        if not len(self):
+            return np.zeros(len(FIELDS))
+        remaining = max(0, months_in_year - len(self))
+        return self.totals() + np.nan_to_num(self.values[-1]) * remaining
+
+    def changes(self) -> list:
+        """(label, field, previous, current) for every month-over-month change."""
+        rows, cols = np.nonzero(self.deltas())
+        current = np.nan_to_num(self.values)
+        return [(self.labels[r + 1], FIELDS[c], float(current[r, c]), float(current[r + 1, c]))
+                for r, c in zip(rows, cols)]
+
+    def annual_data(self, months_in_year: int = MONTHS_IN_YEAR) -> dict:
+        """Projected annual PayslipComponents dict for analysis with annualize_factor=1."""
+        projection = self.projection(months_in_year)
+        return {field: round(float(projection[i]), 2) for i, field in enumerate(FIELDS) if self.present[i]}
+
+    def to_records(self) -> list:
+        """One {"month": label, field: value, ...} dict per row (for display)."""
+        return [
+            {"month": label, **{f: float(v) for f, v in zip(FIELDS, row) if not np.isnan(v)}}
+            for label, row in zip(self.labels, self.values)
+        ]
+
+    def summary_records(self, months_in_year: int = MONTHS_IN_YEAR) -> list:
+        """Year-to-date and projected rows in the same layout as to_records()."""
+        mask = self.present
+        return [
+            {"month": f"YTD ({len(self)} months)",
+             **{f: float(v) for f, v, m in zip(FIELDS, self.totals(), mask) if m}},
+            {"month": f"Projected ({months_in_year} months)",
+             **{f: float(v) for f, v, m in zip(FIELDS, self.projection(months_in_year), mask) if m}},
+        ]